@@ -0,0 +1,82 @@
+"""
+Redis-backed response cache.
+
+Caching is best-effort: when REDIS_URL is unset, the redis package is missing,
+or Redis is unreachable, every operation degrades to a miss and callers fall
+back to the database.
+"""
+
+import logging
+from typing import Optional
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as aioredis
+    from redis.exceptions import RedisError
+    HAS_REDIS = True
+    # Connection, timeout and server errors; anything else is a bug and propagates
+    _CACHE_ERRORS = (RedisError, OSError)
+except ImportError:
+    HAS_REDIS = False
+    _CACHE_ERRORS = (OSError,)
+
+
+class Cache:
+    """Thin async wrapper around Redis that never raises on cache errors."""
+
+    def __init__(self):
+        self._client = None
+        url = get_settings().REDIS_URL
+        if url and HAS_REDIS:
+            self._client = aioredis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        elif url:
+            logger.warning("REDIS_URL is set but the redis package is not installed — caching disabled")
+
+    @property
+    def enabled(self) -> bool:
+        return self._client is not None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """Return the cached value, or None on a miss or Redis error."""
+        if self._client is None:
+            return None
+        try:
+            return await self._client.get(key)
+        except _CACHE_ERRORS as e:
+            logger.warning(f"Cache get failed for {key}: {e}")
+            return None
+
+    async def setex(self, key: str, ttl_seconds: int, value) -> None:
+        """Store value under key with an expiry."""
+        if self._client is None:
+            return
+        try:
+            await self._client.setex(key, ttl_seconds, value)
+        except _CACHE_ERRORS as e:
+            logger.warning(f"Cache set failed for {key}: {e}")
+
+    async def delete(self, *keys: str) -> None:
+        """Invalidate one or more keys."""
+        if self._client is None:
+            return
+        try:
+            await self._client.delete(*keys)
+        except _CACHE_ERRORS as e:
+            logger.warning(f"Cache delete failed for {keys}: {e}")
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+
+
+def user_key(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+USER_TTL_SECONDS = 300
+
+# Singleton instance
+cache = Cache()
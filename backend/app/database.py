@@ -2,9 +2,17 @@
 Database configuration and session management.
 """
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-from app.config import settings
+from datetime import UTC, datetime
+
+from sqlalchemy import DateTime, TypeDecorator, create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.sql.functions import now
+
+from app.config import get_settings
+
+settings = get_settings()
 
 engine = create_engine(
     settings.DATABASE_URL,
@@ -12,8 +20,90 @@ engine = create_engine(
     echo=settings.DEBUG,
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+
+# Async driver counterparts of the sync URL schemes
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+def _async_url(url: str) -> str:
+    """Map DATABASE_URL onto its async driver (e.g. postgresql:// -> postgresql+asyncpg://)."""
+    scheme, sep, rest = url.partition("://")
+    return f"{_ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+
+# Async engine for routers that await their queries instead of blocking the event loop
+async_engine = create_async_engine(
+    _async_url(settings.DATABASE_URL),
+    echo=settings.DEBUG,
+    **({} if "sqlite" in settings.DATABASE_URL else {"pool_size": 20}),
+)
+
+
+if "sqlite" in settings.DATABASE_URL:
+    @event.listens_for(engine, "connect")
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _sqlite_enable_foreign_keys(dbapi_connection, connection_record):
+        """SQLite ignores FOREIGN KEY clauses (and ON DELETE CASCADE) unless enabled per connection."""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+@compiles(now, "sqlite")
+def _sqlite_now(element, compiler, **kw):
+    """SQLite's CURRENT_TIMESTAMP only has second precision; keep milliseconds for ordering."""
+    return "STRFTIME('%Y-%m-%d %H:%M:%f', 'NOW')"
+
+
+def utc_now() -> datetime:
+    """
+    Timezone-aware UTC now; the Python-side default of timestamp columns.
+
+    Kept next to server_default=func.now() because databases created before the
+    server defaults existed have no column DEFAULT.
+    """
+    return datetime.now(UTC)
+
+
+class UTCDateTime(TypeDecorator):
+    """
+    DateTime(timezone=True) that always returns timezone-aware UTC values.
+
+    SQLite has no timezone storage and reads timestamps back naive; values are stored
+    as UTC and get tzinfo reattached, so every endpoint serializes them the same way.
+    """
+
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(UTC)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is not None and value.tzinfo is None:
+            value = value.replace(tzinfo=UTC)
+        return value
+
+
+# Instances keep their loaded state after commit; server-generated columns
+# are fetched during the flush (RETURNING) thanks to eager_defaults below.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+class _ModelDefaults:
+    """Mapper options shared by every model."""
+
+    __mapper_args__ = {"eager_defaults": True}
+
+
+Base = declarative_base(cls=_ModelDefaults)
 
 
 def get_db():
@@ -25,6 +115,12 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Dependency that provides an async database session."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def init_db():
     """Create all database tables."""
     Base.metadata.create_all(bind=engine)
@@ -7,14 +7,28 @@ everyday inputs, enabling early health risk insights without medical records.
 Built for https://tryhea.com
 """
 
+import asyncio
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.config import settings
-from app.database import init_db
-from app.middleware.security import SecurityMiddleware
-from app.routers import user, health_input, inference, feedback, privacy, ai_insights
+
+from app.cache import cache
+from app.config import Settings, get_settings
+from app.database import async_engine, init_db
+from app.middleware.security import SecurityMiddleware, access_log, rate_limiter
+from app.responses import ORJSONResponse
+from app.routers import (
+    ai_insights,
+    batch,
+    feedback,
+    health_input,
+    inference,
+    privacy,
+    user,
+)
+from app.services.gemini_service import gemini_service
 
 # Configure logging
 logging.basicConfig(
@@ -23,6 +37,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+settings = get_settings()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -31,8 +47,18 @@ async def lifespan(app: FastAPI):
     logger.info(f"Starting {settings.APP_NAME} v{settings.APP_VERSION}")
     init_db()
     logger.info("Database initialized")
+    gemini_service.initialize()
+    background_tasks = [
+        asyncio.create_task(rate_limiter.run_sweeper()),
+        asyncio.create_task(access_log.run()),
+    ]
     yield
     # Shutdown
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await cache.close()
+    await async_engine.dispose()
     logger.info("Shutting down Hea backend")
 
 
@@ -46,6 +72,7 @@ app = FastAPI(
     ),
     version=settings.APP_VERSION,
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     docs_url="/docs",
     redoc_url="/redoc",
 )
@@ -57,8 +84,9 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ALLOWED_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_headers=["content-type", "authorization", "x-requested-with"],
+    max_age=86400,  # let browsers cache preflight responses for a day
 )
 
 # Security headers & rate limiting
@@ -73,12 +101,13 @@ app.include_router(inference.router, prefix=settings.API_V1_PREFIX)
 app.include_router(feedback.router, prefix=settings.API_V1_PREFIX)
 app.include_router(privacy.router, prefix=settings.API_V1_PREFIX)
 app.include_router(ai_insights.router, prefix=settings.API_V1_PREFIX)
+app.include_router(batch.router, prefix=settings.API_V1_PREFIX)
 
 
 # ─── Root Endpoints ───────────────────────────────────────
 
 @app.get("/", tags=["Health Check"])
-def root():
+def root(settings: Settings = Depends(get_settings)):
     """API root — health check."""
     return {
         "service": settings.APP_NAME,
@@ -89,7 +118,7 @@ def root():
 
 
 @app.get("/health", tags=["Health Check"])
-def health_check():
+def health_check(settings: Settings = Depends(get_settings)):
     """Detailed health check for monitoring."""
     return {
         "status": "healthy",
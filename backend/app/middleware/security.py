@@ -1,79 +1,227 @@
 """
 Security Middleware — rate limiting, request validation, and security headers.
+
+Implemented as a plain ASGI middleware so requests are not wrapped in extra
+Request/Response objects on the hot path.
 """
 
-import time
+import asyncio
 import logging
-from collections import defaultdict
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from app.config import settings
+import time
+from collections import OrderedDict
+
+from app.config import get_settings
 
 logger = logging.getLogger(__name__)
 
+# Bound once so the per-request path avoids module attribute lookups
+_monotonic = time.monotonic
+_perf_counter = time.perf_counter
 
-class SecurityMiddleware(BaseHTTPMiddleware):
-    """Provides rate limiting, request size validation, and security headers."""
+# Security headers added to every response, as raw ASGI header pairs
+_STATIC_HEADERS: tuple[tuple[bytes, bytes], ...] = (
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+    (b"content-security-policy", b"default-src 'self'"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+)
 
-    def __init__(self, app):
-        super().__init__(app)
-        self._request_counts: dict[str, list] = defaultdict(list)
+# Probe and documentation endpoints bypass rate limiting and security headers
+_SKIP_PATHS = frozenset(("/", "/health", "/docs", "/redoc", "/openapi.json"))
 
-    async def dispatch(self, request: Request, call_next):
-        # 1. Rate limiting
-        client_ip = request.client.host if request.client else "unknown"
-        if not self._check_rate_limit(client_ip):
-            return Response(
-                content='{"detail":"Rate limit exceeded. Please try again later."}',
-                status_code=429,
-                media_type="application/json",
-            )
-
-        # 2. Request size validation (prevent oversized payloads)
-        content_length = request.headers.get("content-length")
-        if content_length and int(content_length) > 1_000_000:  # 1MB max
-            return Response(
-                content='{"detail":"Request payload too large"}',
-                status_code=413,
-                media_type="application/json",
-            )
-
-        # 3. Process request
-        start_time = time.time()
-        response = await call_next(request)
-        process_time = time.time() - start_time
-
-        # 4. Add security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        response.headers["Content-Security-Policy"] = "default-src 'self'"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["X-Process-Time"] = str(round(process_time, 4))
-
-        # 5. Log request
+MAX_CONTENT_LENGTH = 1_000_000  # 1MB max request body
+
+# Pre-serialized error responses sent without invoking the application
+_RATE_LIMIT_BODY = b'{"detail":"Rate limit exceeded. Please try again later."}'
+_TOO_LARGE_BODY = b'{"detail":"Request payload too large"}'
+_BAD_LENGTH_BODY = b'{"detail":"Invalid Content-Length header"}'
+
+
+def _json_headers(body: bytes) -> list[tuple[bytes, bytes]]:
+    return [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+
+
+_RATE_LIMIT_HEADERS = _json_headers(_RATE_LIMIT_BODY)
+_TOO_LARGE_HEADERS = _json_headers(_TOO_LARGE_BODY)
+_BAD_LENGTH_HEADERS = _json_headers(_BAD_LENGTH_BODY)
+
+
+class RateLimiter:
+    """Fixed window per-IP rate limiter with bounded memory."""
+
+    WINDOW_SECONDS = 60
+    MAX_CLIENTS = 100_000  # least recently seen IPs are evicted beyond this
+
+    def __init__(self):
+        self._limit = get_settings().RATE_LIMIT_PER_MINUTE
+        self._window = self.WINDOW_SECONDS
+        self._max_clients = self.MAX_CLIENTS
+        # client_ip -> [request_count, window_start], least recently seen first
+        self._buckets: OrderedDict[str, list] = OrderedDict()
+
+    def check(self, client_ip: str) -> bool:
+        """Count a request from client_ip; False once the limit is exceeded."""
+        now = _monotonic()
+        buckets = self._buckets
+
+        bucket = buckets.get(client_ip)
+        if bucket is None:
+            buckets[client_ip] = [1, now]
+            if len(buckets) > self._max_clients:
+                buckets.popitem(last=False)
+            return True
+
+        buckets.move_to_end(client_ip)
+        if now - bucket[1] >= self._window:
+            bucket[0] = 1
+            bucket[1] = now
+            return True
+
+        if bucket[0] >= self._limit:
+            return False
+
+        bucket[0] += 1
+        return True
+
+    def prune(self) -> int:
+        """Drop buckets whose window expired more than a window ago.
+
+        Buckets are kept in least-recently-seen order and a bucket's window
+        always starts within a window of its last hit, so the scan can stop
+        at the first bucket whose window is still open.
+        """
+        now = _monotonic()
+        cutoff = now - 2 * self.WINDOW_SECONDS
+        active_since = now - self.WINDOW_SECONDS
+
+        stale = []
+        for ip, bucket in self._buckets.items():
+            if bucket[1] >= active_since:
+                break
+            if bucket[1] < cutoff:
+                stale.append(ip)
+        for ip in stale:
+            del self._buckets[ip]
+        return len(stale)
+
+    async def run_sweeper(self):
+        """Periodically prune stale buckets (started from the app lifespan)."""
+        while True:
+            await asyncio.sleep(self.WINDOW_SECONDS)
+            removed = self.prune()
+            if removed:
+                logger.debug(f"Pruned {removed} stale rate limit buckets")
+
+
+class AccessLogger:
+    """Defers access log formatting and writes to a background task."""
+
+    BATCH_SIZE = 100
+    MAX_PENDING = 10_000
+
+    def __init__(self):
+        self._queue: asyncio.Queue | None = None
+
+    def record(self, method: str, path: str, status_code: int, process_time: float, client_ip: str):
+        """Queue an access log entry; never blocks the request."""
+        entry = (method, path, status_code, process_time, client_ip)
+        if self._queue is None:
+            # Drainer not running (e.g. no lifespan) — log inline
+            self._write(entry)
+            return
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            pass  # drop the entry rather than slow down requests
+
+    async def run(self):
+        """Drain queued entries in batches (started from the app lifespan)."""
+        self._queue = queue = asyncio.Queue(maxsize=self.MAX_PENDING)
+        try:
+            while True:
+                self._write(await queue.get())
+                for _ in range(self.BATCH_SIZE - 1):
+                    try:
+                        self._write(queue.get_nowait())
+                    except asyncio.QueueEmpty:
+                        break
+        finally:
+            self._queue = None
+            while not queue.empty():
+                self._write(queue.get_nowait())
+
+    @staticmethod
+    def _write(entry: tuple):
+        method, path, status_code, process_time, client_ip = entry
         logger.info(
-            f"{request.method} {request.url.path} "
-            f"status={response.status_code} "
+            f"{method} {path} "
+            f"status={status_code} "
             f"time={process_time:.3f}s "
             f"ip={client_ip}"
         )
 
-        return response
 
-    def _check_rate_limit(self, client_ip: str) -> bool:
-        """Simple sliding window rate limiter."""
-        now = time.time()
-        window = 60  # 1 minute window
+class SecurityMiddleware:
+    """Provides rate limiting, request size validation, and security headers."""
 
-        # Clean old entries
-        self._request_counts[client_ip] = [
-            t for t in self._request_counts[client_ip] if now - t < window
-        ]
+    def __init__(self, app):
+        self.app = app
 
-        if len(self._request_counts[client_ip]) >= settings.RATE_LIMIT_PER_MINUTE:
-            return False
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in _SKIP_PATHS:
+            await self.app(scope, receive, send)
+            return
 
-        self._request_counts[client_ip].append(now)
-        return True
+        # 1. Rate limiting
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+        if not rate_limiter.check(client_ip):
+            await self._send_error(send, 429, _RATE_LIMIT_HEADERS, _RATE_LIMIT_BODY)
+            return
+
+        # 2. Request size validation — reject oversized payloads before the body is read
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                # Digits only: int() would also accept "-1", "+1", "1_0" and surrounding spaces
+                if not value.isdigit():
+                    await self._send_error(send, 400, _BAD_LENGTH_HEADERS, _BAD_LENGTH_BODY)
+                    return
+                if int(value) > MAX_CONTENT_LENGTH:
+                    await self._send_error(send, 413, _TOO_LARGE_HEADERS, _TOO_LARGE_BODY)
+                    return
+                break
+
+        # 3. Process request, adding security headers to the response
+        start_time = _perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                process_time = _perf_counter() - start_time
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    *_STATIC_HEADERS,
+                    (b"x-process-time", f"{process_time:.4f}".encode()),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+        process_time = _perf_counter() - start_time
+
+        # 4. Log request (formatted and written by the background drainer)
+        access_log.record(scope["method"], scope["path"], status_code, process_time, client_ip)
+
+    @staticmethod
+    async def _send_error(send, status_code: int, headers: list, body: bytes):
+        """Send a pre-built JSON error response without invoking the application."""
+        await send({"type": "http.response.start", "status": status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+# Singleton instances
+rate_limiter = RateLimiter()
+access_log = AccessLogger()
@@ -4,18 +4,18 @@ Used for adaptive model improvement.
 """
 
 import uuid
-from datetime import datetime
-from sqlalchemy import Column, String, Float, Integer, DateTime, Text, ForeignKey
-from app.database import Base
+from sqlalchemy import Column, String, Float, Integer, Text, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.database import Base, UTCDateTime, utc_now
 
 
 class Feedback(Base):
     __tablename__ = "feedback"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
-    assessment_id = Column(String, ForeignKey("risk_assessments.id"), nullable=False, index=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)  # leads ix_feedback_user_type
+    assessment_id = Column(String, ForeignKey("risk_assessments.id", ondelete="CASCADE"), nullable=False, index=True)
+    created_at = Column(UTCDateTime, default=utc_now, server_default=func.now(), index=True)  # retention purge
 
     # Feedback type
     feedback_type = Column(String, nullable=False)  # confirm, reject, adjust
@@ -32,3 +32,8 @@ class Feedback(Base):
     # Used for model retraining
     used_for_training = Column(String, default="pending")  # pending, used, skipped
     confidence_adjustment = Column(Float, default=0.0)  # delta applied to future scores
+
+    # Per-user lookups and stats aggregated by feedback type
+    __table_args__ = (
+        Index("ix_feedback_user_type", user_id, feedback_type),
+    )
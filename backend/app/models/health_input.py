@@ -4,17 +4,17 @@ Supports free text, emoji, checkboxes, and daily metrics.
 """
 
 import uuid
-from datetime import datetime
-from sqlalchemy import Column, String, Float, Integer, DateTime, JSON, ForeignKey, Text
-from app.database import Base
+from sqlalchemy import Column, String, Float, Integer, JSON, ForeignKey, Text, Index
+from sqlalchemy.sql import func
+from app.database import Base, UTCDateTime, utc_now
 
 
 class HealthInput(Base):
     __tablename__ = "health_inputs"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)  # leads ix_health_inputs_user_created
+    created_at = Column(UTCDateTime, default=utc_now, server_default=func.now(), index=True)
 
     # Free text symptom description (sanitized)
     symptom_text = Column(Text, nullable=True)
@@ -41,3 +41,8 @@ class HealthInput(Base):
 
     # Source metadata
     input_source = Column(String, default="web")  # web, whatsapp, voice
+
+    # Per-user history queries filter on user_id and read newest first
+    __table_args__ = (
+        Index("ix_health_inputs_user_created", user_id, created_at.desc()),
+    )
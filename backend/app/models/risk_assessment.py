@@ -3,17 +3,17 @@ Risk Assessment model — stores ML-generated risk evaluation results.
 """
 
 import uuid
-from datetime import datetime
-from sqlalchemy import Column, String, Float, DateTime, JSON, ForeignKey, Text
-from app.database import Base
+from sqlalchemy import Column, String, Float, JSON, ForeignKey, Text, Index
+from sqlalchemy.sql import func
+from app.database import Base, UTCDateTime, utc_now
 
 
 class RiskAssessment(Base):
     __tablename__ = "risk_assessments"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)  # leads ix_risk_assessments_user_created
+    created_at = Column(UTCDateTime, default=utc_now, server_default=func.now(), index=True)
 
     # Risk output
     risk_level = Column(String, nullable=False)  # LOW, WEAK, MODERATE, HIGH
@@ -38,4 +38,9 @@ class RiskAssessment(Base):
     input_ids = Column(JSON, default=list)
 
     # Feedback status
-    feedback_received = Column(String, default="none")  # none, confirmed, rejected, adjusted
+    feedback_received = Column(String, default="none", index=True)  # none, confirmed, rejected, adjusted
+
+    # Per-user history queries filter on user_id and read newest first
+    __table_args__ = (
+        Index("ix_risk_assessments_user_created", user_id, created_at.desc()),
+    )
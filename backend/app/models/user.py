@@ -4,9 +4,9 @@ No PHI/medical records stored.
 """
 
 import uuid
-from datetime import datetime
-from sqlalchemy import Column, String, Boolean, DateTime, JSON
-from app.database import Base
+from sqlalchemy import Column, String, Boolean, JSON
+from sqlalchemy.sql import func
+from app.database import Base, UTCDateTime, utc_now
 
 
 class User(Base):
@@ -14,15 +14,15 @@ class User(Base):
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     anonymous_id = Column(String, unique=True, index=True, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(UTCDateTime, default=utc_now, server_default=func.now())
+    updated_at = Column(UTCDateTime, default=utc_now, server_default=func.now(), onupdate=func.now())
 
     # Consent flags (GDPR compliant)
     consent_data_storage = Column(Boolean, default=False)
     consent_ml_usage = Column(Boolean, default=False)
     consent_anonymized_research = Column(Boolean, default=False)
     consent_wearable_data = Column(Boolean, default=False)
-    consent_given_at = Column(DateTime, nullable=True)
+    consent_given_at = Column(UTCDateTime, default=utc_now, server_default=func.now(), nullable=True)
 
     # User preferences
     notification_preferences = Column(JSON, default=dict)
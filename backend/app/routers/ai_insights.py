@@ -4,12 +4,17 @@ AI Insights Router — Endpoints for Gemini-powered health insights.
 Uses Gemini Pro for deep pattern analysis and Gemini Flash for quick daily tips.
 """
 
+import asyncio
 import logging
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
 from typing import Optional
-from app.database import get_db
+
+import httpx
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+from google.genai import errors as genai_errors
+from pydantic import BaseModel
+
+from app.database import SessionLocal
 from app.models.health_input import HealthInput
 from app.models.risk_assessment import RiskAssessment
 from app.services.gemini_service import gemini_service
@@ -50,36 +55,60 @@ def ai_status():
     }
 
 
-@router.post("/analyze")
-async def analyze_patterns(request: AnalysisRequest, db: Session = Depends(get_db)):
-    """
-    Deep pattern analysis using Gemini Pro.
-    Analyzes recent health inputs and risk assessments to find patterns.
-    """
-    # Fetch recent health inputs
-    inputs = (
-        db.query(HealthInput)
-        .filter(HealthInput.user_id == request.user_id)
-        .order_by(HealthInput.created_at.desc())
-        .limit(request.include_days)
-        .all()
-    )
-
-    # Fetch latest assessment
-    latest_assessment = (
-        db.query(RiskAssessment)
-        .filter(RiskAssessment.user_id == request.user_id)
-        .order_by(RiskAssessment.created_at.desc())
-        .first()
+def _fetch_recent_inputs(user_id: str, limit: int) -> list:
+    """Load the columns of the user's recent health inputs used in the prompt (runs in a worker thread)."""
+    with SessionLocal() as db:
+        return (
+            db.query(
+                HealthInput.symptom_text,
+                HealthInput.checkbox_selections,
+                HealthInput.sleep_hours,
+                HealthInput.mood_score,
+                HealthInput.energy_level,
+                HealthInput.stress_level,
+                HealthInput.created_at,
+            )
+            .filter(HealthInput.user_id == user_id)
+            .order_by(HealthInput.created_at.desc())
+            .limit(limit)
+            .all()
+        )
+
+
+def _fetch_latest_assessment(user_id: str) -> Optional[RiskAssessment]:
+    """Load the user's latest risk assessment (runs in a worker thread)."""
+    with SessionLocal() as db:
+        return (
+            db.query(RiskAssessment)
+            .filter(RiskAssessment.user_id == user_id)
+            .order_by(RiskAssessment.created_at.desc())
+            .first()
+        )
+
+
+async def _load_health_data(user_id: str, include_days: int) -> dict:
+    """Build the Gemini Pro payload from the user's recent inputs and latest assessment."""
+    # Fetch recent inputs and the latest assessment concurrently, off the event loop
+    inputs, latest_assessment = await asyncio.gather(
+        asyncio.to_thread(_fetch_recent_inputs, user_id, include_days),
+        asyncio.to_thread(_fetch_latest_assessment, user_id),
     )
 
-    # Build health data payload
     health_data = {
         "inputs": [
             {
-                "free_text_input": inp.free_text_input,
-                "selected_symptoms": inp.selected_symptoms or [],
-                "daily_metrics": inp.daily_metrics or {},
+                "free_text_input": inp.symptom_text,
+                "selected_symptoms": inp.checkbox_selections or [],
+                "daily_metrics": {
+                    key: value
+                    for key, value in (
+                        ("sleep_hours", inp.sleep_hours),
+                        ("mood_score", inp.mood_score),
+                        ("energy_level", inp.energy_level),
+                        ("stress_level", inp.stress_level),
+                    )
+                    if value is not None
+                },
                 "created_at": str(inp.created_at),
             }
             for inp in inputs
@@ -93,6 +122,17 @@ async def analyze_patterns(request: AnalysisRequest, db: Session = Depends(get_d
             "signal_details": latest_assessment.signal_details or {},
         }
 
+    return health_data
+
+
+@router.post("/analyze")
+async def analyze_patterns(request: AnalysisRequest):
+    """
+    Deep pattern analysis using Gemini Pro.
+    Analyzes recent health inputs and risk assessments to find patterns.
+    """
+    health_data = await _load_health_data(request.user_id, request.include_days)
+
     # Call Gemini Pro
     result = await gemini_service.analyze_health_patterns(
         health_data=health_data,
@@ -105,6 +145,40 @@ async def analyze_patterns(request: AnalysisRequest, db: Session = Depends(get_d
     }
 
 
+def _sse_event(data: str, event: Optional[str] = None) -> str:
+    """Format one Server-Sent Event; multi-line data is split across data: fields."""
+    lines = [f"event: {event}"] if event else []
+    lines.extend(f"data: {line}" for line in data.split("\n"))
+    return "\n".join(lines) + "\n\n"
+
+
+@router.post("/analyze/stream")
+async def stream_analysis(request: AnalysisRequest):
+    """
+    Streaming pattern analysis using Gemini Pro (Server-Sent Events).
+    Forwards JSON fragments as they are generated; the client concatenates
+    the data of all events until the final "done" event.
+    """
+    health_data = await _load_health_data(request.user_id, request.include_days)
+
+    async def events():
+        try:
+            async for fragment in gemini_service.stream_health_patterns(health_data, request.context):
+                yield _sse_event(fragment)
+        except (genai_errors.APIError, httpx.HTTPError) as e:
+            # Headers are already sent, so report the failure in-band
+            logger.warning(f"Streaming analysis failed for user {request.user_id}: {e}")
+            yield _sse_event("AI analysis failed", event="error")
+            return
+        yield _sse_event("", event="done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/quick-tip")
 async def quick_tip(request: QuickTipRequest):
     """
@@ -0,0 +1,67 @@
+"""
+Batch Router — coalesce several read requests into one round-trip.
+
+Sub-requests are dispatched in-process through the full ASGI stack (so rate
+limiting and security headers still apply) and run concurrently.
+"""
+
+import asyncio
+from typing import Any, Literal
+
+import httpx
+import orjson
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel, Field
+
+from app.config import get_settings
+
+router = APIRouter(prefix="/batch", tags=["Batch"])
+
+MAX_BATCH_SIZE = 20
+
+
+# ─── Request / Response Schemas ───────────────────────
+
+class BatchSubRequest(BaseModel):
+    method: Literal["GET"] = "GET"  # only idempotent reads are batched
+    path: str = Field(..., description="API path including query string, e.g. /api/v1/users/{id}")
+
+
+class BatchRequest(BaseModel):
+    requests: list[BatchSubRequest] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class BatchSubResponse(BaseModel):
+    status: int
+    body: Any
+
+
+# ─── Endpoint ─────────────────────────────────────────
+
+@router.post("/", response_model=list[BatchSubResponse])
+async def batch(payload: BatchRequest, request: Request):
+    """Execute several GET requests concurrently and return their results in order."""
+    prefix = get_settings().API_V1_PREFIX
+    for sub in payload.requests:
+        if not sub.path.startswith(f"{prefix}/") or sub.path.startswith(f"{prefix}{router.prefix}"):
+            raise HTTPException(status_code=400, detail=f"Unsupported batch path: {sub.path}")
+
+    client_addr = request.client or ("127.0.0.1", 0)
+    transport = httpx.ASGITransport(
+        app=request.app,
+        raise_app_exceptions=False,
+        client=(client_addr[0], client_addr[1]),  # keep per-IP rate limiting intact
+    )
+    async with httpx.AsyncClient(transport=transport, base_url="http://batch") as client:
+        responses = await asyncio.gather(
+            *(client.request(sub.method, sub.path) for sub in payload.requests)
+        )
+
+    results = []
+    for response in responses:
+        try:
+            body = orjson.loads(response.content) if response.content else None
+        except orjson.JSONDecodeError:
+            body = response.text
+        results.append({"status": response.status_code, "body": body})
+    return results
@@ -3,37 +3,40 @@ Feedback Router — user signal confirmation/rejection endpoints.
 """
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.models.user import User
 from app.models.risk_assessment import RiskAssessment
-from app.schemas.schemas import FeedbackCreate, FeedbackResponse, APIResponse
+from app.schemas.schemas import FeedbackCreate, FeedbackBulkCreate, FeedbackResponse, APIResponse
 from app.services.feedback_service import feedback_service
 
 router = APIRouter(prefix="/feedback", tags=["Feedback"])
 
 
 @router.post("/", response_model=FeedbackResponse, status_code=201)
-def submit_feedback(user_id: str, feedback_data: FeedbackCreate, db: Session = Depends(get_db)):
+async def submit_feedback(user_id: str, feedback_data: FeedbackCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Submit feedback on a risk assessment.
     Supports: confirm (signal was accurate), reject (false alarm), adjust (different risk level).
     """
     # Verify user
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     # Verify assessment exists and belongs to user
-    assessment = db.query(RiskAssessment).filter(
-        RiskAssessment.id == feedback_data.assessment_id,
-        RiskAssessment.user_id == user_id,
-    ).first()
+    assessment = await db.scalar(
+        select(RiskAssessment).where(
+            RiskAssessment.id == feedback_data.assessment_id,
+            RiskAssessment.user_id == user_id,
+        )
+    )
     if not assessment:
         raise HTTPException(status_code=404, detail="Assessment not found for this user")
 
     # Process feedback
-    feedback = feedback_service.process_feedback(
+    feedback = await feedback_service.process_feedback(
         db=db,
         user_id=user_id,
         assessment_id=feedback_data.assessment_id,
@@ -46,8 +49,23 @@ def submit_feedback(user_id: str, feedback_data: FeedbackCreate, db: Session = D
     return feedback
 
 
+@router.post("/bulk", response_model=list[FeedbackResponse], status_code=201)
+async def submit_feedback_bulk(user_id: str, payload: FeedbackBulkCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Submit several feedback items in one request (e.g. offline entries synced later).
+    All items are rejected if any assessment is missing or belongs to another user.
+    """
+    if not await db.get(User, user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+
+    try:
+        return await feedback_service.process_feedback_bulk(db, user_id, payload.items)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
 @router.get("/stats", response_model=dict)
-def get_feedback_stats(user_id: str, db: Session = Depends(get_db)):
+async def get_feedback_stats(user_id: str, db: AsyncSession = Depends(get_async_db)):
     """Get feedback statistics for a user — used for transparency."""
-    stats = feedback_service.get_user_feedback_stats(db, user_id)
+    stats = await feedback_service.get_user_feedback_stats(db, user_id)
     return stats
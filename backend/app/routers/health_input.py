@@ -12,6 +12,22 @@ from app.services.sanitizer import InputSanitizer
 
 router = APIRouter(prefix="/inputs", tags=["Health Inputs"])
 
+# Columns selected by the history endpoint (mirrors HealthInputResponse)
+_HISTORY_COLUMNS = (
+    HealthInput.id,
+    HealthInput.user_id,
+    HealthInput.created_at,
+    HealthInput.symptom_text,
+    HealthInput.emoji_inputs,
+    HealthInput.checkbox_selections,
+    HealthInput.sleep_hours,
+    HealthInput.mood_score,
+    HealthInput.energy_level,
+    HealthInput.stress_level,
+    HealthInput.steps_count,
+    HealthInput.is_processed,
+)
+
 
 @router.post("/", response_model=HealthInputResponse, status_code=201)
 def submit_health_input(user_id: str, input_data: HealthInputCreate, db: Session = Depends(get_db)):
@@ -20,7 +36,7 @@ def submit_health_input(user_id: str, input_data: HealthInputCreate, db: Session
     All inputs are sanitized for security and normalized for ML processing.
     """
     # Verify user exists and has consent
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if not user.consent_data_storage:
@@ -55,27 +71,34 @@ def submit_health_input(user_id: str, input_data: HealthInputCreate, db: Session
 
     db.add(health_input)
     db.commit()
-    db.refresh(health_input)
     return health_input
 
 
 @router.get("/", response_model=list[HealthInputResponse])
 def get_user_inputs(user_id: str, limit: int = 30, db: Session = Depends(get_db)):
     """Get user's health input history."""
-    inputs = (
-        db.query(HealthInput)
+    rows = (
+        db.query(*_HISTORY_COLUMNS)
         .filter(HealthInput.user_id == user_id)
         .order_by(HealthInput.created_at.desc())
         .limit(limit)
         .all()
     )
-    return inputs
+    # Plain rows rather than ORM objects; the response model still serializes them
+    return [
+        {
+            **row._asdict(),
+            "emoji_inputs": row.emoji_inputs or [],
+            "checkbox_selections": row.checkbox_selections or [],
+        }
+        for row in rows
+    ]
 
 
 @router.get("/{input_id}", response_model=HealthInputResponse)
 def get_health_input(input_id: str, db: Session = Depends(get_db)):
     """Get a specific health input by ID."""
-    health_input = db.query(HealthInput).filter(HealthInput.id == input_id).first()
+    health_input = db.get(HealthInput, input_id)
     if not health_input:
         raise HTTPException(status_code=404, detail="Health input not found")
     return health_input
@@ -3,6 +3,7 @@ Inference Router — triggers risk assessment from ML pipeline.
 """
 
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.user import User
@@ -13,6 +14,20 @@ from app.services.inference_service import inference_service
 
 router = APIRouter(prefix="/assess", tags=["Risk Assessment"])
 
+# Columns selected by the history endpoint (mirrors RiskAssessmentResponse)
+_HISTORY_COLUMNS = (
+    RiskAssessment.id,
+    RiskAssessment.user_id,
+    RiskAssessment.created_at,
+    RiskAssessment.risk_level,
+    RiskAssessment.confidence_score,
+    RiskAssessment.explanation_text,
+    RiskAssessment.signal_details,
+    RiskAssessment.model_version,
+    RiskAssessment.inference_time_ms,
+    RiskAssessment.feedback_received,
+)
+
 
 @router.post("/", response_model=RiskAssessmentResponse, status_code=201)
 def run_assessment(request: AssessmentRequest, db: Session = Depends(get_db)):
@@ -21,15 +36,22 @@ def run_assessment(request: AssessmentRequest, db: Session = Depends(get_db)):
     Analyzes recent health inputs using NLP + time-series + fusion models.
     """
     # Verify user
-    user = db.query(User).filter(User.id == request.user_id).first()
+    user = db.get(User, request.user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if not user.consent_ml_usage:
         raise HTTPException(status_code=403, detail="ML usage consent required for risk assessment")
 
-    # Fetch recent health inputs
+    # Fetch the metric columns of recent health inputs for trend analysis
     recent_inputs = (
-        db.query(HealthInput)
+        db.query(
+            HealthInput.id,
+            HealthInput.sleep_hours,
+            HealthInput.mood_score,
+            HealthInput.energy_level,
+            HealthInput.stress_level,
+            HealthInput.steps_count,
+        )
         .filter(HealthInput.user_id == request.user_id)
         .order_by(HealthInput.created_at.desc())
         .limit(request.include_history_days)
@@ -39,9 +61,6 @@ def run_assessment(request: AssessmentRequest, db: Session = Depends(get_db)):
     if not recent_inputs:
         raise HTTPException(status_code=400, detail="No health inputs found. Submit daily logs first.")
 
-    # Get latest input for primary analysis
-    latest = recent_inputs[0]
-
     # Build historical metrics for trend analysis
     historical_metrics = [
         {
@@ -54,14 +73,16 @@ def run_assessment(request: AssessmentRequest, db: Session = Depends(get_db)):
         for inp in reversed(recent_inputs)
     ]
 
+    # Latest input drives the primary analysis; load its text/JSON fields only
+    latest = (
+        db.query(HealthInput.symptom_text, HealthInput.emoji_inputs, HealthInput.checkbox_selections)
+        .filter(HealthInput.id == recent_inputs[0].id)
+        .one()
+    )
+
     # Build daily metrics dict
-    daily_metrics = {
-        "sleep_hours": latest.sleep_hours,
-        "mood_score": latest.mood_score,
-        "energy_level": latest.energy_level,
-        "stress_level": latest.stress_level,
-        "steps_count": latest.steps_count,
-    }
+    daily_metrics = dict(historical_metrics[-1])
+    input_ids = [inp.id for inp in recent_inputs]
 
     # Run ML inference
     result = inference_service.assess_risk(
@@ -81,37 +102,44 @@ def run_assessment(request: AssessmentRequest, db: Session = Depends(get_db)):
         signal_details=result["signal_details"],
         model_version=result["model_version"],
         inference_time_ms=result["inference_time_ms"],
-        input_ids=[inp.id for inp in recent_inputs],
+        input_ids=input_ids,
     )
 
     db.add(assessment)
 
-    # Mark inputs as processed
-    for inp in recent_inputs:
-        inp.is_processed = "processed"
+    # Mark inputs as processed (single UPDATE, committed with the assessment)
+    db.execute(
+        update(HealthInput)
+        .where(HealthInput.id.in_(input_ids))
+        .values(is_processed="processed")
+        .execution_options(synchronize_session=False)
+    )
 
     db.commit()
-    db.refresh(assessment)
     return assessment
 
 
 @router.get("/history", response_model=list[RiskAssessmentResponse])
 def get_assessment_history(user_id: str, limit: int = 10, db: Session = Depends(get_db)):
     """Get risk assessment history for a user."""
-    assessments = (
-        db.query(RiskAssessment)
+    rows = (
+        db.query(*_HISTORY_COLUMNS)
         .filter(RiskAssessment.user_id == user_id)
         .order_by(RiskAssessment.created_at.desc())
         .limit(limit)
         .all()
     )
-    return assessments
+    # Plain rows rather than ORM objects; the response model still serializes them
+    return [
+        {**row._asdict(), "signal_details": row.signal_details or {}}
+        for row in rows
+    ]
 
 
 @router.get("/{assessment_id}", response_model=RiskAssessmentResponse)
 def get_assessment(assessment_id: str, db: Session = Depends(get_db)):
     """Get a specific risk assessment by ID."""
-    assessment = db.query(RiskAssessment).filter(RiskAssessment.id == assessment_id).first()
+    assessment = db.get(RiskAssessment, assessment_id)
     if not assessment:
         raise HTTPException(status_code=404, detail="Assessment not found")
     return assessment
@@ -2,8 +2,11 @@
 Privacy Router — consent management, data export, and deletion.
 """
 
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from app.cache import cache, user_key
 from app.database import get_db
 from app.models.user import User
 from app.schemas.schemas import PrivacySettings, APIResponse
@@ -15,7 +18,7 @@ router = APIRouter(prefix="/privacy", tags=["Privacy & GDPR"])
 @router.get("/{user_id}", response_model=PrivacySettings)
 def get_privacy_settings(user_id: str, db: Session = Depends(get_db)):
     """Get current privacy/consent settings for a user."""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -29,32 +32,35 @@ def get_privacy_settings(user_id: str, db: Session = Depends(get_db)):
 
 
 @router.put("/{user_id}", response_model=APIResponse)
-def update_privacy_settings(user_id: str, settings: PrivacySettings, db: Session = Depends(get_db)):
+async def update_privacy_settings(user_id: str, settings: PrivacySettings, db: Session = Depends(get_db)):
     """Update privacy/consent settings."""
     try:
-        privacy_service.update_consent(db, user_id, settings.model_dump())
+        await asyncio.to_thread(privacy_service.update_consent, db, user_id, settings.model_dump())
+        await cache.delete(user_key(user_id))
         return APIResponse(success=True, message="Privacy settings updated successfully")
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 
-@router.get("/{user_id}/export", response_model=dict)
-def export_user_data(user_id: str, db: Session = Depends(get_db)):
-    """Export all user data (GDPR right of access)."""
+@router.get("/{user_id}/export", response_class=StreamingResponse)
+def export_user_data(user_id: str):
+    """Export all user data (GDPR right of access), streamed as a single JSON document."""
     try:
-        return privacy_service.export_user_data(db, user_id)
+        chunks = privacy_service.export_user_data(user_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    return StreamingResponse(chunks, media_type="application/json")
 
 # coded by ritik raj
 @router.delete("/{user_id}", response_model=APIResponse)
-def delete_user_data(user_id: str, confirm: bool = False, db: Session = Depends(get_db)):
+async def delete_user_data(user_id: str, confirm: bool = False, db: Session = Depends(get_db)):
     """Delete all user data (GDPR right to erasure). Requires confirmation."""
     if not confirm:
         raise HTTPException(status_code=400, detail="Set confirm=true to permanently delete all data")
 
     try:
-        result = privacy_service.delete_user_data(db, user_id)
+        result = await asyncio.to_thread(privacy_service.delete_user_data, db, user_id)
+        await cache.delete(user_key(user_id))
         return APIResponse(success=True, message="All user data deleted", data=result)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
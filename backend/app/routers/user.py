@@ -2,57 +2,66 @@
 User Router — onboarding, user creation, and profile management.
 """
 
-import uuid
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
+import secrets
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import USER_TTL_SECONDS, cache, user_key
+from app.database import get_async_db
 from app.models.user import User
-from app.schemas.schemas import UserCreate, UserResponse, APIResponse
+from app.schemas.schemas import APIResponse, UserCreate, UserResponse
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
 @router.post("/", response_model=UserResponse, status_code=201)
-def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new user with consent preferences (onboarding step 1)."""
     if not user_data.consent.consent_data_storage:
         raise HTTPException(status_code=400, detail="Data storage consent is required to use Hea")
 
     user = User(
-        anonymous_id=f"hea_{uuid.uuid4().hex[:12]}",
+        anonymous_id="hea_" + secrets.token_hex(6),
         consent_data_storage=user_data.consent.consent_data_storage,
         consent_ml_usage=user_data.consent.consent_ml_usage,
         consent_anonymized_research=user_data.consent.consent_anonymized_research,
         consent_wearable_data=user_data.consent.consent_wearable_data,
-        consent_given_at=datetime.utcnow(),
         notification_preferences=user_data.notification_preferences or {},
     )
 
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
     return user
 
 
 @router.get("/{user_id}", response_model=UserResponse)
-def get_user(user_id: str, db: Session = Depends(get_db)):
-    """Get user profile."""
-    user = db.query(User).filter(User.id == user_id).first()
+async def get_user(user_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Get user profile (read-through Redis cache)."""
+    key = user_key(user_id)
+    cached = await cache.get(key)
+    if cached is not None:
+        # Cached JSON was produced from a validated UserResponse — send it as-is
+        return Response(content=cached, media_type="application/json")
+
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+
+    body = UserResponse.model_validate(user).model_dump_json()
+    await cache.setex(key, USER_TTL_SECONDS, body)
+    return Response(content=body, media_type="application/json")
 # coded by ritik raj
 
 @router.put("/{user_id}/complete-onboarding", response_model=APIResponse)
-def complete_onboarding(user_id: str, db: Session = Depends(get_db)):
+async def complete_onboarding(user_id: str, db: AsyncSession = Depends(get_async_db)):
     """Mark user onboarding as complete."""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     user.onboarding_completed = True
-    user.updated_at = datetime.utcnow()
-    db.commit()
+    await db.commit()
+    await cache.delete(user_key(user_id))
 
     return APIResponse(success=True, message="Onboarding completed successfully")
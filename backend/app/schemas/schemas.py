@@ -2,11 +2,11 @@
 Pydantic schemas for all API request/response models.
 """
 
-from pydantic import BaseModel, Field, validator
-from typing import Optional, List
 from datetime import datetime
 from enum import Enum
+from typing import List, Optional
 
+from pydantic import BaseModel, ConfigDict, Field, field_serializer, field_validator
 
 # ─── Enums ────────────────────────────────────────────────
 
@@ -44,6 +44,8 @@ class UserCreate(BaseModel):
 
 
 class UserResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: str
     anonymous_id: str
     created_at: datetime
@@ -51,9 +53,6 @@ class UserResponse(BaseModel):
     consent_data_storage: bool
     consent_ml_usage: bool
 
-    class Config:
-        from_attributes = True
-
 
 # ─── Health Input Schemas ─────────────────────────────────
 
@@ -74,14 +73,18 @@ class HealthInputCreate(BaseModel):
     wearable_data: Optional[dict] = None
     input_source: InputSource = InputSource.WEB
 
-    @validator("symptom_text")
+    @field_validator("symptom_text", mode="before")
+    @classmethod
     def validate_symptom_text(cls, v):
-        if v and len(v.strip()) == 0:
-            return None
-        return v
+        """Trim surrounding whitespace once; blank text becomes None."""
+        if not isinstance(v, str):
+            return v
+        return v.strip() or None
 
 # coded by Ritik Raj
 class HealthInputResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: str
     user_id: str
     created_at: datetime
@@ -95,9 +98,6 @@ class HealthInputResponse(BaseModel):
     steps_count: Optional[int]
     is_processed: str
 
-    class Config:
-        from_attributes = True
-
 
 # ─── Risk Assessment Schemas ──────────────────────────────
 
@@ -108,6 +108,8 @@ class SignalDetail(BaseModel):
 
 
 class RiskAssessmentResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: str
     user_id: str
     created_at: datetime
@@ -119,8 +121,9 @@ class RiskAssessmentResponse(BaseModel):
     inference_time_ms: Optional[float]
     feedback_received: str
 
-    class Config:
-        from_attributes = True
+    @field_serializer("confidence_score")
+    def serialize_confidence(self, v: float) -> float:
+        return round(v, 3)
 
 
 class AssessmentRequest(BaseModel):
@@ -138,7 +141,13 @@ class FeedbackCreate(BaseModel):
     comment: Optional[str] = Field(None, max_length=1000)
 
 
+class FeedbackBulkCreate(BaseModel):
+    items: List[FeedbackCreate] = Field(..., min_length=1, max_length=100)
+
+
 class FeedbackResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: str
     user_id: str
     assessment_id: str
@@ -146,9 +155,6 @@ class FeedbackResponse(BaseModel):
     relevance_score: Optional[int]
     created_at: datetime
 
-    class Config:
-        from_attributes = True
-
 
 # ─── Privacy Schemas ──────────────────────────────────────
 
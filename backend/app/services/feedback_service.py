@@ -4,12 +4,17 @@ Supports the feedback loop for model self-calibration.
 """
 
 import logging
-from sqlalchemy.orm import Session
+import uuid
+from sqlalchemy import case, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.feedback import Feedback
 from app.models.risk_assessment import RiskAssessment
 
 logger = logging.getLogger(__name__)
 
+# Ordinal position of each risk level, used to size "adjust" corrections
+_RISK_LEVELS = {"LOW": 0, "WEAK": 1, "MODERATE": 2, "HIGH": 3}
+
 
 class FeedbackService:
     """Manages user feedback on risk assessments and adjusts model confidence."""
@@ -19,7 +24,14 @@ class FeedbackService:
     REJECT_PENALTY = -0.10     # Larger negative adjustment when user rejects
     ADJUST_FACTOR = 0.03       # Per-level difference adjustment
 
-    def process_feedback(self, db: Session, user_id: str, assessment_id: str,
+    def __init__(self):
+        self._dispatch = {
+            "confirm": self._confirm_adjustment,
+            "reject": self._reject_adjustment,
+            "adjust": self._adjust_adjustment,
+        }
+
+    async def process_feedback(self, db: AsyncSession, user_id: str, assessment_id: str,
                          feedback_type: str, relevance_score: int | None = None,
                          adjusted_risk_level: str | None = None,
                          comment: str | None = None) -> Feedback:
@@ -27,6 +39,8 @@ class FeedbackService:
         Process user feedback on a risk assessment.
         Updates confidence calibration for future assessments.
         """
+        assessment = await db.get(RiskAssessment, assessment_id)
+
         # Create feedback record
         feedback = Feedback(
             user_id=user_id,
@@ -38,18 +52,16 @@ class FeedbackService:
         )
 
         # Calculate confidence adjustment
-        adjustment = self._calculate_adjustment(feedback_type, relevance_score, adjusted_risk_level, assessment_id, db)
+        adjustment = self._calculate_adjustment(feedback_type, relevance_score, adjusted_risk_level, assessment)
         feedback.confidence_adjustment = adjustment
 
         db.add(feedback)
 
         # Update the assessment's feedback status
-        assessment = db.query(RiskAssessment).filter(RiskAssessment.id == assessment_id).first()
         if assessment:
             assessment.feedback_received = feedback_type
 
-        db.commit()
-        db.refresh(feedback)
+        await db.commit()
 
         logger.info(
             f"Feedback processed: user={user_id}, assessment={assessment_id}, "
@@ -58,53 +70,114 @@ class FeedbackService:
 
         return feedback
 
+    async def process_feedback_bulk(self, db: AsyncSession, user_id: str, items: list) -> list:
+        """
+        Process a batch of feedback items (e.g. offline entries synced by the app).
+        Issues one SELECT, one multi-row INSERT, and one UPDATE regardless of batch size.
+        Raises ValueError if any assessment is missing or belongs to another user.
+        """
+        assessment_ids = {item.assessment_id for item in items}
+        assessments = {
+            a.id: a
+            for a in await db.scalars(
+                select(RiskAssessment).where(
+                    RiskAssessment.id.in_(assessment_ids),
+                    RiskAssessment.user_id == user_id,
+                )
+            )
+        }
+        missing = assessment_ids - assessments.keys()
+        if missing:
+            raise ValueError(f"Assessments not found for this user: {', '.join(sorted(missing))}")
+
+        rows = []
+        feedback_received = {}
+        for item in items:
+            feedback_type = item.feedback_type.value
+            adjusted_risk_level = item.adjusted_risk_level.value if item.adjusted_risk_level else None
+            rows.append({
+                "id": str(uuid.uuid4()),
+                "user_id": user_id,
+                "assessment_id": item.assessment_id,
+                "feedback_type": feedback_type,
+                "relevance_score": item.relevance_score,
+                "adjusted_risk_level": adjusted_risk_level,
+                "comment": item.comment,
+                "confidence_adjustment": self._calculate_adjustment(
+                    feedback_type, item.relevance_score, adjusted_risk_level,
+                    assessments[item.assessment_id],
+                ),
+            })
+            feedback_received[item.assessment_id] = feedback_type  # latest item wins
+
+        inserted = (await db.execute(
+            insert(Feedback).returning(
+                Feedback.id, Feedback.user_id, Feedback.assessment_id,
+                Feedback.feedback_type, Feedback.relevance_score, Feedback.created_at,
+            ),
+            rows,
+        )).all()
+        await db.execute(
+            update(RiskAssessment)
+            .where(RiskAssessment.id.in_(feedback_received))
+            .values(feedback_received=case(feedback_received, value=RiskAssessment.id))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+        logger.info(f"Bulk feedback processed: user={user_id}, items={len(rows)}")
+        return inserted
+
     def _calculate_adjustment(self, feedback_type: str, relevance_score: int | None,
-                               adjusted_risk_level: str | None, assessment_id: str,
-                               db: Session) -> float:
+                               adjusted_risk_level: str | None,
+                               assessment: RiskAssessment | None) -> float:
         """Calculate confidence score adjustment based on feedback."""
-        if feedback_type == "confirm":
-            # User confirms — boost confidence
-            base = self.CONFIRM_BOOST
-            if relevance_score:
-                base *= (relevance_score / 5.0)  # Scale by relevance
-            return round(base, 4)
-
-        elif feedback_type == "reject":
-            # User rejects — reduce confidence
-            base = self.REJECT_PENALTY
-            if relevance_score:
-                base *= (1 - relevance_score / 5.0)  # Lower relevance = bigger penalty
-            return round(base, 4)
-
-        elif feedback_type == "adjust" and adjusted_risk_level:
-            # User adjusts risk level — proportional correction
-            risk_levels = {"LOW": 0, "WEAK": 1, "MODERATE": 2, "HIGH": 3}
-            assessment = db.query(RiskAssessment).filter(RiskAssessment.id == assessment_id).first()
-            if assessment:
-                original_level = risk_levels.get(assessment.risk_level, 0)
-                adjusted_level = risk_levels.get(adjusted_risk_level, 0)
-                diff = adjusted_level - original_level
-                return round(diff * self.ADJUST_FACTOR, 4)
-
-        return 0.0
-
-    def get_user_feedback_stats(self, db: Session, user_id: str) -> dict:
+        handler = self._dispatch.get(feedback_type)
+        if handler is None:
+            return 0.0
+        return handler(relevance_score, adjusted_risk_level, assessment)
+
+    def _confirm_adjustment(self, relevance_score, adjusted_risk_level, assessment) -> float:
+        """User confirms — boost confidence, scaled by relevance."""
+        base = self.CONFIRM_BOOST
+        if relevance_score:
+            base *= (relevance_score / 5.0)
+        return round(base, 4)
+
+    def _reject_adjustment(self, relevance_score, adjusted_risk_level, assessment) -> float:
+        """User rejects — reduce confidence; lower relevance means a bigger penalty."""
+        base = self.REJECT_PENALTY
+        if relevance_score:
+            base *= (1 - relevance_score / 5.0)
+        return round(base, 4)
+
+    def _adjust_adjustment(self, relevance_score, adjusted_risk_level, assessment) -> float:
+        """User adjusts the risk level — proportional correction."""
+        if not adjusted_risk_level or not assessment:
+            return 0.0
+        original_level = _RISK_LEVELS.get(assessment.risk_level, 0)
+        adjusted_level = _RISK_LEVELS.get(adjusted_risk_level, 0)
+        return round((adjusted_level - original_level) * self.ADJUST_FACTOR, 4)
+
+    async def get_user_feedback_stats(self, db: AsyncSession, user_id: str) -> dict:
         """Get feedback statistics for a user — used for model calibration."""
-        feedbacks = db.query(Feedback).filter(Feedback.user_id == user_id).all()
-
-        if not feedbacks:
+        total, confirms, avg_relevance, net_adjustment = (await db.execute(
+            select(
+                func.count(Feedback.id),
+                func.sum(case((Feedback.feedback_type == "confirm", 1), else_=0)),
+                func.avg(Feedback.relevance_score),
+                func.coalesce(func.sum(Feedback.confidence_adjustment), 0.0),
+            ).where(Feedback.user_id == user_id)
+        )).one()
+
+        if not total:
             return {"total": 0, "confirm_rate": 0.0, "avg_relevance": 0.0, "net_adjustment": 0.0}
 
-        total = len(feedbacks)
-        confirms = sum(1 for f in feedbacks if f.feedback_type == "confirm")
-        relevance_scores = [f.relevance_score for f in feedbacks if f.relevance_score]
-        adjustments = [f.confidence_adjustment for f in feedbacks if f.confidence_adjustment]
-
         return {
             "total": total,
-            "confirm_rate": round(confirms / total, 3) if total else 0.0,
-            "avg_relevance": round(sum(relevance_scores) / len(relevance_scores), 2) if relevance_scores else 0.0,
-            "net_adjustment": round(sum(adjustments), 4) if adjustments else 0.0,
+            "confirm_rate": round(confirms / total, 3),
+            "avg_relevance": round(float(avg_relevance), 2) if avg_relevance is not None else 0.0,
+            "net_adjustment": round(float(net_adjustment), 4),
         }
 
 
@@ -6,12 +6,17 @@ Pro Model:  Deep analysis of symptom patterns, risk explanations, lifestyle corr
 Flash Model: Quick daily tips, mood-based suggestions, instant feedback
 """
 
+import hashlib
 import logging
-import json
+from collections.abc import AsyncIterator
 from typing import Optional
+
+import orjson
 from google import genai
 from google.genai import types
-from app.config import settings
+
+from app.cache import cache
+from app.config import get_settings
 
 logger = logging.getLogger(__name__)
 
@@ -55,33 +60,50 @@ Never diagnose. Use emojis. Respond in JSON:
   "encouragement": "brief motivational note"
 }"""
 
+# Identical prompts reuse a cached completion for this long
+PRO_CACHE_TTL_SECONDS = 1800
+FLASH_CACHE_TTL_SECONDS = 300
+
+
+def _round_floats(value, ndigits: int = 3):
+    """Recursively round floats in a parsed completion; display never needs more precision."""
+    if isinstance(value, float):
+        return round(value, ndigits)
+    if isinstance(value, dict):
+        return {k: _round_floats(v, ndigits) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_round_floats(v, ndigits) for v in value]
+    return value
+
+
+def _prompt_cache_key(tier: str, system_prompt: str, prompt: str, model: str) -> str:
+    digest = hashlib.sha256(f"{system_prompt}\0{prompt}\0{model}".encode()).hexdigest()
+    return f"gemini:{tier}:{digest}"
+
 
 class GeminiService:
     """Manages Gemini Pro and Flash API calls for health insights."""
 
     def __init__(self):
         self.client = None
-        self._initialized = False
 
-    def _ensure_initialized(self):
-        """Lazy initialization of the Gemini client."""
-        if self._initialized:
+    def initialize(self):
+        """Create the Gemini client (called once from the app lifespan)."""
+        if self.client is not None:
             return
 
-        if not settings.GEMINI_API_KEY:
+        if not get_settings().GEMINI_API_KEY:
             logger.warning("GEMINI_API_KEY not set — AI insights will be unavailable")
             return
 
         try:
-            self.client = genai.Client(api_key=settings.GEMINI_API_KEY)
-            self._initialized = True
+            self.client = genai.Client(api_key=get_settings().GEMINI_API_KEY)
             logger.info("Gemini AI client initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize Gemini client: {e}")
 
     def is_available(self) -> bool:
         """Check if Gemini service is configured and available."""
-        self._ensure_initialized()
         return self.client is not None
 
     async def analyze_health_patterns(
@@ -93,29 +115,25 @@ class GeminiService:
         Deep analysis using Gemini Pro.
         Analyzes multi-day health data for pattern detection.
         """
-        self._ensure_initialized()
-        if not self.client:
+        if self.client is None:
             return self._fallback_analysis(health_data)
 
         prompt = self._build_analysis_prompt(health_data, user_context)
+        model = get_settings().GEMINI_PRO_MODEL
+        key = _prompt_cache_key("pro", SYSTEM_PROMPT_PRO, prompt, model)
 
         try:
-            response = self.client.models.generate_content(
-                model=settings.GEMINI_PRO_MODEL,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    system_instruction=SYSTEM_PROMPT_PRO,
-                    temperature=0.7,
-                    max_output_tokens=1024,
-                    response_mime_type="application/json",
-                ),
-            )
-
-            result = json.loads(response.text)
+            cached = await cache.get(key)
+            if cached is not None:
+                result = orjson.loads(cached)
+            else:
+                text = await self._generate_pro(prompt, model)
+                result = _round_floats(orjson.loads(text))  # only cache completions that parse
+                await cache.setex(key, PRO_CACHE_TTL_SECONDS, orjson.dumps(result))
             logger.info("Gemini Pro analysis completed successfully")
             return {
                 "source": "gemini-pro",
-                "model": settings.GEMINI_PRO_MODEL,
+                "model": model,
                 "analysis": result,
                 "success": True,
             }
@@ -124,34 +142,92 @@ class GeminiService:
             logger.error(f"Gemini Pro analysis failed: {e}")
             return self._fallback_analysis(health_data)
 
+    async def _generate_pro(self, prompt: str, model: str) -> str:
+        """Call Gemini Pro and return the raw JSON text."""
+        response = await self.client.aio.models.generate_content(
+            model=model,
+            contents=prompt,
+            config=self._pro_config(),
+        )
+        return response.text
+
+    @staticmethod
+    def _pro_config() -> types.GenerateContentConfig:
+        return types.GenerateContentConfig(
+            system_instruction=SYSTEM_PROMPT_PRO,
+            temperature=0.7,
+            max_output_tokens=1024,
+            response_mime_type="application/json",
+        )
+
+    async def stream_health_patterns(
+        self,
+        health_data: dict,
+        user_context: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Streaming variant of analyze_health_patterns.
+        Yields raw JSON text fragments from Gemini Pro as they arrive.
+        """
+        if self.client is None:
+            yield orjson.dumps(self._fallback_analysis(health_data)["analysis"]).decode()
+            return
+
+        prompt = self._build_analysis_prompt(health_data, user_context)
+        model = get_settings().GEMINI_PRO_MODEL
+        key = _prompt_cache_key("pro", SYSTEM_PROMPT_PRO, prompt, model)
+
+        cached = await cache.get(key)
+        if cached is not None:
+            yield cached.decode() if isinstance(cached, bytes) else cached
+            return
+
+        try:
+            stream = await self.client.aio.models.generate_content_stream(
+                model=model,
+                contents=prompt,
+                config=self._pro_config(),
+            )
+            fragments = []
+            async for chunk in stream:
+                if chunk.text:
+                    fragments.append(chunk.text)
+                    yield chunk.text
+        except Exception as e:
+            logger.error(f"Gemini Pro streaming analysis failed: {e}")
+            raise
+
+        # Share complete, well-formed results with the buffered endpoint
+        try:
+            result = _round_floats(orjson.loads("".join(fragments)))
+        except ValueError:
+            return
+        await cache.setex(key, PRO_CACHE_TTL_SECONDS, orjson.dumps(result))
+
     async def get_quick_tip(self, daily_log: dict) -> dict:
         """
         Quick response using Gemini Flash.
         Provides instant feedback on a single daily log entry.
         """
-        self._ensure_initialized()
-        if not self.client:
+        if self.client is None:
             return self._fallback_tip(daily_log)
 
         prompt = self._build_tip_prompt(daily_log)
+        model = get_settings().GEMINI_FLASH_MODEL
+        key = _prompt_cache_key("flash", SYSTEM_PROMPT_FLASH, prompt, model)
 
         try:
-            response = self.client.models.generate_content(
-                model=settings.GEMINI_FLASH_MODEL,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    system_instruction=SYSTEM_PROMPT_FLASH,
-                    temperature=0.8,
-                    max_output_tokens=300,
-                    response_mime_type="application/json",
-                ),
-            )
-
-            result = json.loads(response.text)
+            cached = await cache.get(key)
+            if cached is not None:
+                result = orjson.loads(cached)
+            else:
+                text = await self._generate_flash(prompt, model)
+                result = _round_floats(orjson.loads(text))  # only cache completions that parse
+                await cache.setex(key, FLASH_CACHE_TTL_SECONDS, orjson.dumps(result))
             logger.info("Gemini Flash tip generated successfully")
             return {
                 "source": "gemini-flash",
-                "model": settings.GEMINI_FLASH_MODEL,
+                "model": model,
                 "tip": result,
                 "success": True,
             }
@@ -160,6 +236,20 @@ class GeminiService:
             logger.error(f"Gemini Flash tip failed: {e}")
             return self._fallback_tip(daily_log)
 
+    async def _generate_flash(self, prompt: str, model: str) -> str:
+        """Call Gemini Flash and return the raw JSON text."""
+        response = await self.client.aio.models.generate_content(
+            model=model,
+            contents=prompt,
+            config=types.GenerateContentConfig(
+                system_instruction=SYSTEM_PROMPT_FLASH,
+                temperature=0.8,
+                max_output_tokens=300,
+                response_mime_type="application/json",
+            ),
+        )
+        return response.text
+
     # ─── Prompt Builders ──────────────────────────────
 
     def _build_analysis_prompt(self, health_data: dict, user_context: Optional[str]) -> str:
@@ -169,15 +259,17 @@ class GeminiService:
         if "inputs" in health_data:
             parts.append("## Daily Logs")
             for entry in health_data["inputs"][-7:]:  # Last 7 days
-                parts.append(f"- Date: {entry.get('created_at', 'unknown')}")
-                if entry.get("free_text_input"):
-                    parts.append(f"  Text: \"{entry['free_text_input']}\"")
-                if entry.get("selected_symptoms"):
-                    parts.append(f"  Symptoms: {', '.join(entry['selected_symptoms'])}")
-                if entry.get("daily_metrics"):
-                    metrics = entry["daily_metrics"]
-                    parts.append(f"  Metrics: sleep={metrics.get('sleep_hours', '?')}h, mood={metrics.get('mood_score', '?')}/10, energy={metrics.get('energy_level', '?')}/10, stress={metrics.get('stress_level', '?')}/10")
-                parts.append("")
+                text = entry.get("free_text_input")
+                symptoms = entry.get("selected_symptoms")
+                m = entry.get("daily_metrics")
+                text_line = f'\n  Text: "{text}"' if text else ""
+                symptoms_line = f"\n  Symptoms: {', '.join(symptoms)}" if symptoms else ""
+                metrics_line = (
+                    f"\n  Metrics: sleep={m.get('sleep_hours', '?')}h, mood={m.get('mood_score', '?')}/10, "
+                    f"energy={m.get('energy_level', '?')}/10, stress={m.get('stress_level', '?')}/10"
+                ) if m else ""
+                # One block per entry; the trailing newline leaves a blank line between entries
+                parts.append(f"- Date: {entry.get('created_at', 'unknown')}{text_line}{symptoms_line}{metrics_line}\n")
 
         if "assessment" in health_data:
             a = health_data["assessment"]
@@ -3,14 +3,116 @@ Inference Service — orchestrates ML models for risk assessment.
 Combines NLP weak signal detection, time-series anomaly detection, and fusion classification.
 """
 
+import copy
+import hashlib
+import logging
+import operator
+import threading
 import time
 import uuid
-import logging
-from typing import Optional
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+from typing import Optional, TypedDict
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+
+
+class _KeywordMatcher:
+    """Finds which of a fixed set of lowercase keywords occur in a text, ignoring case.
+
+    Uses a single Aho-Corasick scan when pyahocorasick is installed,
+    otherwise falls back to one substring check per keyword.
+    """
+
+    def __init__(self, keywords):
+        self._keywords = tuple(keyword.lower() for keyword in keywords)
+        self._automaton = None
+        if HAS_AHOCORASICK:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in self._keywords:
+                self._automaton.add_word(keyword, keyword)
+            self._automaton.make_automaton()
+
+    @staticmethod
+    def _fold(text: str) -> str:
+        # islower() stops at the first uppercase character and allocates nothing,
+        # so already-lowercase input (e.g. sanitized emoji tokens) is scanned as is
+        return text if text.islower() else text.lower()
+
+    def find(self, text: str) -> set[str]:
+        """Return the keywords that occur in text."""
+        text = self._fold(text)
+        if self._automaton is None:
+            return {keyword for keyword in self._keywords if keyword in text}
+        return {keyword for _, keyword in self._automaton.iter(text)}
+
+    def contains_any(self, text: str) -> bool:
+        """Return True if any keyword occurs in text."""
+        text = self._fold(text)
+        if self._automaton is None:
+            return any(keyword in text for keyword in self._keywords)
+        return next(self._automaton.iter(text), None) is not None
+
+
+# Risk levels in ascending order and the score at which each level after LOW starts
+_RISK_LEVEL_NAMES = ("LOW", "WEAK", "MODERATE", "HIGH")
+_RISK_LEVEL_BOUNDS = (0.25, 0.50, 0.75)
+
+# Fusion weights (NLP: 0.55, TimeSeries: 0.45)
+_NLP_WEIGHT = 0.55
+_TS_WEIGHT = 0.45
+
+
+# Daily metric threshold ladder: per metric, the first matching (compare, threshold, weight, message) wins.
+# The comparisons are operator functions so they apply equally to scalars and NumPy arrays.
+_DAILY_METRIC_RULES = (
+    ("sleep_hours", (
+        (operator.lt, 4, 0.7, "Critically low sleep: {}h (< 4h)"),
+        (operator.lt, 6, 0.4, "Below-average sleep: {}h (< 6h)"),
+        (operator.gt, 12, 0.5, "Excessive sleep: {}h (> 12h)"),
+    )),
+    ("mood_score", (
+        (operator.le, 2, 0.6, "Very low mood score: {}/10"),
+        (operator.le, 4, 0.35, "Low mood score: {}/10"),
+    )),
+    ("energy_level", (
+        (operator.le, 3, 0.4, "Low energy level: {}/10"),
+    )),
+    ("stress_level", (
+        (operator.ge, 8, 0.5, "High stress level: {}/10"),
+    )),
+)
+
+
+# Per-entry float64 layout of the daily metrics above, used by the vectorized batch scorer
+# (float64 keeps threshold comparisons identical to the scalar path; NaN marks a missing value)
+DAILY_METRICS_DTYPE = np.dtype([(key, np.float64) for key, _ in _DAILY_METRIC_RULES])
+
+
+class DailyMetricsDict(TypedDict, total=False):
+    """Daily metric fields read by the time-series analysis (all optional)."""
+    sleep_hours: Optional[float]
+    mood_score: Optional[int]
+    energy_level: Optional[int]
+    stress_level: Optional[int]
+    steps_count: Optional[int]
+
+
+def _fuse_scores(nlp_score: float, ts_score: float) -> tuple[float, int]:
+    """Weighted fusion of the two model scores; returns (combined_score, risk level index)."""
+    combined = round(min(nlp_score * _NLP_WEIGHT + ts_score * _TS_WEIGHT, 1.0), 3)
+    return combined, bisect_right(_RISK_LEVEL_BOUNDS, combined)
+
 
 class InferenceService:
     """
@@ -20,14 +122,6 @@ class InferenceService:
     3. FusionClassifier → aggregate into risk levels
     """
 
-    # Risk level thresholds
-    RISK_THRESHOLDS = {
-        "LOW": (0.0, 0.25),
-        "WEAK": (0.25, 0.50),
-        "MODERATE": (0.50, 0.75),
-        "HIGH": (0.75, 1.0),
-    }
-
     # Symptom keywords for rule-based fallback
     HIGH_CONCERN_KEYWORDS = [
         "chest pain", "shortness of breath", "severe headache",
@@ -41,11 +135,41 @@ class InferenceService:
         "depressed", "dizzy", "nausea", "fever"
     ]
 
+    # Frequency/duration language
+    FREQUENCY_PATTERNS = ["every day", "keeps happening", "won't go away", "for weeks", "getting worse"]
+
+    NEGATIVE_EMOJIS = [
+        "nauseated face", "face with thermometer", "sneezing face",
+        "dizzy", "anxious face", "crying face", "tired face",
+        "sleeping face", "confounded face", "weary face",
+    ]
+
+    # Checkbox categories (already normalized by the sanitizer)
+    HIGH_CONCERN_CHECKS = frozenset({"chest_pain", "shortness_of_breath", "heart_palpitations"})
+    MODERATE_CONCERN_CHECKS = frozenset({"headache", "fatigue", "insomnia", "anxiety", "dizziness"})
+
+    RESULT_CACHE_SIZE = 4096  # memoized assess_risk results
+    PARALLEL_BATCH_MIN = 256  # smaller batches are not worth the process start-up cost
+
     def __init__(self):
+        # keyword -> (message, weight, is persistence indicator), in the order signals are emitted:
+        # high concern, then moderate concern, then frequency language
+        self._text_rules = {
+            **{k: (f"High-concern symptom mentioned: '{k}'", 0.8, False) for k in self.HIGH_CONCERN_KEYWORDS},
+            **{k: (f"Notable symptom mentioned: '{k}'", 0.5, False) for k in self.MODERATE_CONCERN_KEYWORDS},
+            **{k: (f"Persistence indicator detected: '{k}'", 0.4, True) for k in self.FREQUENCY_PATTERNS},
+        }
+        self._text_rank = {k: i for i, k in enumerate(self._text_rules)}
+        # One automaton over every text keyword
+        self._text_matcher = _KeywordMatcher(self._text_rules)
+        self._emoji_matcher = _KeywordMatcher(self.NEGATIVE_EMOJIS)
         self._nlp_model = None
         self._timeseries_model = None
         self._fusion_model = None
         self._loaded = False
+        # Content key -> assessment result, least recently used first
+        self._result_cache: OrderedDict[tuple, dict] = OrderedDict()
+        self._result_cache_lock = threading.Lock()
 
     def _ensure_models_loaded(self):
         """Lazy-load models on first inference call."""
@@ -58,8 +182,8 @@ class InferenceService:
         symptom_text: Optional[str],
         emoji_inputs: list,
         checkbox_selections: list,
-        daily_metrics: Optional[dict],
-        historical_metrics: Optional[list] = None,
+        daily_metrics: Optional[DailyMetricsDict],
+        historical_metrics: Optional[list[DailyMetricsDict]] = None,
     ) -> dict:
         """
         Run full inference pipeline and return risk assessment.
@@ -70,14 +194,28 @@ class InferenceService:
         start_time = time.time()
         self._ensure_models_loaded()
 
-        # Step 1: NLP Signal Detection
-        nlp_signals = self._analyze_text_signals(symptom_text, emoji_inputs, checkbox_selections)
+        key = self._cache_key(symptom_text, emoji_inputs, checkbox_selections, daily_metrics, historical_metrics)
+        with self._result_cache_lock:
+            cached = self._result_cache.get(key)
+            if cached is not None:
+                self._result_cache.move_to_end(key)
+
+        if cached is not None:
+            result = copy.deepcopy(cached)
+        else:
+            # Step 1: NLP Signal Detection
+            nlp_signals = self._analyze_text_signals(symptom_text, emoji_inputs, checkbox_selections)
+
+            # Step 2: Time-Series Anomaly Detection
+            ts_signals = self._analyze_timeseries_signals(daily_metrics, historical_metrics)
 
-        # Step 2: Time-Series Anomaly Detection
-        ts_signals = self._analyze_timeseries_signals(daily_metrics, historical_metrics)
+            # Step 3: Fusion Classification
+            result = self._fuse_signals(nlp_signals, ts_signals)
 
-        # Step 3: Fusion Classification
-        result = self._fuse_signals(nlp_signals, ts_signals)
+            with self._result_cache_lock:
+                self._result_cache[key] = copy.deepcopy(result)
+                if len(self._result_cache) > self.RESULT_CACHE_SIZE:
+                    self._result_cache.popitem(last=False)
 
         inference_time_ms = (time.time() - start_time) * 1000
         result["inference_time_ms"] = round(inference_time_ms, 2)
@@ -90,6 +228,19 @@ class InferenceService:
 
         return result
 
+    @staticmethod
+    def _cache_key(symptom_text, emoji_inputs, checkbox_selections, daily_metrics, historical_metrics) -> tuple:
+        """Canonical key covering everything the rule-based pipeline reads."""
+        return (
+            hashlib.sha256(symptom_text.encode()).digest() if symptom_text else None,
+            tuple(emoji_inputs),
+            tuple(checkbox_selections),
+            tuple(sorted(daily_metrics.items())) if daily_metrics else None,
+            # Trend detection only looks at mood and sleep history
+            tuple((m.get("mood_score"), m.get("sleep_hours")) for m in historical_metrics)
+            if historical_metrics else None,
+        )
+
     def _analyze_text_signals(
         self,
         symptom_text: Optional[str],
@@ -101,196 +252,169 @@ class InferenceService:
         Prototype: rule-based keyword analysis + attention simulation.
         Production: DistilBERT fine-tuned model.
         """
-        signals = []
+        # Parallel arrays (signal text, weight) instead of one dict per signal
+        texts: list[str] = []
+        weights: list[float] = []
         score = 0.0
 
         # Analyze symptom text
         if symptom_text:
-            text_lower = symptom_text.lower()
-
-            # High concern keywords
-            for keyword in self.HIGH_CONCERN_KEYWORDS:
-                if keyword in text_lower:
-                    signals.append({
-                        "signal": f"High-concern symptom mentioned: '{keyword}'",
-                        "weight": 0.8,
-                        "category": "nlp",
-                    })
-                    score = max(score, 0.8)
-
-            # Moderate concern keywords
-            for keyword in self.MODERATE_CONCERN_KEYWORDS:
-                if keyword in text_lower:
-                    signals.append({
-                        "signal": f"Notable symptom mentioned: '{keyword}'",
-                        "weight": 0.5,
-                        "category": "nlp",
-                    })
-                    score = max(score, 0.5)
-
-            # Check for frequency/duration language
-            frequency_patterns = ["every day", "keeps happening", "won't go away", "for weeks", "getting worse"]
-            for pattern in frequency_patterns:
-                if pattern in text_lower:
-                    signals.append({
-                        "signal": f"Persistence indicator detected: '{pattern}'",
-                        "weight": 0.4,
-                        "category": "nlp",
-                    })
-                    score = min(score + 0.15, 1.0)
+            # Only the keywords actually found are visited (usually none), in rule order
+            for keyword in sorted(self._text_matcher.find(symptom_text), key=self._text_rank.__getitem__):
+                message, weight, persistence = self._text_rules[keyword]
+                texts.append(message)
+                weights.append(weight)
+                score = min(score + 0.15, 1.0) if persistence else max(score, weight)
 
         # Analyze emoji signals
-        negative_emojis = ["nauseated face", "face with thermometer", "sneezing face",
-                          "dizzy", "anxious face", "crying face", "tired face",
-                          "sleeping face", "confounded face", "weary face"]
         for e in emoji_inputs:
-            if any(neg in e.lower() for neg in negative_emojis):
-                signals.append({
-                    "signal": f"Negative health emoji: '{e}'",
-                    "weight": 0.3,
-                    "category": "nlp",
-                })
+            if self._emoji_matcher.contains_any(e):
+                texts.append(f"Negative health emoji: '{e}'")
+                weights.append(0.3)
                 score = min(score + 0.1, 1.0)
 
         # Analyze checkbox selections
-        high_concern_checks = ["chest_pain", "shortness_of_breath", "heart_palpitations"]
-        moderate_concern_checks = ["headache", "fatigue", "insomnia", "anxiety", "dizziness"]
-
         for check in checkbox_selections:
-            if check in high_concern_checks:
-                signals.append({
-                    "signal": f"Critical symptom selected: {check.replace('_', ' ')}",
-                    "weight": 0.7,
-                    "category": "nlp",
-                })
+            if check in self.HIGH_CONCERN_CHECKS:
+                texts.append(f"Critical symptom selected: {check.replace('_', ' ')}")
+                weights.append(0.7)
                 score = max(score, 0.7)
-            elif check in moderate_concern_checks:
-                signals.append({
-                    "signal": f"Symptom selected: {check.replace('_', ' ')}",
-                    "weight": 0.4,
-                    "category": "nlp",
-                })
+            elif check in self.MODERATE_CONCERN_CHECKS:
+                texts.append(f"Symptom selected: {check.replace('_', ' ')}")
+                weights.append(0.4)
                 score = max(score, 0.4)
 
-        if not signals:
-            signals.append({
-                "signal": "No concerning patterns detected in text inputs",
-                "weight": 0.0,
-                "category": "nlp",
-            })
+        if not texts:
+            texts.append("No concerning patterns detected in text inputs")
+            weights.append(0.0)
 
-        return {"signals": signals, "score": round(score, 3)}
+        return {"texts": texts, "weights": weights, "score": round(score, 3)}
 
     def _analyze_timeseries_signals(
         self,
-        daily_metrics: Optional[dict],
-        historical_metrics: Optional[list] = None,
+        daily_metrics: Optional[DailyMetricsDict],
+        historical_metrics: Optional[list[DailyMetricsDict]] = None,
     ) -> dict:
         """
         Time-series anomaly detection from daily metrics.
         Prototype: statistical baseline with Z-score detection.
         Production: LSTM + statistical baseline.
         """
-        signals = []
+        # Parallel arrays (signal text, weight) instead of one dict per signal
+        texts: list[str] = []
+        weights: list[float] = []
         score = 0.0
 
         if not daily_metrics:
-            return {"signals": [{"signal": "No daily metrics provided", "weight": 0.0, "category": "timeseries"}], "score": 0.0}
-
-        # Sleep analysis
-        sleep = daily_metrics.get("sleep_hours")
-        if sleep is not None:
-            if sleep < 4:
-                signals.append({"signal": f"Critically low sleep: {sleep}h (< 4h)", "weight": 0.7, "category": "timeseries"})
-                score = max(score, 0.7)
-            elif sleep < 6:
-                signals.append({"signal": f"Below-average sleep: {sleep}h (< 6h)", "weight": 0.4, "category": "timeseries"})
-                score = max(score, 0.4)
-            elif sleep > 12:
-                signals.append({"signal": f"Excessive sleep: {sleep}h (> 12h)", "weight": 0.5, "category": "timeseries"})
-                score = max(score, 0.5)
-
-        # Mood analysis
-        mood = daily_metrics.get("mood_score")
-        if mood is not None:
-            if mood <= 2:
-                signals.append({"signal": f"Very low mood score: {mood}/10", "weight": 0.6, "category": "timeseries"})
-                score = max(score, 0.6)
-            elif mood <= 4:
-                signals.append({"signal": f"Low mood score: {mood}/10", "weight": 0.35, "category": "timeseries"})
-                score = max(score, 0.35)
-
-        # Energy analysis
-        energy = daily_metrics.get("energy_level")
-        if energy is not None and energy <= 3:
-            signals.append({"signal": f"Low energy level: {energy}/10", "weight": 0.4, "category": "timeseries"})
-            score = max(score, 0.4)
-
-        # Stress analysis
-        stress = daily_metrics.get("stress_level")
-        if stress is not None and stress >= 8:
-            signals.append({"signal": f"High stress level: {stress}/10", "weight": 0.5, "category": "timeseries"})
-            score = max(score, 0.5)
+            return {"texts": ["No daily metrics provided"], "weights": [0.0], "score": 0.0}
+
+        get = daily_metrics.get
+        for key, rules in _DAILY_METRIC_RULES:
+            value = get(key)
+            if value is None:
+                continue
+            for compare, threshold, weight, message in rules:
+                if compare(value, threshold):
+                    texts.append(message.format(value))
+                    weights.append(weight)
+                    score = max(score, weight)
+                    break
 
         # Historical trend analysis (if historical data available)
         if historical_metrics and len(historical_metrics) >= 3:
             # Check for declining trends
-            moods = [m.get("mood_score") for m in historical_metrics if m.get("mood_score")]
-            if len(moods) >= 3:
-                recent_avg = sum(moods[-3:]) / 3
-                overall_avg = sum(moods) / len(moods)
+            moods = self._recent_and_overall(historical_metrics, "mood_score")
+            if moods is not None:
+                recent_avg, overall_avg = moods
                 if recent_avg < overall_avg * 0.7:
-                    signals.append({
-                        "signal": f"Declining mood trend detected (recent avg: {recent_avg:.1f} vs overall: {overall_avg:.1f})",
-                        "weight": 0.6,
-                        "category": "timeseries",
-                    })
+                    texts.append(f"Declining mood trend detected (recent avg: {recent_avg:.1f} vs overall: {overall_avg:.1f})")
+                    weights.append(0.6)
                     score = max(score, 0.6)
 
-            sleeps = [m.get("sleep_hours") for m in historical_metrics if m.get("sleep_hours")]
-            if len(sleeps) >= 3:
-                recent_avg = sum(sleeps[-3:]) / 3
-                overall_avg = sum(sleeps) / len(sleeps)
+            sleeps = self._recent_and_overall(historical_metrics, "sleep_hours")
+            if sleeps is not None:
+                recent_avg, overall_avg = sleeps
                 if recent_avg < overall_avg * 0.75:
-                    signals.append({
-                        "signal": f"Declining sleep trend detected (recent avg: {recent_avg:.1f}h vs overall: {overall_avg:.1f}h)",
-                        "weight": 0.55,
-                        "category": "timeseries",
-                    })
+                    texts.append(f"Declining sleep trend detected (recent avg: {recent_avg:.1f}h vs overall: {overall_avg:.1f}h)")
+                    weights.append(0.55)
                     score = max(score, 0.55)
 
-        if not signals:
-            signals.append({"signal": "Daily metrics within normal range", "weight": 0.0, "category": "timeseries"})
+        if not texts:
+            texts.append("Daily metrics within normal range")
+            weights.append(0.0)
+
+        return {"texts": texts, "weights": weights, "score": round(score, 3)}
 
-        return {"signals": signals, "score": round(score, 3)}
+    def assess_risk_batch(self, inputs: list[dict], max_workers: Optional[int] = None) -> list[dict]:
+        """
+        Run assess_risk for many independent inputs (assess_risk keyword dicts), in order.
+        Large batches fan out across worker processes, since the pipeline is CPU-bound Python.
+        """
+        if len(inputs) < self.PARALLEL_BATCH_MIN:
+            return [self.assess_risk(**kwargs) for kwargs in inputs]
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_batch_worker) as pool:
+            return list(pool.map(_assess_in_worker, inputs, chunksize=32))
+
+    def batch_timeseries_scores(self, daily_metrics: list[DailyMetricsDict] | np.ndarray) -> np.ndarray:
+        """
+        Vectorized daily-metric score for many entries at once (bulk re-scoring jobs).
+        Applies the same threshold ladder as _analyze_timeseries_signals, minus the
+        history-dependent trend checks. Accepts metric dicts or an array of DAILY_METRICS_DTYPE.
+        """
+        if isinstance(daily_metrics, np.ndarray):
+            rows = daily_metrics
+        else:
+            keys = DAILY_METRICS_DTYPE.names
+            rows = np.fromiter(
+                (tuple(np.nan if m.get(key) is None else m[key] for key in keys) for m in daily_metrics),
+                dtype=DAILY_METRICS_DTYPE,
+                count=len(daily_metrics),
+            )
+
+        # NaN compares False everywhere, so missing metrics contribute nothing
+        scores = np.zeros(len(rows))
+        for key, rules in _DAILY_METRIC_RULES:
+            values = rows[key]
+            conditions = [compare(values, threshold) for compare, threshold, _, _ in rules]
+            scores = np.maximum(scores, np.select(conditions, [weight for _, _, weight, _ in rules], default=0.0))
+        return np.round(scores, 3)
+
+    @staticmethod
+    def _recent_and_overall(historical_metrics: list, key: str) -> Optional[tuple[float, float]]:
+        """Mean of the last 3 recorded values and of all of them; None with fewer than 3."""
+        values = np.fromiter(
+            (m.get(key) or np.nan for m in historical_metrics),  # missing/zero entries are skipped
+            dtype=np.float64,
+            count=len(historical_metrics),
+        )
+        values = values[~np.isnan(values)]
+        if values.size < 3:
+            return None
+        return float(values[-3:].mean()), float(values.mean())
 
     def _fuse_signals(self, nlp_signals: dict, ts_signals: dict) -> dict:
         """
         Fusion classifier: combine NLP and time-series signals.
         Weighted ensemble with attention-based explanation generation.
         """
-        # Weighted fusion (NLP: 0.55, TimeSeries: 0.45)
-        nlp_weight = 0.55
-        ts_weight = 0.45
-        combined_score = (nlp_signals["score"] * nlp_weight) + (ts_signals["score"] * ts_weight)
-        combined_score = round(min(combined_score, 1.0), 3)
-
-        # Determine risk level
-        risk_level = "LOW"
-        for level, (low, high) in self.RISK_THRESHOLDS.items():
-            if low <= combined_score < high:
-                risk_level = level
-                break
-        if combined_score >= 1.0:
-            risk_level = "HIGH"
+        combined_score, level_index = _fuse_scores(nlp_signals["score"], ts_signals["score"])
+        risk_level = _RISK_LEVEL_NAMES[level_index]
 
         # Generate human-readable explanation
         explanation = self._generate_explanation(risk_level, nlp_signals, ts_signals, combined_score)
 
-        # Combine all signal details
-        all_signals = nlp_signals["signals"] + ts_signals["signals"]
-        # Sort by weight descending
-        all_signals.sort(key=lambda s: s["weight"], reverse=True)
+        # Combine all signal details; stable sort by weight descending, dicts built for the top 10 only
+        texts = nlp_signals["texts"] + ts_signals["texts"]
+        weights = np.array(nlp_signals["weights"] + ts_signals["weights"])
+        n_nlp = len(nlp_signals["texts"])
+        top_signals = [
+            {
+                "signal": texts[i],
+                "weight": float(weights[i]),
+                "category": "nlp" if i < n_nlp else "timeseries",
+            }
+            for i in np.argsort(-weights, kind="stable")[:10]
+        ]
 
         return {
             "risk_level": risk_level,
@@ -300,7 +424,7 @@ class InferenceService:
                 "nlp_score": nlp_signals["score"],
                 "timeseries_score": ts_signals["score"],
                 "combined_score": combined_score,
-                "signals": all_signals[:10],  # Top 10 signals
+                "signals": top_signals,  # Top 10 signals
             },
             "model_version": "v0.1.0-prototype",
         }
@@ -318,14 +442,14 @@ class InferenceService:
         base_explanation = explanations.get(risk_level, explanations["LOW"])
 
         # Add specific signal context
-        top_nlp = [s for s in nlp_signals["signals"] if s["weight"] > 0.3]
-        top_ts = [s for s in ts_signals["signals"] if s["weight"] > 0.3]
+        top_nlp = np.count_nonzero(np.asarray(nlp_signals["weights"]) > 0.3)
+        top_ts = np.count_nonzero(np.asarray(ts_signals["weights"]) > 0.3)
 
         details = []
         if top_nlp:
-            details.append(f"Your symptom descriptions raised {len(top_nlp)} notable signal(s)")
+            details.append(f"Your symptom descriptions raised {top_nlp} notable signal(s)")
         if top_ts:
-            details.append(f"Your daily metrics showed {len(top_ts)} pattern change(s)")
+            details.append(f"Your daily metrics showed {top_ts} pattern change(s)")
 
         if details:
             base_explanation += " " + ". ".join(details) + "."
@@ -333,5 +457,14 @@ class InferenceService:
         return base_explanation
 
 
+def _init_batch_worker():
+    """Load models (and build the keyword automatons) once per worker process."""
+    inference_service._ensure_models_loaded()
+
+
+def _assess_in_worker(kwargs: dict) -> dict:
+    return inference_service.assess_risk(**kwargs)
+
+
 # Singleton instance
 inference_service = InferenceService()
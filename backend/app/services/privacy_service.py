@@ -3,25 +3,34 @@ Privacy Service — GDPR-compliant data management.
 Handles consent management, data export, anonymization, and retention.
 """
 
-import uuid
 import logging
-from datetime import datetime, timedelta
+import uuid
+from collections.abc import Iterator
+from datetime import timedelta
+
+import orjson
+from sqlalchemy import delete, select, text
 from sqlalchemy.orm import Session
-from app.models.user import User
+from sqlalchemy.sql import func
+
+from app.config import get_settings
+from app.database import SessionLocal, utc_now
+from app.models.feedback import Feedback
 from app.models.health_input import HealthInput
 from app.models.risk_assessment import RiskAssessment
-from app.models.feedback import Feedback
-from app.config import settings
+from app.models.user import User
 
 logger = logging.getLogger(__name__)
 
+_RISK_LEVELS = ("LOW", "WEAK", "MODERATE", "HIGH")
+
 
 class PrivacyService:
     """Manages user privacy, GDPR compliance, and data lifecycle."""
 
     def update_consent(self, db: Session, user_id: str, consent_data: dict) -> User:
         """Update user consent preferences."""
-        user = db.query(User).filter(User.id == user_id).first()
+        user = db.get(User, user_id)
         if not user:
             raise ValueError(f"User {user_id} not found")
 
@@ -29,88 +38,101 @@ class PrivacyService:
         user.consent_ml_usage = consent_data.get("consent_ml_usage", user.consent_ml_usage)
         user.consent_anonymized_research = consent_data.get("consent_anonymized_research", user.consent_anonymized_research)
         user.consent_wearable_data = consent_data.get("consent_wearable_data", user.consent_wearable_data)
-        user.consent_given_at = datetime.utcnow()
+        user.consent_given_at = func.now()
 
         if "data_retention_days" in consent_data:
             user.data_retention_days = str(consent_data["data_retention_days"])
 
         db.commit()
-        db.refresh(user)
         logger.info(f"Consent updated for user {user_id}")
         return user
 
-    def export_user_data(self, db: Session, user_id: str) -> dict:
-        """Export all user data (GDPR right of access / data portability)."""
-        user = db.query(User).filter(User.id == user_id).first()
+    # Columns exported per section, in output order
+    _EXPORT_SECTIONS = (
+        ("health_inputs", HealthInput, (
+            "id", "created_at", "symptom_text", "emoji_inputs", "checkbox_selections",
+            "sleep_hours", "mood_score", "energy_level", "stress_level", "steps_count",
+        )),
+        ("risk_assessments", RiskAssessment, (
+            "id", "created_at", "risk_level", "confidence_score", "explanation_text",
+        )),
+        ("feedback", Feedback, (
+            "id", "created_at", "feedback_type", "relevance_score", "comment",
+        )),
+    )
+    EXPORT_BATCH_SIZE = 1000
+
+    def export_user_data(self, user_id: str) -> Iterator[bytes]:
+        """Export all user data (GDPR right of access / data portability).
+
+        Returns an iterator of JSON fragments that together form the export
+        document, so long histories are streamed in batches instead of being
+        materialized in memory. The iterator owns its database session.
+        """
+        db = SessionLocal()
+        try:
+            user = db.get(User, user_id)
+        except Exception:
+            db.close()
+            raise
         if not user:
+            db.close()
             raise ValueError(f"User {user_id} not found")
-
-        health_inputs = db.query(HealthInput).filter(HealthInput.user_id == user_id).all()
-        assessments = db.query(RiskAssessment).filter(RiskAssessment.user_id == user_id).all()
-        feedbacks = db.query(Feedback).filter(Feedback.user_id == user_id).all()
-
-        export_data = {
-            "export_id": str(uuid.uuid4()),
-            "exported_at": datetime.utcnow().isoformat(),
-            "user": {
-                "id": user.id,
-                "anonymous_id": user.anonymous_id,
-                "created_at": user.created_at.isoformat() if user.created_at else None,
-                "consent_data_storage": user.consent_data_storage,
-                "consent_ml_usage": user.consent_ml_usage,
-                "onboarding_completed": user.onboarding_completed,
-            },
-            "health_inputs": [
-                {
-                    "id": h.id,
-                    "created_at": h.created_at.isoformat() if h.created_at else None,
-                    "symptom_text": h.symptom_text,
-                    "emoji_inputs": h.emoji_inputs,
-                    "checkbox_selections": h.checkbox_selections,
-                    "sleep_hours": h.sleep_hours,
-                    "mood_score": h.mood_score,
-                    "energy_level": h.energy_level,
-                    "stress_level": h.stress_level,
-                    "steps_count": h.steps_count,
-                }
-                for h in health_inputs
-            ],
-            "risk_assessments": [
-                {
-                    "id": a.id,
-                    "created_at": a.created_at.isoformat() if a.created_at else None,
-                    "risk_level": a.risk_level,
-                    "confidence_score": a.confidence_score,
-                    "explanation_text": a.explanation_text,
-                }
-                for a in assessments
-            ],
-            "feedback": [
-                {
-                    "id": f.id,
-                    "created_at": f.created_at.isoformat() if f.created_at else None,
-                    "feedback_type": f.feedback_type,
-                    "relevance_score": f.relevance_score,
-                    "comment": f.comment,
-                }
-                for f in feedbacks
-            ],
-        }
-
-        logger.info(f"Data exported for user {user_id}: {len(health_inputs)} inputs, {len(assessments)} assessments")
-        return export_data
+        return self._iter_export(db, user)
+
+    def _iter_export(self, db: Session, user: User) -> Iterator[bytes]:
+        try:
+            header = orjson.dumps({
+                "export_id": str(uuid.uuid4()),
+                "exported_at": utc_now(),
+                "user": {
+                    "id": user.id,
+                    "anonymous_id": user.anonymous_id,
+                    "created_at": user.created_at,
+                    "consent_data_storage": user.consent_data_storage,
+                    "consent_ml_usage": user.consent_ml_usage,
+                    "onboarding_completed": user.onboarding_completed,
+                },
+            }, option=orjson.OPT_UTC_Z)
+            yield header[:-1]  # leave the object open for the sections below
+
+            counts = {}
+            for section, model, fields in self._EXPORT_SECTIONS:
+                yield b',"' + section.encode() + b'":['
+                stmt = (
+                    select(*(getattr(model, f) for f in fields))
+                    .where(model.user_id == user.id)
+                    .order_by(model.created_at)
+                    .execution_options(yield_per=self.EXPORT_BATCH_SIZE)
+                )
+                count = 0
+                for rows in db.execute(stmt).partitions():
+                    # orjson writes datetimes as ISO 8601 itself; UTC as "Z", like the API responses
+                    chunk = b",".join(orjson.dumps(row._asdict(), option=orjson.OPT_UTC_Z) for row in rows)
+                    yield (b"," + chunk) if count else chunk
+                    count += len(rows)
+                counts[section] = count
+                yield b"]"
+            yield b"}"
+
+            logger.info(f"Data exported for user {user.id}: {counts['health_inputs']} inputs, {counts['risk_assessments']} assessments")
+        finally:
+            db.close()
 
     def delete_user_data(self, db: Session, user_id: str) -> dict:
         """Delete all user data (GDPR right to erasure)."""
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
+        # Children are deleted explicitly rather than left to ON DELETE CASCADE: databases
+        # created before the cascade was declared still have plain (enforced) foreign keys
+        user_assessments = select(RiskAssessment.id).where(RiskAssessment.user_id == user_id)
+        feedback_count = db.execute(
+            delete(Feedback).where((Feedback.user_id == user_id) | Feedback.assessment_id.in_(user_assessments))
+        ).rowcount
+        assessment_count = db.execute(delete(RiskAssessment).where(RiskAssessment.user_id == user_id)).rowcount
+        input_count = db.execute(delete(HealthInput).where(HealthInput.user_id == user_id)).rowcount
+
+        if not db.execute(delete(User).where(User.id == user_id)).rowcount:
+            db.rollback()
             raise ValueError(f"User {user_id} not found")
-
-        # Delete all related data
-        feedback_count = db.query(Feedback).filter(Feedback.user_id == user_id).delete()
-        assessment_count = db.query(RiskAssessment).filter(RiskAssessment.user_id == user_id).delete()
-        input_count = db.query(HealthInput).filter(HealthInput.user_id == user_id).delete()
-        db.delete(user)
         db.commit()
 
         logger.info(f"Data deleted for user {user_id}: {input_count} inputs, {assessment_count} assessments, {feedback_count} feedbacks")
@@ -121,13 +143,39 @@ class PrivacyService:
             "user_deleted": True,
         }
 
+    # Postgres supports data-modifying CTEs, so the purge runs as a single statement
+    _RETENTION_PURGE_SQL = text("""
+        WITH old_inputs AS (
+            DELETE FROM health_inputs WHERE created_at < :cutoff RETURNING 1
+        ), old_feedback AS (
+            DELETE FROM feedback
+            WHERE created_at < :cutoff
+               OR assessment_id IN (SELECT id FROM risk_assessments WHERE created_at < :cutoff)
+            RETURNING 1
+        ), old_assessments AS (
+            DELETE FROM risk_assessments WHERE created_at < :cutoff RETURNING 1
+        )
+        SELECT (SELECT count(*) FROM old_inputs),
+               (SELECT count(*) FROM old_assessments),
+               (SELECT count(*) FROM old_feedback)
+    """)
+
     def enforce_retention_policy(self, db: Session) -> dict:
         """Purge data older than retention period (batch job)."""
-        cutoff = datetime.utcnow() - timedelta(days=settings.DATA_RETENTION_DAYS)
-
-        old_inputs = db.query(HealthInput).filter(HealthInput.created_at < cutoff).delete()
-        old_assessments = db.query(RiskAssessment).filter(RiskAssessment.created_at < cutoff).delete()
-        old_feedback = db.query(Feedback).filter(Feedback.created_at < cutoff).delete()
+        cutoff = utc_now() - timedelta(days=get_settings().DATA_RETENTION_DAYS)
+
+        if db.get_bind().dialect.name == "postgresql":
+            old_inputs, old_assessments, old_feedback = db.execute(
+                self._RETENTION_PURGE_SQL, {"cutoff": cutoff}
+            ).one()
+        else:
+            old_inputs = db.execute(delete(HealthInput).where(HealthInput.created_at < cutoff)).rowcount
+            # Feedback on a purged assessment goes with it (the foreign key may not cascade)
+            old_assessment_ids = select(RiskAssessment.id).where(RiskAssessment.created_at < cutoff)
+            old_feedback = db.execute(
+                delete(Feedback).where((Feedback.created_at < cutoff) | Feedback.assessment_id.in_(old_assessment_ids))
+            ).rowcount
+            old_assessments = db.execute(delete(RiskAssessment).where(RiskAssessment.created_at < cutoff)).rowcount
 
         db.commit()
         logger.info(f"Retention policy enforced: purged {old_inputs} inputs, {old_assessments} assessments, {old_feedback} feedbacks")
@@ -140,26 +188,33 @@ class PrivacyService:
 
     def anonymize_for_research(self, db: Session, user_id: str) -> dict:
         """Generate de-identified summary for research purposes."""
-        user = db.query(User).filter(User.id == user_id).first()
+        user = db.get(User, user_id)
         if not user or not user.consent_anonymized_research:
             return {"error": "User not found or research consent not given"}
 
-        inputs = db.query(HealthInput).filter(HealthInput.user_id == user_id).all()
-        assessments = db.query(RiskAssessment).filter(RiskAssessment.user_id == user_id).all()
+        # Zero readings are treated as missing, so they are excluded from the averages
+        data_points, avg_mood, avg_sleep = db.execute(
+            select(
+                func.count(),
+                func.avg(func.nullif(HealthInput.mood_score, 0)),
+                func.avg(func.nullif(HealthInput.sleep_hours, 0)),
+            ).where(HealthInput.user_id == user_id)
+        ).one()
+        level_counts = dict(db.execute(
+            select(RiskAssessment.risk_level, func.count())
+            .where(RiskAssessment.user_id == user_id)
+            .group_by(RiskAssessment.risk_level)
+        ).all())
 
         # De-identified summary (no PII)
         return {
             "anonymous_id": user.anonymous_id,
-            "data_points": len(inputs),
-            "assessment_count": len(assessments),
-            "avg_mood": round(sum(i.mood_score for i in inputs if i.mood_score) / max(1, sum(1 for i in inputs if i.mood_score)), 2),
-            "avg_sleep": round(sum(i.sleep_hours for i in inputs if i.sleep_hours) / max(1, sum(1 for i in inputs if i.sleep_hours)), 2),
-            "risk_distribution": {
-                level: sum(1 for a in assessments if a.risk_level == level)
-                for level in ["LOW", "WEAK", "MODERATE", "HIGH"]
-            },
+            "data_points": data_points,
+            "assessment_count": sum(level_counts.values()),
+            "avg_mood": round(float(avg_mood or 0), 2),
+            "avg_sleep": round(float(avg_sleep or 0), 2),
+            "risk_distribution": {level: level_counts.get(level, 0) for level in _RISK_LEVELS},
         }
 
-
 # Singleton instance
 privacy_service = PrivacyService()
@@ -3,33 +3,71 @@ Input Sanitizer — OWASP-compliant input sanitization for all user inputs.
 Handles XSS prevention, SQL injection prevention, emoji normalization.
 """
 
+import html
 import re
-import bleach
+
 import emoji
 
 
+def _compile_alternation(patterns: tuple[str, ...]) -> re.Pattern:
+    """Fuse patterns into one case-insensitive alternation so a single scan covers them all."""
+    return re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+
+
+def _remove_all(pattern: re.Pattern, text: str) -> str:
+    """Remove matches until none remain, so a removal cannot splice together a new match."""
+    text, count = pattern.subn("", text)
+    while count:
+        text, count = pattern.subn("", text)
+    return text
+
+
 class InputSanitizer:
     """Sanitizes user inputs for security and consistency."""
 
-    # Allowed HTML tags (none for health inputs)
-    ALLOWED_TAGS: list = []
-    ALLOWED_ATTRIBUTES: dict = {}
+    # Health inputs are plain text: script/style blocks, closed comments and tags are
+    # stripped; an unterminated "<" is ordinary text ("a<b") and is escaped below
+    HTML_TAGS = re.compile(
+        r"<(script|style)\b[^>]*>.*?</\1\s*>|<!--.*?-->|</?[a-zA-Z][^>]*>",
+        re.DOTALL | re.IGNORECASE,
+    )
 
     # Suspicious patterns for SQL injection
-    SQL_PATTERNS = [
+    SQL_PATTERNS = (
         r"(\b(SELECT|INSERT|UPDATE|DELETE|DROP|CREATE|ALTER|EXEC|UNION)\b)",
         r"(--|;|/\*|\*/|xp_|sp_)",
         r"('|\"|\\)",
-    ]
+    )
 
     # XSS patterns
-    XSS_PATTERNS = [
+    XSS_PATTERNS = (
         r"<script[^>]*>",
         r"javascript:",
         r"on\w+\s*=",
         r"eval\s*\(",
         r"document\.(cookie|location|write)",
-    ]
+    )
+
+    # SQL and XSS patterns fused so removal is one scan of the text
+    INJECTION_PATTERNS = _compile_alternation(SQL_PATTERNS + XSS_PATTERNS)
+    WHITESPACE = re.compile(r"\s+")
+
+    # Emoji -> descriptive token (😴 → "sleeping face"), precomputed from the emoji package's data
+    EMOJI_TOKENS: dict[str, str] = {
+        char: data["en"].replace(":", "").replace("_", " ").strip()
+        for char, data in emoji.EMOJI_DATA.items()
+    }
+
+    # Checkbox categories accepted from the client
+    ALLOWED_CATEGORIES = frozenset({
+        "headache", "fatigue", "nausea", "dizziness", "insomnia",
+        "anxiety", "joint_pain", "muscle_ache", "shortness_of_breath",
+        "chest_pain", "stomach_pain", "back_pain", "fever", "cough",
+        "sore_throat", "congestion", "appetite_change", "weight_change",
+        "skin_changes", "vision_changes", "mood_changes", "concentration",
+        "memory", "digestive_issues", "heart_palpitations", "sweating",
+        "numbness", "tingling", "other",
+    })
 
     @classmethod
     def sanitize_text(cls, text: str | None) -> str | None:
@@ -37,51 +75,36 @@ class InputSanitizer:
         if text is None:
             return None
 
-        # Strip HTML tags
-        text = bleach.clean(text, tags=cls.ALLOWED_TAGS, attributes=cls.ALLOWED_ATTRIBUTES, strip=True)
-
-        # Remove potential SQL injection patterns
-        for pattern in cls.SQL_PATTERNS:
-            text = re.sub(pattern, "", text, flags=re.IGNORECASE)
+        # Strip HTML tags, then escape what is left (a stray "<" becomes "&lt;")
+        text = html.escape(html.unescape(_remove_all(cls.HTML_TAGS, text)), quote=False)
 
-        # Remove XSS patterns
-        for pattern in cls.XSS_PATTERNS:
-            text = re.sub(pattern, "", text, flags=re.IGNORECASE)
+        # Remove potential SQL injection and XSS patterns
+        text = _remove_all(cls.INJECTION_PATTERNS, text)
 
         # Normalize whitespace
-        text = re.sub(r"\s+", " ", text).strip()
+        text = cls.WHITESPACE.sub(" ", text).strip()
 
         return text if text else None
 
     @classmethod
     def sanitize_emoji_inputs(cls, emojis: list[str]) -> list[str]:
         """Convert emojis to descriptive text tokens for ML processing."""
+        tokens = cls.EMOJI_TOKENS
         sanitized = []
         for e in emojis:
-            if emoji.is_emoji(e):
-                # Convert emoji to descriptive text: 😴 → "sleeping_face"
-                demojized = emoji.demojize(e, delimiters=("", ""))
-                sanitized.append(demojized.replace(":", "").replace("_", " ").strip())
-            else:
-                # Sanitize as text
-                clean = cls.sanitize_text(e)
-                if clean:
-                    sanitized.append(clean)
+            token = tokens.get(e)
+            if token is None:
+                # Not a single emoji — sanitize as text
+                token = cls.sanitize_text(e)
+            if token:
+                sanitized.append(token)
         return sanitized
 
     @classmethod
     def sanitize_checkbox_selections(cls, selections: list[str]) -> list[str]:
         """Validate checkbox selections against allowed categories."""
-        ALLOWED_CATEGORIES = [
-            "headache", "fatigue", "nausea", "dizziness", "insomnia",
-            "anxiety", "joint_pain", "muscle_ache", "shortness_of_breath",
-            "chest_pain", "stomach_pain", "back_pain", "fever", "cough",
-            "sore_throat", "congestion", "appetite_change", "weight_change",
-            "skin_changes", "vision_changes", "mood_changes", "concentration",
-            "memory", "digestive_issues", "heart_palpitations", "sweating",
-            "numbness", "tingling", "other"
-        ]
-        return [s.lower().strip() for s in selections if s.lower().strip() in ALLOWED_CATEGORIES]
+        normalized = (s.lower().strip() for s in selections)
+        return [s for s in normalized if s in cls.ALLOWED_CATEGORIES]
 
     @classmethod
     def validate_input_length(cls, text: str | None, max_length: int = 5000) -> bool:
@@ -0,0 +1,35 @@
+"""
+Shared fixtures: the app is imported against a throwaway SQLite database.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+_DB_DIR = tempfile.mkdtemp(prefix="hea-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/test.db"
+os.environ["DEBUG"] = "false"
+
+from app.main import app  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+CONSENT = {
+    "consent_data_storage": True,
+    "consent_ml_usage": True,
+    "consent_anonymized_research": False,
+    "consent_wearable_data": False,
+}
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def user_id(client):
+    response = client.post("/api/v1/users/", json={"consent": CONSENT})
+    assert response.status_code == 201
+    return response.json()["id"]
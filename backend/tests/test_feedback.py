@@ -0,0 +1,24 @@
+"""
+Single and bulk feedback submission return the same response shape.
+"""
+
+
+def test_bulk_feedback_matches_single_submission(client, user_id):
+    client.post(f"/api/v1/inputs/?user_id={user_id}", json={"symptom_text": "headache"})
+    assessment_id = client.post("/api/v1/assess/", json={"user_id": user_id}).json()["id"]
+
+    single = client.post(
+        f"/api/v1/feedback/?user_id={user_id}",
+        json={"assessment_id": assessment_id, "feedback_type": "confirm", "relevance_score": 4},
+    )
+    bulk = client.post(
+        f"/api/v1/feedback/bulk?user_id={user_id}",
+        json={"items": [{"assessment_id": assessment_id, "feedback_type": "reject"}]},
+    )
+    assert single.status_code == 201
+    assert bulk.status_code == 201
+
+    single_row, (bulk_row,) = single.json(), bulk.json()
+    assert single_row.keys() == bulk_row.keys()
+    assert single_row["created_at"].endswith("Z")
+    assert bulk_row["created_at"].endswith("Z")
@@ -0,0 +1,86 @@
+"""
+InputSanitizer.sanitize_text: markup is removed or escaped, never passed through.
+"""
+
+import pytest
+from app.services.sanitizer import InputSanitizer
+
+
+def sanitize(text):
+    return InputSanitizer.sanitize_text(text)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("<script>alert(1)</script>headache", "headache"),
+        ("<SCRIPT SRC=//x.js></SCRIPT>tired", "tired"),
+        ("<script type='text/javascript'>\nfetch('/x')\n</script >dizzy", "dizzy"),
+        ("<style>body{display:none}</style>nausea", "nausea"),
+        ("<!-- hidden -->visible", "visible"),
+        ("<b>sore</b> throat", "sore throat"),
+    ],
+)
+def test_script_style_blocks_comments_and_tags_are_removed(text, expected):
+    assert sanitize(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("pain<in my chest", "pain&ltin my chest"),
+        ("a < b and c > d", "a &lt b and c &gt d"),
+        ("<script", "&ltscript"),
+        ("<!-- unterminated", "&lt! unterminated"),
+    ],
+)
+def test_unclosed_tags_are_escaped_as_text(text, expected):
+    assert sanitize(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        '<img src=x onerror="alert(1)">pain',
+        '<img alt=">" onerror=alert(1)>pain',
+        '<a href="javascript:alert(1)">pain</a>',
+        "<div onclick=alert(1)>pain</div>",
+        '<svg/onload=alert(1)>pain',
+    ],
+)
+def test_attribute_injection_is_removed(text):
+    result = sanitize(text)
+    assert "pain" in result
+    assert "<" not in result and ">" not in result
+    assert "onerror" not in result and "onclick" not in result and "onload" not in result
+    assert "javascript:" not in result
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("fish &amp; chips", "fish &amp chips"),
+        ("5 &gt; 3", "5 &gt 3"),
+        ("caf&eacute;", "café"),
+        ("&lt;script&gt;alert(1)&lt;/script&gt;", "&ltscript&gtalert(1)&lt/script&gt"),
+        ("&amp;lt;b&amp;gt;", "&ampltb&ampgt"),
+    ],
+)
+def test_entities_are_decoded_once_and_reescaped(text, expected):
+    result = sanitize(text)
+    assert result == expected
+    assert "<" not in result and ">" not in result
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["pain<in my chest", "fish &amp; chips", "<b>x</b> &lt;i&gt;", "<img alt=\">\" onerror=alert(1)>sore"],
+)
+def test_sanitizing_is_idempotent(text):
+    once = sanitize(text)
+    assert sanitize(once) == once
+
+
+def test_blank_and_none():
+    assert sanitize(None) is None
+    assert sanitize("<p> </p>") is None
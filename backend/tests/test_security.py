@@ -0,0 +1,19 @@
+"""
+SecurityMiddleware request size validation.
+"""
+
+import pytest
+from app.middleware.security import MAX_CONTENT_LENGTH
+
+
+@pytest.mark.parametrize("value", ["-1", "+5", "1_0", "abc", " 5"])
+def test_malformed_content_length_is_rejected(client, value):
+    response = client.post("/api/v1/users/", content=b"{}", headers={"content-length": value})
+    assert response.status_code == 400
+
+
+def test_oversized_content_length_is_rejected(client):
+    response = client.post(
+        "/api/v1/users/", content=b"{}", headers={"content-length": str(MAX_CONTENT_LENGTH + 1)}
+    )
+    assert response.status_code == 413
@@ -0,0 +1,31 @@
+"""
+Timestamps serialize the same way whether a row was just written or read back.
+"""
+
+from datetime import datetime
+
+from tests.conftest import CONSENT
+
+
+def _assert_utc(value: str):
+    assert value.endswith("Z"), value
+    assert datetime.fromisoformat(value).utcoffset().total_seconds() == 0
+
+
+def test_created_and_read_back_rows_serialize_as_utc(client):
+    created = client.post("/api/v1/users/", json={"consent": CONSENT}).json()
+    _assert_utc(created["created_at"])
+    user_id = created["id"]
+    fetched = client.get(f"/api/v1/users/{user_id}").json()
+    assert fetched["created_at"] == created["created_at"]
+
+    health_input = client.post(f"/api/v1/inputs/?user_id={user_id}", json={"symptom_text": "tired"}).json()
+    assessment = client.post("/api/v1/assess/", json={"user_id": user_id}).json()
+    _assert_utc(health_input["created_at"])
+    _assert_utc(assessment["created_at"])
+
+    inputs = client.get(f"/api/v1/inputs/?user_id={user_id}").json()
+    history = client.get(f"/api/v1/assess/history?user_id={user_id}").json()
+    assert inputs[0]["created_at"] == health_input["created_at"]
+    assert history[0]["created_at"] == assessment["created_at"]
+    assert client.get(f"/api/v1/assess/{assessment['id']}").json()["created_at"] == assessment["created_at"]
@@ -3,7 +3,9 @@ Hea ML Explainability Module
 Attention scoring + rule-based signal aggregation for human-readable explanations.
 """
 
+import heapq
 import logging
+from bisect import bisect_right
 from typing import Optional
 
 logger = logging.getLogger(__name__)
@@ -48,31 +50,48 @@ class ExplainabilityEngine:
         },
     }
 
-    # Next steps suggestions (non-medical advice)
+    # Next steps suggestions (non-medical advice); tuples so the shared tables can't be mutated via a result
     NEXT_STEPS = {
-        "LOW": [
+        "LOW": (
             "Keep tracking your daily health — consistency improves detection accuracy",
             "Consider setting up regular check-in reminders",
-        ],
-        "WEAK": [
+        ),
+        "WEAK": (
             "Continue monitoring these patterns over the next few days",
             "Try to identify any recent lifestyle changes that might be contributing",
             "Ensure you're staying hydrated and getting enough rest",
-        ],
-        "MODERATE": [
+        ),
+        "MODERATE": (
             "Consider discussing these patterns with your GP at your next visit",
             "Try to maintain consistent sleep and meal schedules",
             "If symptoms persist for more than a week, seek professional guidance",
             "Use the feedback feature to help us refine our detection for you",
-        ],
-        "HIGH": [
+        ),
+        "HIGH": (
             "We strongly recommend speaking with a healthcare professional soon",
             "If you're experiencing acute symptoms, please contact your doctor or NHS 111",
             "Keep logging daily so we can track any changes",
             "Remember: Hea is a wellness companion, not a medical diagnostic tool",
-        ],
+        ),
     }
 
+    # Main summary per risk level
+    SUMMARIES = {
+        "LOW": "Your recent health inputs look stable and within normal patterns.",
+        "WEAK": "We noticed a few subtle signals that are worth keeping an eye on, but nothing that requires immediate attention.",
+        "MODERATE": "We've detected some noteworthy patterns in your recent health data that suggest you should be more mindful of your wellbeing.",
+        "HIGH": "Several patterns in your recent health data are raising concern. We recommend taking action and consulting with a healthcare professional.",
+    }
+
+    # Confidence notes, ascending; each bound starts the next note
+    CONFIDENCE_BOUNDS = (0.4, 0.6, 0.8)
+    CONFIDENCE_NOTES = (
+        "This is a preliminary assessment. We need more data to provide more reliable insights.",
+        "Our confidence is limited. Continue logging daily to help us build a clearer picture.",
+        "We have moderate confidence in this assessment. More data points will improve accuracy.",
+        "We have high confidence in this assessment based on consistent signals across your inputs.",
+    )
+
     @classmethod
     def generate_explanation(
         cls,
@@ -100,7 +119,7 @@ class ExplainabilityEngine:
         # Attention highlights (which words/inputs mattered most)
         attention_highlights = []
         if attention_scores:
-            top_tokens = sorted(attention_scores, key=lambda x: x.get("attention_weight", 0), reverse=True)[:5]
+            top_tokens = heapq.nlargest(5, attention_scores, key=lambda x: x.get("attention_weight", 0))
             attention_highlights = [
                 {
                     "term": t["token"],
@@ -127,13 +146,7 @@ class ExplainabilityEngine:
     @classmethod
     def _generate_summary(cls, risk_level: str, confidence: float) -> str:
         """Generate the main explanation summary."""
-        summaries = {
-            "LOW": "Your recent health inputs look stable and within normal patterns.",
-            "WEAK": "We noticed a few subtle signals that are worth keeping an eye on, but nothing that requires immediate attention.",
-            "MODERATE": "We've detected some noteworthy patterns in your recent health data that suggest you should be more mindful of your wellbeing.",
-            "HIGH": "Several patterns in your recent health data are raising concern. We recommend taking action and consulting with a healthcare professional.",
-        }
-        return summaries.get(risk_level, summaries["LOW"])
+        return cls.SUMMARIES.get(risk_level, cls.SUMMARIES["LOW"])
 
     @classmethod
     def _explain_signals(cls, nlp_signals: list[dict], ts_signals: list[dict]) -> list[dict]:
@@ -158,20 +171,11 @@ class ExplainabilityEngine:
                     "icon": "📊",
                 })
 
-        # Sort by importance
+        # Top 8 explanations by importance (stable, like a full sort + slice)
         importance_order = {"high": 0, "moderate": 1, "low": 2}
-        explanations.sort(key=lambda x: importance_order.get(x["importance"], 3))
-
-        return explanations[:8]  # Top 8 explanations
+        return heapq.nsmallest(8, explanations, key=lambda x: importance_order.get(x["importance"], 3))
 
     @classmethod
     def _confidence_note(cls, confidence: float) -> str:
         """Human-readable confidence explanation."""
-        if confidence >= 0.8:
-            return "We have high confidence in this assessment based on consistent signals across your inputs."
-        elif confidence >= 0.6:
-            return "We have moderate confidence in this assessment. More data points will improve accuracy."
-        elif confidence >= 0.4:
-            return "Our confidence is limited. Continue logging daily to help us build a clearer picture."
-        else:
-            return "This is a preliminary assessment. We need more data to provide more reliable insights."
+        return cls.CONFIDENCE_NOTES[bisect_right(cls.CONFIDENCE_BOUNDS, confidence)]
@@ -4,9 +4,11 @@ NLP embeddings, temporal features, and behavior summaries for health signal dete
 """
 
 import logging
+import re
+from functools import lru_cache
 import numpy as np
 from typing import Optional
-from ml.preprocessing import TextPreprocessor, MetricsPreprocessor
+from ml.preprocessing import TextPreprocessor, MetricsPreprocessor, MetricsFrame
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +21,41 @@ except ImportError:
     HAS_TRANSFORMERS = False
     logger.warning("transformers/torch not available, using lightweight embeddings")
 
+# Optional JIT for the numeric kernels; they are plain NumPy and run uncompiled without it
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+
+@njit(cache=True)
+def _rms_change(values: np.ndarray) -> float:
+    """Root mean square of the day-over-day changes in values (needs at least 2 values)."""
+    diffs = np.diff(values)
+    return np.sqrt((diffs * diffs).mean())
+
+
+@lru_cache(maxsize=128)
+def _keyword_pattern(keywords: tuple[str, ...]) -> re.Pattern:
+    """Compiled alternation matching any of keywords (cached per keyword set)."""
+    return re.compile("|".join(map(re.escape, keywords)))
+
+
+def _inference_dtype() -> "torch.dtype":
+    """bfloat16 if the CPU the model runs on has native bf16 support, else float32."""
+    try:
+        # Same check torch uses for oneDNN bf16 kernels (AVX512-BF16 / AMX); without
+        # them bf16 matmuls are emulated and slower than float32
+        if torch.ops.mkldnn._is_mkldnn_bf16_supported():
+            return torch.bfloat16
+    except (AttributeError, RuntimeError):
+        pass
+    return torch.float32
+
 
 class NLPFeatureExtractor:
     """Extracts NLP features from health-related text inputs."""
@@ -33,8 +70,10 @@ class NLPFeatureExtractor:
         """Lazy-load DistilBERT model."""
         if HAS_TRANSFORMERS and not self._loaded:
             try:
-                self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-                self._model = AutoModel.from_pretrained(self.model_name)
+                self._tokenizer = AutoTokenizer.from_pretrained(self.model_name, use_fast=True)
+                # bfloat16 halves weight/activation bandwidth where the hardware computes it
+                # natively; embeddings are returned as float32 either way
+                self._model = AutoModel.from_pretrained(self.model_name, torch_dtype=_inference_dtype())
                 self._model.eval()
                 self._loaded = True
                 logger.info(f"Loaded NLP model: {self.model_name}")
@@ -43,32 +82,66 @@ class NLPFeatureExtractor:
 
     def extract_text_embedding(self, text: str) -> np.ndarray:
         """Extract 768-dim embedding from text using DistilBERT."""
-        # Normalize text first
-        normalized = TextPreprocessor.normalize_text(text)
-        if not normalized:
-            return np.zeros(768)
+        return self.extract_text_embeddings([text])[0]
 
-        self._load_model()
-
-        if self._loaded and self._tokenizer and self._model:
-            try:
-                inputs = self._tokenizer(
-                    normalized,
-                    max_length=256,
-                    truncation=True,
-                    padding=True,
-                    return_tensors="pt",
-                )
-                with torch.no_grad():
-                    outputs = self._model(**inputs)
-                # Mean pooling of last hidden state
-                embedding = outputs.last_hidden_state.mean(dim=1).squeeze().numpy()
-                return embedding
-            except Exception as e:
-                logger.warning(f"Transformer embedding failed: {e}")
+    def extract_text_embeddings(self, texts: list[str]) -> np.ndarray:
+        """Extract 768-dim embeddings for many texts with a single batched forward pass."""
+        # Normalize text first
+        normalized = [TextPreprocessor.normalize_text(text) for text in texts]
+        embeddings = np.zeros((len(texts), 768))
+        present = [i for i, text in enumerate(normalized) if text]
+        if not present:
+            return embeddings
+
+        pooled = self._encode([normalized[i] for i in present])
+        if pooled is not None:
+            # Single device → host copy, at the NumPy boundary
+            embeddings[present] = pooled.cpu().numpy()
+            return embeddings
 
         # Fallback: simple TF-IDF-like embedding
-        return self._fallback_embedding(normalized)
+        for i in present:
+            embeddings[i] = self._fallback_embedding(normalized[i])
+        return embeddings
+
+    def extract_text_embeddings_t(self, texts: list[str]) -> "torch.Tensor":
+        """
+        Like extract_text_embeddings, but returns a float32 tensor left on the model's
+        device, for torch consumers such as FusionClassifierModel (no NumPy round-trip).
+        """
+        normalized = [TextPreprocessor.normalize_text(text) for text in texts]
+        present = [i for i, text in enumerate(normalized) if text]
+        pooled = self._encode([normalized[i] for i in present]) if present else None
+        if pooled is None:
+            return torch.from_numpy(self.extract_text_embeddings(texts)).float()
+
+        embeddings = torch.zeros(len(texts), 768, device=pooled.device)
+        embeddings[present] = pooled
+        return embeddings
+
+    def _encode(self, texts: list[str]) -> Optional["torch.Tensor"]:
+        """Mean-pooled float32 DistilBERT embeddings of normalized texts; None if unavailable."""
+        self._load_model()
+        if not (self._loaded and self._tokenizer and self._model):
+            return None
+
+        try:
+            inputs = self._tokenizer(
+                texts,
+                max_length=256,
+                truncation=True,
+                padding=True,
+                return_tensors="pt",
+            ).to(self._model.device)
+            with torch.inference_mode():
+                hidden = self._model(**inputs).last_hidden_state
+                # Mean pooling over real tokens only, so padding does not dilute shorter texts
+                mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+            return pooled.float()
+        except Exception as e:
+            logger.warning(f"Transformer embedding failed: {e}")
+            return None
 
     def extract_attention_scores(self, text: str) -> list[dict]:
         """Extract attention-weighted token scores for explainability."""
@@ -79,42 +152,48 @@ class NLPFeatureExtractor:
         keywords = TextPreprocessor.extract_symptom_keywords(normalized)
         tokens = normalized.split()
 
+        # One alternation scan per token instead of a substring test per keyword
+        keyword_set = frozenset(keywords)
+        contains_keyword = _keyword_pattern(tuple(keywords)).search if keywords else None
+
         # Simulate attention scores based on keyword presence
         scores = []
         for token in tokens:
-            weight = 0.1  # baseline
-            if any(kw in token for kw in keywords):
-                weight = 0.7 + (0.3 * (token in keywords))
+            is_keyword = contains_keyword is not None and contains_keyword(token) is not None
+            weight = 0.7 + (0.3 * (token in keyword_set)) if is_keyword else 0.1  # 0.1 baseline
             scores.append({
                 "token": token,
                 "attention_weight": round(weight, 3),
-                "is_health_keyword": any(kw in token for kw in keywords),
+                "is_health_keyword": is_keyword,
             })
 
         # Sort by attention weight
         scores.sort(key=lambda x: x["attention_weight"], reverse=True)
         return scores[:20]  # Top 20 tokens
 
+    # Activation written at each keyword's hashed dimension and its two neighbours
+    _FALLBACK_SPREAD = (np.array([0, -1, 1]), np.array([1.0, 0.5, 0.5]))
+
     def _fallback_embedding(self, text: str) -> np.ndarray:
         """Lightweight fallback embedding using keyword vectors."""
         # Create a 768-dim vector based on symptom keyword presence
         keywords = TextPreprocessor.extract_symptom_keywords(text)
         embedding = np.zeros(768)
-
-        # Seed different dimensions based on keywords
-        for i, kw in enumerate(keywords):
-            hash_val = hash(kw) % 768
-            embedding[hash_val] = 1.0
-            # Spread activation to nearby dimensions
-            for offset in [-1, 1]:
-                idx = (hash_val + offset) % 768
-                embedding[idx] = 0.5
+        if not keywords:
+            return embedding
+
+        # Seed different dimensions based on keywords, spreading activation to nearby
+        # dimensions. Writes are laid out in keyword order and, as when they were done one
+        # at a time, the last write to a dimension wins on hash collisions.
+        hashes = np.fromiter((hash(kw) for kw in keywords), dtype=np.int64, count=len(keywords))
+        offsets, activations = self._FALLBACK_SPREAD
+        dims = ((hashes % 768)[:, None] + offsets).ravel() % 768
+        values = np.tile(activations, len(keywords))
+        _, last = np.unique(dims[::-1], return_index=True)
+        embedding[dims[::-1][last]] = values[::-1][last]
 
         # Normalize
-        norm = np.linalg.norm(embedding)
-        if norm > 0:
-            embedding = embedding / norm
-
+        embedding /= np.sqrt(embedding @ embedding)
         return embedding
 
 
@@ -122,7 +201,7 @@ class TemporalFeatureExtractor:
     """Extracts temporal features from historical daily metrics."""
 
     @classmethod
-    def extract_temporal_features(cls, historical_metrics: list[dict]) -> dict:
+    def extract_temporal_features(cls, historical_metrics: list[dict] | MetricsFrame) -> dict:
         """
         Extract time-series features from historical data.
         
@@ -131,6 +210,8 @@ class TemporalFeatureExtractor:
         - Variance / volatility
         - Trend slopes
         - Change-point indicators
+
+        Accepts daily metric dicts or a column-oriented MetricsFrame.
         """
         if not historical_metrics:
             return {"has_history": False}
@@ -141,28 +222,33 @@ class TemporalFeatureExtractor:
         rolling = MetricsPreprocessor.compute_rolling_features(historical_metrics, window=3)
         features.update(rolling)
 
-        # Additional temporal features
-        for metric in ["sleep_hours", "mood_score", "energy_level", "stress_level"]:
-            values = [h.get(metric) for h in historical_metrics if h.get(metric) is not None]
-
-            if len(values) >= 2:
-                features[f"{metric}_min"] = min(values)
-                features[f"{metric}_max"] = max(values)
-                features[f"{metric}_range"] = max(values) - min(values)
-                features[f"{metric}_latest"] = values[-1]
-
-                # Day-over-day change
-                features[f"{metric}_day_change"] = round(values[-1] - values[-2], 2)
-
-                # Volatility (std of differences)
-                if len(values) >= 3:
-                    diffs = [values[i] - values[i - 1] for i in range(1, len(values))]
-                    features[f"{metric}_volatility"] = round(
-                        (sum(d ** 2 for d in diffs) / len(diffs)) ** 0.5, 3
-                    )
+        # Additional temporal features, one column of recorded values per metric
+        for metric in MetricsFrame.METRICS:
+            if isinstance(historical_metrics, MetricsFrame):
+                values = historical_metrics.present(metric)
+            else:
+                values = np.fromiter(
+                    (v for v in (h.get(metric) for h in historical_metrics) if v is not None),
+                    dtype=np.float64,
+                )
+            cls._add_metric_features(features, metric, values)
 
         return features
 
+    @staticmethod
+    def _add_metric_features(features: dict, metric: str, values: np.ndarray):
+        """Min/max/range/latest, day-over-day change and volatility of a metric's recorded values."""
+        if len(values) < 2:
+            return
+        low, high, latest = float(values.min()), float(values.max()), float(values[-1])
+        features[f"{metric}_min"] = low
+        features[f"{metric}_max"] = high
+        features[f"{metric}_range"] = high - low
+        features[f"{metric}_latest"] = latest
+        features[f"{metric}_day_change"] = round(latest - float(values[-2]), 2)
+        if len(values) >= 3:
+            features[f"{metric}_volatility"] = round(float(_rms_change(values)), 3)
+
 
 class BehaviorSummaryExtractor:
     """Generates behavior summaries from combined inputs."""
@@ -0,0 +1,146 @@
+"""
+Dynamic request batching for WeakSignalNLPModel.
+
+Concurrent single-text predictions are queued for at most max_wait_ms (or until
+max_batch texts are waiting), tokenized together with padding to the longest
+text in the batch, and run through the model in one forward pass off the event
+loop. Each caller gets its own row of the result.
+"""
+
+import asyncio
+import logging
+import threading
+
+from ml.models.weak_signal_nlp import WeakSignalDetectorFallback
+
+logger = logging.getLogger(__name__)
+
+try:
+    import torch
+    HAS_TORCH = True
+except ImportError:
+    HAS_TORCH = False
+
+# Output order of the model's signal_scores columns
+SIGNAL_NAMES = WeakSignalDetectorFallback.SIGNAL_NAMES
+
+
+class TokenBatchBuffer:
+    """
+    Reusable staging tensors for tokenized batches.
+
+    input_ids/attention_mask storage is allocated once (pinned when CUDA is
+    available, so the host-to-device copy can be non_blocking) and each batch
+    is copied into a contiguous (batch, seq_len) view at its front. A non_blocking
+    copy may still be reading the storage after fill() returns, so callers must
+    wait_for_copies() before the buffer is filled again.
+    """
+
+    def __init__(self, max_batch: int, max_length: int):
+        pin = torch.cuda.is_available()
+        self._ids = torch.zeros(max_batch * max_length, dtype=torch.long, pin_memory=pin)
+        self._mask = torch.zeros(max_batch * max_length, dtype=torch.long, pin_memory=pin)
+        self._copied = None  # CUDA event recorded after the last host-to-device copies
+
+    def fill(self, input_ids, attention_mask, device) -> tuple:
+        """Copy a tokenizer batch (NumPy arrays) into the buffers and return it on device."""
+        batch, length = input_ids.shape
+        ids = self._ids[:batch * length].view(batch, length)
+        mask = self._mask[:batch * length].view(batch, length)
+        ids.copy_(torch.from_numpy(input_ids))
+        mask.copy_(torch.from_numpy(attention_mask))
+        ids, mask = ids.to(device, non_blocking=True), mask.to(device, non_blocking=True)
+        if ids.is_cuda:
+            self._copied = torch.cuda.Event()
+            self._copied.record()
+        return ids, mask
+
+    def wait_for_copies(self):
+        """Block until the last fill()'s device copies have finished reading the buffers."""
+        if self._copied is not None:
+            self._copied.synchronize()
+            self._copied = None
+
+
+class DynamicBatcher:
+    """Coalesces concurrent predict() calls into batched forward passes."""
+
+    def __init__(self, model, tokenizer, max_batch: int = 32, max_wait_ms: float = 20, max_length: int = 256,
+                 device: str = "cpu"):
+        self._model = model
+        self._tokenizer = tokenizer
+        self._max_batch = max_batch
+        self._max_wait = max_wait_ms / 1000
+        self._max_length = max_length
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()  # strong refs so running batches are not collected
+        self._device = device
+        self._buffer = TokenBatchBuffer(max_batch, max_length)
+        self._buffer_lock = threading.Lock()  # one batch in the staging buffer at a time
+
+    async def predict(self, text: str) -> dict:
+        """Signal scores, token attention and risk embedding for one text (same shape as the fallback)."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text or "", future))
+
+        if len(self._pending) >= self._max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        """Hand the queued texts to a batch task and reset the window."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: list[tuple[str, asyncio.Future]]):
+        texts = [text for text, _ in batch]
+        try:
+            results = await asyncio.to_thread(self._forward, texts)
+        except Exception as e:
+            logger.warning(f"Batched inference failed for {len(batch)} texts: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():  # caller may have been cancelled
+                future.set_result(result)
+
+    def _forward(self, texts: list[str]) -> list[dict]:
+        """One padded forward pass; runs in a worker thread."""
+        inputs = self._tokenizer(
+            texts,
+            max_length=self._max_length,
+            truncation=True,
+            padding="longest",
+            return_tensors="np",
+        )
+        with self._buffer_lock, torch.inference_mode():
+            input_ids, attention_mask = self._buffer.fill(inputs["input_ids"], inputs["attention_mask"], self._device)
+            outputs = self._model(input_ids, attention_mask)
+            # The forward is only queued on CUDA; keep the staging buffer until its copies land
+            self._buffer.wait_for_copies()
+
+        lengths = inputs["attention_mask"].sum(axis=1).tolist()
+        signal_scores = outputs["signal_scores"].float().tolist()
+        attention = outputs["attention_weights"].float().tolist()
+        risk_embedding = outputs["risk_embedding"].float().cpu().numpy()
+        return [
+            {
+                "signal_scores": {name: round(score, 3) for name, score in zip(SIGNAL_NAMES, signal_scores[i])},
+                "attention_weights": attention[i][:lengths[i]][:50],
+                "risk_embedding": risk_embedding[i],
+            }
+            for i in range(len(texts))
+        ]
@@ -0,0 +1,84 @@
+"""
+Offline change-point detection for daily metric series.
+
+Finds the segmentation of a series into constant-mean segments that minimizes
+the squared error (l2 cost) plus a penalty per change, using PELT. ruptures'
+implementation is used when installed; otherwise an equivalent NumPy version
+with prefix-sum segment costs runs instead.
+"""
+
+import logging
+from itertools import pairwise
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    import ruptures
+    HAS_RUPTURES = True
+except ImportError:
+    HAS_RUPTURES = False
+
+MIN_SEGMENT_DAYS = 3
+PENALTY_SCALE = 3.0  # penalty per change point, in units of the metric's variance
+
+
+def detect_change_points(values: np.ndarray, std: float, min_size: int = MIN_SEGMENT_DAYS) -> list[int]:
+    """
+    Indices at which a new constant-mean segment starts (ascending, excluding 0).
+
+    std is the metric's population standard deviation; a change must reduce the
+    squared error by more than PENALTY_SCALE * std**2 to be reported.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < 2 * min_size:
+        return []
+    penalty = PENALTY_SCALE * std * std
+
+    if HAS_RUPTURES:
+        algo = ruptures.Pelt(model="l2", min_size=min_size, jump=1).fit(values.reshape(-1, 1))
+        return algo.predict(pen=penalty)[:-1]
+    return _pelt_l2(values, penalty, min_size)
+
+
+def segment_changes(values: np.ndarray, breakpoints: list[int]) -> list[float]:
+    """Mean of each segment after a breakpoint minus the mean of the segment before it."""
+    bounds = [0, *breakpoints, len(values)]
+    means = [float(values[start:end].mean()) for start, end in pairwise(bounds)]
+    return [after - before for before, after in pairwise(means)]
+
+
+def _pelt_l2(values: np.ndarray, penalty: float, min_size: int) -> list[int]:
+    """PELT with l2 segment cost; costs of all candidate segments ending at t in one vector op."""
+    n = len(values)
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    squares = np.concatenate(([0.0], np.cumsum(values * values)))
+
+    best = np.full(n + 1, np.inf)  # best[t]: optimal penalized cost of values[:t]
+    best[0] = -penalty
+    previous = np.zeros(n + 1, dtype=np.intp)
+    candidates = np.array([0], dtype=np.intp)
+
+    for t in range(min_size, n + 1):
+        admissible = candidates[t - candidates >= min_size]
+        lengths = t - admissible
+        totals = sums[t] - sums[admissible]
+        costs = squares[t] - squares[admissible] - totals * totals / lengths
+        scores = best[admissible] + costs
+
+        i = int(np.argmin(scores))
+        best[t] = scores[i] + penalty
+        previous[t] = admissible[i]
+
+        # Prune starts that can never beat the current optimum again
+        pending = candidates[t - candidates < min_size]
+        kept = admissible[scores <= best[t]]
+        candidates = np.concatenate((kept, pending, [t]))
+
+    breakpoints = []
+    t = previous[n]
+    while t > 0:
+        breakpoints.append(int(t))
+        t = previous[t]
+    return breakpoints[::-1]
@@ -9,8 +9,12 @@ Purpose: Aggregate weak signals from multiple detection models into
 calibrated risk levels with confidence scores and explanations.
 """
 
+import heapq
 import logging
+from bisect import bisect_right
+from dataclasses import dataclass
 import numpy as np
+from ml.models.optimization import OnnxModelRunner, export_onnx, optimize_for_inference
 
 logger = logging.getLogger(__name__)
 
@@ -88,14 +92,48 @@ if HAS_TORCH:
             }
 
 
+@dataclass(slots=True)
+class ClassificationResult:
+    """WeightedFusionClassifier output; values are kept unrounded until to_dict()."""
+
+    risk_level: str
+    confidence_score: float
+    raw_score: float
+    adjusted_score: float
+    explanation_text: str
+    nlp_contribution: float
+    ts_contribution: float
+    feedback_adjustment: float
+    signal_agreement: float
+    top_signals: list
+
+    def to_dict(self) -> dict:
+        """Rounded, JSON-ready representation (the shape classify() used to return)."""
+        return {
+            "risk_level": self.risk_level,
+            "confidence_score": round(self.confidence_score, 3),
+            "raw_score": round(self.raw_score, 3),
+            "adjusted_score": round(self.adjusted_score, 3),
+            "explanation_text": self.explanation_text,
+            "signal_breakdown": {
+                "nlp_contribution": round(self.nlp_contribution, 3),
+                "ts_contribution": round(self.ts_contribution, 3),
+                "feedback_adjustment": round(self.feedback_adjustment, 4),
+                "signal_agreement": round(self.signal_agreement, 3),
+                "top_signals": self.top_signals,
+            },
+        }
+
+
 class WeightedFusionClassifier:
     """
     Rule-based fusion classifier for prototype deployment.
     Combines NLP and time-series scores using learned-like weights.
     """
 
-    RISK_LEVELS = ["LOW", "WEAK", "MODERATE", "HIGH"]
-    RISK_THRESHOLDS = [(0, 0.25), (0.25, 0.50), (0.50, 0.75), (0.75, 1.0)]
+    RISK_LEVELS = ("LOW", "WEAK", "MODERATE", "HIGH")
+    RISK_BOUNDS = (0.25, 0.50, 0.75)  # score at which each level after LOW starts
+    _RISK_LEVEL_ARRAY = np.array(RISK_LEVELS)  # for vectorized level lookup
 
     # Fusion weights (tunable)
     NLP_WEIGHT = 0.55
@@ -108,7 +146,7 @@ class WeightedFusionClassifier:
         nlp_signals: list[dict] = None,
         ts_signals: list[dict] = None,
         feedback_adjustment: float = 0.0,
-    ) -> dict:
+    ) -> ClassificationResult:
         """
         Fuse NLP and time-series scores into a risk classification.
 
@@ -120,54 +158,94 @@ class WeightedFusionClassifier:
             feedback_adjustment: Cumulative adjustment from user feedback
 
         Returns:
-            dict with risk_level, confidence_score, explanation, signal_breakdown
+            ClassificationResult (call .to_dict() for the rounded JSON form)
         """
+        nlp_signals = nlp_signals or []
+        ts_signals = ts_signals or []
+
         # Weighted combination
-        raw_score = (nlp_score * self.NLP_WEIGHT) + (ts_score * self.TS_WEIGHT)
+        nlp_contribution = nlp_score * self.NLP_WEIGHT
+        ts_contribution = ts_score * self.TS_WEIGHT
+        raw_score = nlp_contribution + ts_contribution
 
         # Apply feedback adjustment (self-calibrating)
         adjusted_score = max(0.0, min(1.0, raw_score + feedback_adjustment))
 
         # Determine risk level
-        risk_level = self.RISK_LEVELS[0]
-        for i, (low, high) in enumerate(self.RISK_THRESHOLDS):
-            if low <= adjusted_score < high:
-                risk_level = self.RISK_LEVELS[i]
-                break
-        if adjusted_score >= 1.0:
-            risk_level = "HIGH"
+        risk_level = self.RISK_LEVELS[bisect_right(self.RISK_BOUNDS, adjusted_score)]
 
         # Confidence — based on signal agreement and data richness
         signal_agreement = 1.0 - abs(nlp_score - ts_score)
-        data_richness = min(1.0, (len(nlp_signals or []) + len(ts_signals or [])) / 10)
-        confidence = round(0.5 * signal_agreement + 0.3 * data_richness + 0.2 * adjusted_score, 3)
+        data_richness = min(1.0, (len(nlp_signals) + len(ts_signals)) / 10)
+        confidence = 0.5 * signal_agreement + 0.3 * data_richness + 0.2 * adjusted_score
 
         # Build explanation
         explanation = self._build_explanation(
             risk_level, adjusted_score, nlp_score, ts_score,
-            nlp_signals or [], ts_signals or [],
+            nlp_signals, ts_signals,
         )
 
-        # Signal breakdown
-        all_signals = sorted(
-            (nlp_signals or []) + (ts_signals or []),
-            key=lambda s: s.get("weight", 0),
-            reverse=True,
+        # Signal breakdown: strongest 5 signals (stable, like a full sort + slice)
+        top_signals = heapq.nlargest(5, nlp_signals + ts_signals, key=lambda s: s.get("weight", 0))
+
+        return ClassificationResult(
+            risk_level=risk_level,
+            confidence_score=confidence,
+            raw_score=raw_score,
+            adjusted_score=adjusted_score,
+            explanation_text=explanation,
+            nlp_contribution=nlp_contribution,
+            ts_contribution=ts_contribution,
+            feedback_adjustment=feedback_adjustment,
+            signal_agreement=signal_agreement,
+            top_signals=top_signals,
         )
 
+    def classify_batch(
+        self,
+        nlp_scores: np.ndarray,
+        ts_scores: np.ndarray,
+        signal_counts: np.ndarray = None,
+        feedback_adjustment: float | np.ndarray = 0.0,
+    ) -> dict:
+        """
+        Vectorized classify() for bulk re-scoring: scores and levels only, no explanations.
+
+        Args:
+            nlp_scores: NLP signal detection scores (0-1), one per row
+            ts_scores: Time-series anomaly scores (0-1), one per row
+            signal_counts: Number of NLP + time-series signals per row (defaults to 0)
+            feedback_adjustment: Feedback adjustment, shared or one per row (e.g. per user)
+
+        Returns:
+            dict of per-row arrays: risk_level, confidence_score, raw_score, adjusted_score.
+            Scores are unrounded, equal to classify()'s fields; round them with round()
+            as to_dict() does (np.round can differ in the third decimal).
+        """
+        nlp_scores = np.asarray(nlp_scores, dtype=np.float64)
+        ts_scores = np.asarray(ts_scores, dtype=np.float64)
+
+        # Same operation order as classify(); intermediates are updated in place to keep
+        # allocations to one per output
+        raw_scores = nlp_scores * self.NLP_WEIGHT
+        raw_scores += ts_scores * self.TS_WEIGHT
+        adjusted_scores = raw_scores + feedback_adjustment
+        np.clip(adjusted_scores, 0.0, 1.0, out=adjusted_scores)
+        level_idx = np.searchsorted(self.RISK_BOUNDS, adjusted_scores, side="right")
+
+        confidence = np.subtract(nlp_scores, ts_scores)
+        np.abs(confidence, out=confidence)
+        np.subtract(1.0, confidence, out=confidence)  # signal agreement
+        confidence *= 0.5
+        if signal_counts is not None:
+            confidence += 0.3 * np.minimum(1.0, np.asarray(signal_counts) / 10)  # data richness
+        confidence += 0.2 * adjusted_scores
+
         return {
-            "risk_level": risk_level,
+            "risk_level": self._RISK_LEVEL_ARRAY[level_idx],
             "confidence_score": confidence,
-            "raw_score": round(raw_score, 3),
-            "adjusted_score": round(adjusted_score, 3),
-            "explanation_text": explanation,
-            "signal_breakdown": {
-                "nlp_contribution": round(nlp_score * self.NLP_WEIGHT, 3),
-                "ts_contribution": round(ts_score * self.TS_WEIGHT, 3),
-                "feedback_adjustment": round(feedback_adjustment, 4),
-                "signal_agreement": round(signal_agreement, 3),
-                "top_signals": all_signals[:5],
-            },
+            "raw_score": raw_scores,
+            "adjusted_score": adjusted_scores,
         }
 
     def _build_explanation(
@@ -216,13 +294,36 @@ class WeightedFusionClassifier:
         return explanation
 
 
+# Input/output names of the exported fusion graph (match FusionClassifierModel.forward)
+FUSION_ONNX_INPUTS = ["nlp_embedding", "ts_embedding"]
+FUSION_ONNX_OUTPUTS = ["risk_probabilities", "risk_logits", "confidence"]
+
+
+def export_fusion_onnx(model, path: str, nlp_dim: int = 128, ts_dim: int = 64):
+    """Export a trained FusionClassifierModel to ONNX for onnxruntime serving."""
+    export_onnx(
+        model,
+        path,
+        (torch.randn(1, nlp_dim), torch.randn(1, ts_dim)),
+        FUSION_ONNX_INPUTS,
+        FUSION_ONNX_OUTPUTS,
+    )
+
+
+def load_fusion_onnx(path: str) -> OnnxModelRunner:
+    """Load an exported fusion graph; call it with nlp_embedding=..., ts_embedding=... arrays."""
+    return OnnxModelRunner(path)
+
+
 # Factory function
-def create_fusion_classifier(use_neural: bool = True):
-    """Create the appropriate fusion classifier."""
+def create_fusion_classifier(use_neural: bool = True, for_inference: bool = False):
+    """Create the appropriate fusion classifier (int8-quantized for serving if for_inference)."""
     if HAS_TORCH and use_neural:
         try:
             model = FusionClassifierModel()
             logger.info("Created FusionClassifierModel (neural)")
+            if for_inference:
+                model = optimize_for_inference(model)
             return model
         except Exception as e:
             logger.warning(f"Could not create neural fusion: {e}")
@@ -0,0 +1,238 @@
+"""
+Inference-time model optimizations — BatchNorm folding, int8 quantization,
+graph compilation, and ONNX export/serving.
+
+These are applied to trained models before serving; training code keeps
+using the plain nn.Module. Every helper degrades to returning the model
+unchanged when the required backend is unavailable.
+"""
+
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    import torch
+    from torch import nn
+    HAS_TORCH = True
+except ImportError:
+    HAS_TORCH = False
+
+try:
+    import onnxruntime as ort
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        QuantFormat,
+        QuantType,
+        quantize_static,
+    )
+    HAS_ONNXRUNTIME = True
+except ImportError:
+    HAS_ONNXRUNTIME = False
+
+# onnxruntime input element types -> numpy dtypes fed to the session
+_ORT_DTYPES = {
+    "tensor(float)": np.float32,
+    "tensor(int64)": np.int64,
+    "tensor(int32)": np.int32,
+}
+
+# Operators quantized by quantize_onnx_int8 (transformer matmuls, attention and embedding lookups)
+ONNX_INT8_OPERATORS = ["MatMul", "Attention", "Gather", "LSTM", "Transpose", "EmbedLayerNormalization"]
+
+
+def optimize_for_inference(model, quantize: bool = True):
+    """
+    Prepare a trained model for CPU serving.
+
+    With quantize, Linear layers are dynamically quantized to int8; otherwise
+    the model is compiled. The two are not combined because torch.compile does
+    not support dynamically quantized Linear modules.
+    """
+    model.eval()
+    fold_batchnorm(model)
+    if quantize:
+        return quantize_linear_int8(model)
+    return compile_for_inference(model)
+
+
+def fold_batchnorm(model):
+    """
+    Fold eval-mode BatchNorm1d layers of every nn.Sequential into an adjacent Linear.
+
+    At eval time BatchNorm is the fixed affine map x * scale + shift, with
+    scale = gamma / sqrt(running_var + eps) and shift = beta - running_mean * scale.
+    It is absorbed by the Linear directly before it (W' = scale·W, b' = scale·b + shift)
+    or, when it follows an activation as in Linear → ReLU → BatchNorm → Dropout → Linear,
+    by the next Linear (W' = W·diag(scale), b' = b + W·shift), skipping only layers that are
+    the identity at eval time. The BatchNorm is then replaced by nn.Identity. Modifies the
+    model in place and returns it.
+    """
+    if not HAS_TORCH:
+        return model
+    model.eval()
+    with torch.no_grad():
+        for sequential in [m for m in model.modules() if isinstance(m, nn.Sequential)]:
+            layers = list(sequential)
+            for i, bn in enumerate(layers):
+                if not isinstance(bn, nn.BatchNorm1d) or not bn.track_running_stats:
+                    continue
+                scale = bn.weight / torch.sqrt(bn.running_var + bn.eps)
+                shift = bn.bias - bn.running_mean * scale
+
+                if i > 0 and isinstance(layers[i - 1], nn.Linear):
+                    linear = layers[i - 1]
+                    bias = linear.bias if linear.bias is not None else torch.zeros_like(shift)
+                    linear.weight.mul_(scale.unsqueeze(1))
+                    linear.bias = nn.Parameter(bias * scale + shift)
+                else:
+                    j = i + 1
+                    while j < len(layers) and isinstance(layers[j], (nn.Dropout, nn.Identity)):
+                        j += 1
+                    if j == len(layers) or not isinstance(layers[j], nn.Linear):
+                        continue
+                    linear = layers[j]
+                    bias = linear.bias if linear.bias is not None else torch.zeros(linear.out_features)
+                    linear.bias = nn.Parameter(bias + linear.weight @ shift)
+                    linear.weight.mul_(scale.unsqueeze(0))
+
+                sequential[i] = nn.Identity()
+    return model
+
+
+def quantize_linear_int8(model, layer_types: tuple = ()):
+    """
+    Dynamic int8 quantization of every nn.Linear (int8 weights, activations quantized per batch).
+
+    layer_types adds further dynamically quantizable layers, e.g. (nn.LSTM,).
+    """
+    model.eval()
+    if not HAS_TORCH:
+        return model
+    if torch.backends.quantized.engine == "none":
+        logger.warning("No quantized engine (fbgemm/qnnpack) available, serving float model")
+        return model
+    try:
+        return torch.ao.quantization.quantize_dynamic(model, {nn.Linear, *layer_types}, dtype=torch.qint8)
+    except RuntimeError as e:  # unsupported layer/engine combination (NotImplementedError included)
+        logger.warning(f"int8 quantization failed, serving float model: {e}")
+        return model
+
+
+def compile_for_inference(model):
+    """Switch to eval mode and compile the forward pass for fixed-shape serving."""
+    model.eval()
+    if not HAS_TORCH or not hasattr(torch, "compile"):
+        return model
+    try:
+        return torch.compile(model, mode="reduce-overhead", dynamic=False)
+    except RuntimeError as e:  # platform or Python version without dynamo support
+        logger.warning(f"torch.compile unavailable, serving eager model: {e}")
+        return model
+
+
+def trace_for_inference(model, example_inputs: tuple, cache_path: str | None = None):
+    """
+    TorchScript-trace an eval-mode model, freeze it and apply torch.jit.optimize_for_inference.
+
+    Freezing inlines the weights as constants so Linear/activation fusion, constant
+    folding and MKLDNN weight layouts can be applied. When cache_path is given, a
+    previously saved module is loaded instead of re-tracing (delete the file after
+    retraining), and a fresh trace is saved there.
+    """
+    if not HAS_TORCH:
+        return model
+    if cache_path and os.path.exists(cache_path):
+        try:
+            return torch.jit.load(cache_path, map_location="cpu")
+        except (RuntimeError, OSError) as e:  # unreadable, truncated or from another torch version
+            logger.warning(f"Could not load traced module {cache_path}, re-tracing: {e}")
+
+    model.eval()
+    try:
+        with torch.no_grad():
+            traced = torch.jit.trace(model, example_inputs, strict=False)
+        optimized = torch.jit.optimize_for_inference(traced)
+    except RuntimeError as e:  # torch.jit.Error and untraceable operations
+        logger.warning(f"TorchScript optimization failed, serving eager model: {e}")
+        return model
+
+    if cache_path:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        torch.jit.save(optimized, cache_path)
+        logger.info(f"Saved traced module to {cache_path}")
+    return optimized
+
+
+def export_onnx(
+    model,
+    path: str,
+    example_inputs: tuple,
+    input_names: list[str],
+    output_names: list[str],
+    dynamic_axes: dict | None = None,
+):
+    """Export an eval-mode model to ONNX; only the batch dimension is dynamic unless dynamic_axes is given."""
+    model.eval()
+    torch.onnx.export(
+        model,
+        example_inputs,
+        path,
+        input_names=input_names,
+        output_names=output_names,
+        dynamic_axes=dynamic_axes or {name: {0: "batch"} for name in input_names + output_names},
+        opset_version=17,
+    )
+    logger.info(f"Exported ONNX model to {path}")
+
+
+def quantize_onnx_int8(model_path: str, output_path: str, calibration_feeds: list[dict]):
+    """
+    Statically quantize an exported ONNX graph to int8 in QDQ format.
+
+    Weights are int8 per channel and activations uint8, with activation ranges
+    calibrated by running calibration_feeds (input name -> array dicts) through
+    the float graph.
+    """
+    if not HAS_ONNXRUNTIME:
+        raise RuntimeError("onnxruntime is not installed")
+
+    class _FeedReader(CalibrationDataReader):
+        def __init__(self, feeds):
+            self._feeds = iter(feeds)
+
+        def get_next(self):
+            return next(self._feeds, None)
+
+    quantize_static(
+        model_path,
+        output_path,
+        _FeedReader(calibration_feeds),
+        quant_format=QuantFormat.QDQ,
+        op_types_to_quantize=ONNX_INT8_OPERATORS,
+        per_channel=True,
+        weight_type=QuantType.QInt8,
+        activation_type=QuantType.QUInt8,
+    )
+    logger.info(f"Wrote int8 QDQ ONNX model to {output_path}")
+
+
+class OnnxModelRunner:
+    """Runs an exported ONNX graph with onnxruntime and returns outputs by name."""
+
+    def __init__(self, path: str):
+        if not HAS_ONNXRUNTIME:
+            raise RuntimeError("onnxruntime is not installed")
+        self._session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+        self._input_dtypes = {
+            graph_input.name: _ORT_DTYPES.get(graph_input.type, np.float32)
+            for graph_input in self._session.get_inputs()
+        }
+        self._output_names = [output.name for output in self._session.get_outputs()]
+
+    def __call__(self, **inputs: np.ndarray) -> dict:
+        feeds = {name: np.asarray(value, dtype=self._input_dtypes[name]) for name, value in inputs.items()}
+        return dict(zip(self._output_names, self._session.run(None, feeds)))
@@ -9,9 +9,19 @@ Purpose: Detect behavioral changes like sleep drops, mood declines, energy loss,
 and stress spikes that may indicate emerging health risks.
 """
 
+import copy
 import logging
+import os
+
 import numpy as np
 
+from ml.models.changepoint import detect_change_points, segment_changes
+from ml.models.optimization import (
+    compile_for_inference,
+    quantize_linear_int8,
+    trace_for_inference,
+)
+
 logger = logging.getLogger(__name__)
 
 try:
@@ -21,6 +31,14 @@ try:
 except ImportError:
     HAS_TORCH = False
 
+TIMESERIES_TRACED_PATH = "ml/artifacts/timeseries_detector.{variant}.pt"  # variant: causal or bidirectional
+
+if HAS_TORCH:
+    # Fixed-shape LSTM windows: let cuDNN pick the fastest kernels and allow TF32 matmuls on Ampere+
+    torch.backends.cudnn.benchmark = True
+    torch.backends.cuda.matmul.allow_tf32 = True
+    torch.backends.cudnn.allow_tf32 = True
+
 
 if HAS_TORCH:
     class TimeSeriesLSTMModel(nn.Module):
@@ -98,6 +116,44 @@ if HAS_TORCH:
         def get_feature_names(self):
             return ["sleep_hours", "mood_score", "energy_level", "stress_level", "steps_count"]
 
+        def to_causal(self) -> "TimeSeriesLSTMModel":
+            """
+            Inference-only copy that runs just the forward (causal) LSTM direction.
+
+            The trained forward-direction weights are reused; wherever a layer consumed
+            the concatenated [forward, backward] features (the upper LSTM layers' input
+            weights and the first Linear of each head), only the columns for the forward
+            half are kept. The backward contribution is dropped, so outputs approximate
+            the bidirectional model — fine-tune the heads on forward-only features if the
+            drift matters. LSTM and head FLOPs are roughly halved.
+            """
+            causal = copy.deepcopy(self).eval()
+            lstm = self.lstm
+            hidden = lstm.hidden_size
+            causal.lstm = nn.LSTM(
+                input_size=lstm.input_size,
+                hidden_size=hidden,
+                num_layers=lstm.num_layers,
+                batch_first=True,
+                dropout=lstm.dropout,
+                bidirectional=False,
+            )
+            with torch.no_grad():
+                for layer in range(lstm.num_layers):
+                    for name in ("weight_ih", "weight_hh", "bias_ih", "bias_hh"):
+                        weight = getattr(lstm, f"{name}_l{layer}")
+                        if name == "weight_ih" and layer > 0:
+                            weight = weight[:, :hidden]
+                        getattr(causal.lstm, f"{name}_l{layer}").copy_(weight)
+
+                for head in (causal.anomaly_scorer, causal.changepoint_detector, causal.ts_encoder):
+                    first = head[0]
+                    projection = nn.Linear(hidden, first.out_features)
+                    projection.weight.copy_(first.weight[:, :hidden])
+                    projection.bias.copy_(first.bias)
+                    head[0] = projection
+            return causal.eval()
+
 
 class StatisticalAnomalyDetector:
     """
@@ -114,92 +170,138 @@ class StatisticalAnomalyDetector:
         "steps_count": {"mean": 8000, "std": 3000, "low_threshold": 2000, "high_threshold": None},
     }
 
+    # NORMAL_RANGES as arrays aligned with METRICS (thresholds of None become NaN and never match)
+    METRICS = tuple(NORMAL_RANGES)
+    _MEANS = np.array([r["mean"] for r in NORMAL_RANGES.values()], dtype=np.float64)
+    _STDS = np.array([r["std"] for r in NORMAL_RANGES.values()], dtype=np.float64)
+    _LO = np.array([r["low_threshold"] or np.nan for r in NORMAL_RANGES.values()], dtype=np.float64)
+    _HI = np.array([r["high_threshold"] or np.nan for r in NORMAL_RANGES.values()], dtype=np.float64)
+    _EMBEDDING_SPAN = 12
+
     def detect_anomalies(self, current_metrics: dict, historical_metrics: list[dict] = None) -> dict:
         """
         Detect anomalies using Z-score analysis and trend detection.
 
         Returns:
-            dict with anomaly_scores, change_points, ts_embedding, and signal details
+            dict with anomaly_scores, change_points, ts_embedding (float32 array of 64,
+            ready for the fusion model), and signal details
         """
-        anomaly_scores = {}
-        signals = []
+        metrics = self.METRICS
+        raw = [current_metrics.get(metric) for metric in metrics]
+        values = np.array([np.nan if v is None else v for v in raw], dtype=np.float64)
+        present = ~np.isnan(values)
+
+        # Z-score relative to population norms, normalized to [0, 1]
+        with np.errstate(invalid="ignore"):
+            scores = np.minimum(1.0, np.abs((values - self._MEANS) / self._STDS) / 3.0)
+            below = values < self._LO
+            above = values > self._HI
+        scores = np.where(below | above, np.maximum(scores, 0.7), scores)
+        scores[~present] = 0.0
 
-        for metric, ranges in self.NORMAL_RANGES.items():
-            value = current_metrics.get(metric)
-            if value is None:
-                anomaly_scores[metric] = 0.0
-                continue
-
-            # Z-score relative to population norms
-            z_score = abs((value - ranges["mean"]) / ranges["std"]) if ranges["std"] else 0
-            anomaly_score = min(1.0, z_score / 3.0)  # Normalize to [0, 1]
-
-            # Threshold-based checks
-            if ranges.get("low_threshold") and value < ranges["low_threshold"]:
-                anomaly_score = max(anomaly_score, 0.7)
+        signals = []
+        for i in np.flatnonzero(below | above):
+            metric = metrics[i]
+            ranges = self.NORMAL_RANGES[metric]
+            score = float(scores[i])
+            if below[i]:
                 signals.append({
                     "metric": metric,
                     "type": "below_threshold",
-                    "value": value,
+                    "value": raw[i],
                     "threshold": ranges["low_threshold"],
-                    "score": anomaly_score,
+                    "score": score,
                 })
-
-            if ranges.get("high_threshold") and value > ranges["high_threshold"]:
-                anomaly_score = max(anomaly_score, 0.7)
+            if above[i]:
                 signals.append({
                     "metric": metric,
                     "type": "above_threshold",
-                    "value": value,
+                    "value": raw[i],
                     "threshold": ranges["high_threshold"],
-                    "score": anomaly_score,
+                    "score": score,
                 })
 
-            anomaly_scores[metric] = round(anomaly_score, 3)
+        rounded = scores.round(3)
+        anomaly_scores = dict(zip(metrics, rounded.tolist()))
 
-        # Historical trend analysis
+        # Historical trend analysis: mean shifts between PELT segments per metric
         change_points = []
         if historical_metrics and len(historical_metrics) >= 3:
-            for metric in self.NORMAL_RANGES:
-                values = [h.get(metric) for h in historical_metrics if h.get(metric) is not None]
-                if len(values) >= 3:
-                    # Simple change-point: significant day-over-day change
-                    for i in range(1, len(values)):
-                        daily_change = abs(values[i] - values[i - 1])
-                        std = self.NORMAL_RANGES[metric]["std"]
-                        if daily_change > std * 1.5:
-                            change_points.append({
-                                "metric": metric,
-                                "day_index": i,
-                                "change": round(values[i] - values[i - 1], 2),
-                                "significance": round(daily_change / std, 2),
-                            })
+            history = np.array(
+                [[np.nan if (v := h.get(metric)) is None else v for metric in metrics] for h in historical_metrics],
+                dtype=np.float64,
+            )
+            for j, metric in enumerate(metrics):
+                column = history[:, j]
+                column = column[~np.isnan(column)]
+                std = float(self._STDS[j])
+                breakpoints = detect_change_points(column, std)
+                for day_index, change in zip(breakpoints, segment_changes(column, breakpoints)):
+                    change_points.append({
+                        "metric": metric,
+                        "day_index": day_index,
+                        "change": round(change, 2),
+                        "significance": round(abs(change) / std, 2),
+                    })
 
         # Overall anomaly score
-        scores = [s for s in anomaly_scores.values() if s > 0]
-        overall_score = round(max(scores) if scores else 0.0, 3)
+        overall_score = round(float(rounded.max()) if rounded.any() else 0.0, 3)
 
         # Pseudo temporal embedding
-        ts_embedding = np.zeros(64)
-        for i, (metric, score) in enumerate(anomaly_scores.items()):
-            ts_embedding[i * 12:(i + 1) * 12] = score
+        ts_embedding = np.zeros(64, dtype=np.float32)
+        ts_embedding[:len(metrics) * self._EMBEDDING_SPAN] = np.repeat(rounded, self._EMBEDDING_SPAN)
 
         return {
             "anomaly_scores": anomaly_scores,
             "change_points": change_points,
-            "ts_embedding": ts_embedding.tolist(),
+            "ts_embedding": ts_embedding,
             "overall_score": overall_score,
             "signals": signals,
         }
 
 
+def quantize_timeseries_model(model):
+    """Dynamic int8 quantization of the LSTM and Linear layers (FBGEMM int8 LSTM kernels on CPU)."""
+    return quantize_linear_int8(model, layer_types=(nn.LSTM,))
+
+
+def save_quantized_timeseries(model, path: str):
+    """Persist the state_dict of a model returned by quantize_timeseries_model."""
+    torch.save(model.state_dict(), path)
+
+
+def load_quantized_timeseries(path: str, **model_kwargs):
+    """Rebuild the quantized module structure and load a state_dict saved by save_quantized_timeseries."""
+    model = quantize_timeseries_model(TimeSeriesLSTMModel(**model_kwargs))
+    model.load_state_dict(torch.load(path, map_location="cpu"))
+    return model
+
+
 # Factory function
-def create_timeseries_detector(use_lstm: bool = True):
-    """Create the appropriate detector based on available dependencies."""
+def create_timeseries_detector(use_lstm: bool = True, for_inference: bool = False, causal: bool = False):
+    """
+    Create the appropriate detector.
+
+    causal serves the forward-direction-only copy from TimeSeriesLSTMModel.to_causal().
+
+    With for_inference, the LSTM model is int8-quantized and traced into a frozen
+    TorchScript module for CPU serving (HEA_TORCHSCRIPT=0 skips the trace), or
+    torch.compile'd instead when HEA_QUANTIZE=0.
+    """
     if HAS_TORCH and use_lstm:
         try:
             model = TimeSeriesLSTMModel()
             logger.info("Created TimeSeriesLSTMModel")
+            if causal:
+                model = model.to_causal()
+            if for_inference:
+                if os.environ.get("HEA_QUANTIZE", "1") != "0":
+                    model = quantize_timeseries_model(model)
+                    if os.environ.get("HEA_TORCHSCRIPT", "1") != "0":
+                        cache_path = TIMESERIES_TRACED_PATH.format(variant="causal" if causal else "bidirectional")
+                        model = trace_for_inference(model, (torch.zeros(1, 30, 5),), cache_path)
+                else:
+                    model = compile_for_inference(model)
             return model
         except Exception as e:
             logger.warning(f"Could not create LSTM model: {e}")
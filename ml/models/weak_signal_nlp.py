@@ -9,9 +9,22 @@ Purpose: Detect subtle symptom mentions, severity language, frequency indicators
 and emotional distress signals in natural language health descriptions.
 """
 
+import hashlib
 import logging
+import os
+from functools import cache
+
 import numpy as np
 
+from ml.models.optimization import (
+    OnnxModelRunner,
+    export_onnx,
+    quantize_linear_int8,
+    quantize_onnx_int8,
+    trace_for_inference,
+)
+from ml.preprocessing import KeywordMatcher
+
 logger = logging.getLogger(__name__)
 
 try:
@@ -23,8 +36,31 @@ except ImportError:
     HAS_TORCH = False
     logger.warning("PyTorch/transformers not available. WeakSignalDetector will use rule-based fallback.")
 
+try:
+    import intel_extension_for_pytorch as ipex
+    HAS_IPEX = True
+except ImportError:
+    HAS_IPEX = False
+
 
 if HAS_TORCH:
+    @cache
+    def shared_encoder(pretrained_model: str = "distilbert-base-uncased"):
+        """
+        Frozen DistilBERT encoder loaded once per process and shared by every frozen model.
+
+        Weights come from the memory-mapped safetensors checkpoint. Call this in the
+        server's parent process before forking workers (e.g. gunicorn --preload) so the
+        read-only weight pages are shared copy-on-write instead of loaded per worker.
+        HEA_OFFLINE=1 loads from the local Hugging Face cache without contacting the Hub.
+        """
+        encoder = DistilBertModel.from_pretrained(
+            pretrained_model, use_safetensors=True, low_cpu_mem_usage=True,
+            local_files_only=os.environ.get("HEA_OFFLINE") == "1",
+        )
+        encoder.requires_grad_(False)
+        return encoder.eval()
+
     class WeakSignalNLPModel(nn.Module):
         """
         DistilBERT-based weak signal detector.
@@ -39,13 +75,24 @@ if HAS_TORCH:
 
         NUM_SIGNAL_TYPES = 8  # fatigue, pain, mood, sleep, digestive, respiratory, cardiovascular, neurological
 
-        def __init__(self, pretrained_model: str = "distilbert-base-uncased", dropout: float = 0.3):
+        def __init__(self, pretrained_model: str = "distilbert-base-uncased", dropout: float = 0.3,
+                     freeze_encoder: bool = True):
             super().__init__()
 
-            self.bert = DistilBertModel.from_pretrained(pretrained_model)
-
-            # Freeze early layers, fine-tune later ones
-            for param in list(self.bert.parameters())[:-30]:
+            # A frozen encoder trains only the pooling and heads, so its hidden states
+            # can be computed once without gradients (see EmbeddingCache); frozen models
+            # share one encoder instance, fine-tuned ones get their own copy
+            if freeze_encoder:
+                self.bert = shared_encoder(pretrained_model)
+            else:
+                self.bert = DistilBertModel.from_pretrained(
+                    pretrained_model, local_files_only=os.environ.get("HEA_OFFLINE") == "1",
+                )
+            self.freeze_encoder = freeze_encoder
+            # Set to torch.bfloat16 to run the encoder under autocast at inference time
+            self.inference_dtype = None
+            encoder_params = list(self.bert.parameters())
+            for param in encoder_params if freeze_encoder else encoder_params[:-30]:
                 param.requires_grad = False
 
             hidden_size = self.bert.config.hidden_size  # 768
@@ -57,7 +104,7 @@ if HAS_TORCH:
                 nn.Linear(128, 1),
             )
 
-            # Signal classification head
+            # Signal classification head (logits; forward_heads applies the sigmoid)
             self.signal_classifier = nn.Sequential(
                 nn.Linear(hidden_size, 256),
                 nn.ReLU(),
@@ -66,7 +113,6 @@ if HAS_TORCH:
                 nn.ReLU(),
                 nn.Dropout(dropout),
                 nn.Linear(128, self.NUM_SIGNAL_TYPES),
-                nn.Sigmoid(),
             )
 
             # Risk embedding head (for fusion)
@@ -77,11 +123,33 @@ if HAS_TORCH:
                 nn.Linear(256, 128),
             )
 
-        def forward(self, input_ids, attention_mask=None):
-            # Get BERT hidden states
-            outputs = self.bert(input_ids=input_ids, attention_mask=attention_mask)
-            hidden_states = outputs.last_hidden_state  # (batch, seq_len, 768)
+        def train(self, mode: bool = True):
+            # A frozen encoder stays in eval mode (no dropout) so cached hidden states stay valid
+            super().train(mode)
+            if self.freeze_encoder:
+                self.bert.eval()
+            return self
 
+        def forward(self, input_ids, attention_mask=None):
+            return self.forward_heads(self.encode(input_ids, attention_mask), attention_mask)
+
+        def encode(self, input_ids, attention_mask=None):
+            """DistilBERT hidden states (batch, seq_len, 768); no autograd graph when the encoder is frozen."""
+            autocast = self.inference_dtype is not None and not self.training
+            with torch.set_grad_enabled(torch.is_grad_enabled() and not self.freeze_encoder), torch.autocast(
+                device_type=input_ids.device.type, dtype=self.inference_dtype or torch.bfloat16, enabled=autocast,
+            ):
+                hidden_states = self.bert(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+            # Heads and pooling stay in float32
+            return hidden_states.float()
+
+        def forward_heads(self, hidden_states, attention_mask=None, return_logits: bool = False):
+            """
+            Attention pooling and output heads over precomputed encoder hidden states.
+
+            With return_logits, the pre-sigmoid signal logits are also returned as
+            signal_logits (for BCEWithLogitsLoss in training).
+            """
             # Attention pooling
             attn_scores = self.attention_layer(hidden_states).squeeze(-1)  # (batch, seq_len)
             if attention_mask is not None:
@@ -92,16 +160,19 @@ if HAS_TORCH:
             pooled = torch.bmm(attn_weights.unsqueeze(1), hidden_states).squeeze(1)  # (batch, 768)
 
             # Signal scores
-            signal_scores = self.signal_classifier(pooled)  # (batch, num_signals)
+            signal_logits = self.signal_classifier(pooled)  # (batch, num_signals)
 
             # Risk embedding
             risk_embedding = self.risk_encoder(pooled)  # (batch, 128)
 
-            return {
-                "signal_scores": signal_scores,
+            outputs = {
+                "signal_scores": torch.sigmoid(signal_logits),
                 "attention_weights": attn_weights,
                 "risk_embedding": risk_embedding,
             }
+            if return_logits:
+                outputs["signal_logits"] = signal_logits
+            return outputs
 
         def get_signal_names(self):
             return [
@@ -110,6 +181,56 @@ if HAS_TORCH:
             ]
 
 
+class EmbeddingCache:
+    """
+    Memoizes frozen-encoder hidden states per tokenized text.
+
+    Entries are keyed by a hash of the unpadded input_ids and stored on the CPU in
+    float16, trimmed to the text's real length. Training a model with
+    freeze_encoder=True runs DistilBERT once per distinct text instead of once per
+    epoch. save()/load() persist the cache between runs with torch.save.
+    """
+
+    def __init__(self):
+        self._entries: dict[str, torch.Tensor] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _key(ids: "torch.Tensor") -> str:
+        return hashlib.blake2b(ids.cpu().numpy().tobytes(), digest_size=16).hexdigest()
+
+    def encode(self, model, input_ids, attention_mask):
+        """Hidden states for a padded batch, running the encoder only on uncached rows."""
+        lengths = attention_mask.sum(dim=1).tolist()
+        keys = [self._key(input_ids[i, :n]) for i, n in enumerate(lengths)]
+
+        missing = [i for i, key in enumerate(keys) if key not in self._entries]
+        if missing:
+            with torch.no_grad():
+                hidden = model.encode(input_ids[missing], attention_mask[missing])
+            for row, i in enumerate(missing):
+                self._entries[keys[i]] = hidden[row, :lengths[i]].to("cpu", torch.float16)
+
+        batch = torch.zeros(
+            input_ids.shape[0], input_ids.shape[1], model.bert.config.hidden_size, device=input_ids.device,
+        )
+        for i, key in enumerate(keys):
+            batch[i, :lengths[i]] = self._entries[key].to(input_ids.device, torch.float32)
+        return batch
+
+    def save(self, path: str):
+        torch.save(self._entries, path)
+
+    @classmethod
+    def load(cls, path: str) -> "EmbeddingCache":
+        cache = cls()
+        if os.path.exists(path):
+            cache._entries = torch.load(path)
+        return cache
+
+
 class WeakSignalDetectorFallback:
     """
     Rule-based fallback for environments without PyTorch.
@@ -127,39 +248,110 @@ class WeakSignalDetectorFallback:
         "neurological_signal": ["headache", "migraine", "numbness", "tingling", "vision", "memory", "confusion"],
     }
 
+    SIGNAL_NAMES = tuple(SIGNAL_KEYWORDS)
+    # keyword -> index of its signal in SIGNAL_NAMES (each keyword belongs to exactly one signal)
+    _KEYWORD_SIGNAL = {kw: i for i, kws in enumerate(SIGNAL_KEYWORDS.values()) for kw in kws}
+
+    # One automaton over every signal keyword, scanned once per text
+    _MATCHER = KeywordMatcher(_KEYWORD_SIGNAL)
+
     def predict(self, text: str) -> dict:
         """Run rule-based signal detection."""
         text_lower = text.lower() if text else ""
 
-        signal_scores = {}
-        for signal_name, keywords in self.SIGNAL_KEYWORDS.items():
-            matches = sum(1 for kw in keywords if kw in text_lower)
-            score = min(1.0, matches * 0.25)
-            signal_scores[signal_name] = round(score, 3)
+        # Distinct matched keywords per signal, accumulated from the single scan
+        counts = np.zeros(len(self.SIGNAL_NAMES), dtype=np.int32)
+        if text_lower:
+            for kw in self._MATCHER.find(text_lower):
+                counts[self._KEYWORD_SIGNAL[kw]] += 1
+        scores = np.minimum(1.0, counts * 0.25)
+        signal_scores = dict(zip(self.SIGNAL_NAMES, scores.round(3).tolist()))
 
         # Generate pseudo attention weights
         words = text_lower.split() if text_lower else []
-        all_keywords = [kw for kws in self.SIGNAL_KEYWORDS.values() for kw in kws]
-        attention = [0.8 if any(kw in word for kw in all_keywords) else 0.1 for word in words]
+        attention = [0.8 if self._MATCHER.contains_any(word) else 0.1 for word in words]
 
-        # Risk embedding (simplified 128-dim)
-        risk_embedding = np.zeros(128)
-        for i, (name, score) in enumerate(signal_scores.items()):
-            risk_embedding[i * 16:(i + 1) * 16] = score
+        # Risk embedding (simplified 128-dim): each signal's score repeated over a 16-wide block,
+        # returned as a float32 array the fusion model consumes without a list round trip
+        risk_embedding = np.repeat(scores.round(3).astype(np.float32), 128 // len(scores))
 
         return {
             "signal_scores": signal_scores,
             "attention_weights": attention[:50],
-            "risk_embedding": risk_embedding.tolist(),
+            "risk_embedding": risk_embedding,
         }
 
 
+WEAK_SIGNAL_ONNX_INPUTS = ["input_ids", "attention_mask"]
+WEAK_SIGNAL_ONNX_OUTPUTS = ["signal_scores", "attention_weights", "risk_embedding"]
+WEAK_SIGNAL_ONNX_PATH = "ml/trained_models/weak_signal_nlp/model.int8.onnx"
+WEAK_SIGNAL_TRACED_PATH = "ml/artifacts/weak_signal_nlp.{variant}.pt"
+
+
+def export_weak_signal_onnx(model, path: str, calibration_batches: list[dict] | None = None, max_length: int = 256):
+    """
+    Export a float WeakSignalNLPModel to ONNX with dynamic batch and sequence axes.
+
+    When calibration_batches (tokenized input_ids/attention_mask arrays) are given,
+    the exported graph is statically quantized to int8 QDQ and written to path;
+    the float graph is kept next to it as *.fp32.onnx. Export the model before
+    torch dynamic quantization — quantized Linear modules do not export.
+    """
+    dummy_ids = torch.ones(1, max_length, dtype=torch.long)
+    dummy_mask = torch.ones(1, max_length, dtype=torch.long)
+    float_path = path.replace(".onnx", ".fp32.onnx") if calibration_batches else path
+    export_onnx(
+        model,
+        float_path,
+        (dummy_ids, dummy_mask),
+        WEAK_SIGNAL_ONNX_INPUTS,
+        WEAK_SIGNAL_ONNX_OUTPUTS,
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "signal_scores": {0: "batch"},
+            "attention_weights": {0: "batch", 1: "sequence"},
+            "risk_embedding": {0: "batch"},
+        },
+    )
+    if calibration_batches:
+        quantize_onnx_int8(float_path, path, calibration_batches)
+
+
+def load_weak_signal_onnx(path: str = WEAK_SIGNAL_ONNX_PATH) -> OnnxModelRunner:
+    """Load an exported detector graph; call it with input_ids=..., attention_mask=... arrays."""
+    return OnnxModelRunner(path)
+
+
 # Factory function
 def create_weak_signal_detector(use_transformer: bool = True):
     """Create the appropriate detector based on available dependencies."""
+    if use_transformer and os.environ.get("HEA_USE_ORT") == "1":
+        try:
+            runner = load_weak_signal_onnx(os.environ.get("HEA_WEAK_SIGNAL_ONNX", WEAK_SIGNAL_ONNX_PATH))
+            logger.info("Loaded WeakSignalNLPModel ONNX graph (onnxruntime)")
+            return runner
+        except Exception as e:
+            logger.warning(f"Could not load ONNX detector: {e}")
+
     if HAS_TORCH and use_transformer:
         try:
             model = WeakSignalNLPModel()
+            model.eval()
+            # int8 Linear weights by default; HEA_QUANTIZE=0 serves the bfloat16-autocast model
+            variant = "int8" if os.environ.get("HEA_QUANTIZE", "1") != "0" else "bf16"
+            if variant == "int8":
+                model = quantize_linear_int8(model)
+            else:
+                # Float path: bfloat16 encoder (AVX512-BF16/AMX when available)
+                model.inference_dtype = torch.bfloat16
+                if HAS_IPEX:
+                    model = ipex.optimize(model, dtype=torch.bfloat16)
+            # Frozen TorchScript module cached on disk; HEA_TORCHSCRIPT=0 keeps the eager module
+            if os.environ.get("HEA_TORCHSCRIPT", "1") != "0":
+                example = torch.ones(1, 256, dtype=torch.long)
+                cache_path = WEAK_SIGNAL_TRACED_PATH.format(variant=variant)
+                model = trace_for_inference(model, (example, torch.ones_like(example)), cache_path)
             logger.info("Created WeakSignalNLPModel (DistilBERT)")
             return model
         except Exception as e:
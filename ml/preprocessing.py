@@ -5,6 +5,9 @@ Text normalization, emoji tokenization, and spell correction for health inputs.
 
 import re
 import logging
+from functools import lru_cache
+from importlib import resources
+import numpy as np
 from typing import Optional
 
 logger = logging.getLogger(__name__)
@@ -18,11 +21,79 @@ except ImportError:
     logger.warning("emoji library not available, using basic emoji processing")
 
 try:
-    from textblob import TextBlob
-    HAS_TEXTBLOB = True
+    from symspellpy import SymSpell, Verbosity
+    HAS_SYMSPELL = True
 except ImportError:
-    HAS_TEXTBLOB = False
-    logger.warning("textblob not available, spell correction disabled")
+    HAS_SYMSPELL = False
+    logger.warning("symspellpy not available, general spell correction disabled")
+
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+
+
+@lru_cache(maxsize=1)
+def _symspell() -> "SymSpell":
+    """SymSpell index over symspellpy's bundled English frequency dictionary, built on first use."""
+    symspell = SymSpell(max_dictionary_edit_distance=2, prefix_length=7)
+    dictionary = resources.files("symspellpy") / "frequency_dictionary_en_82_765.txt"
+    symspell.load_dictionary(str(dictionary), term_index=0, count_index=1)
+    return symspell
+
+
+# Precompiled normalize_text patterns
+_RE_WS = re.compile(r"\s+")
+_RE_PUNCT = re.compile(r"[^\w\s.,!?'-]")
+# Standalone alphabetic words (optionally with an apostrophe); "9pm" and "2.5" are not matched
+_RE_SPELL_WORD = re.compile(r"\b[a-z]+(?:'[a-z]+)?\b")
+
+
+class KeywordMatcher:
+    """Finds which of a fixed set of keywords occur in a text, ignoring case.
+
+    Uses a single Aho-Corasick scan when pyahocorasick is installed, otherwise
+    one compiled regex alternation.
+    """
+
+    def __init__(self, keywords):
+        self._keywords = tuple(dict.fromkeys(keyword.lower() for keyword in keywords))
+        self._automaton = None
+        if HAS_AHOCORASICK:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in self._keywords:
+                self._automaton.add_word(keyword, keyword)
+            self._automaton.make_automaton()
+        else:
+            # Longest first, so at each position the lookahead reports the longest keyword
+            # starting there; the shorter keywords starting at the same position are its prefixes
+            ordered = sorted(self._keywords, key=len, reverse=True)
+            self._pattern = re.compile("|".join(map(re.escape, ordered)) or "(?!)")
+            self._overlapping = re.compile(f"(?=({self._pattern.pattern}))")
+            self._prefixes = {
+                keyword: [other for other in self._keywords if keyword.startswith(other)] for keyword in self._keywords
+            }
+
+    @staticmethod
+    def _fold(text: str) -> str:
+        return text if text.islower() else text.lower()
+
+    def find(self, text: str) -> set[str]:
+        """Return the keywords that occur in text."""
+        text = self._fold(text)
+        if self._automaton is None:
+            return {
+                keyword for longest in set(self._overlapping.findall(text)) for keyword in self._prefixes[longest]
+            }
+        return {keyword for _, keyword in self._automaton.iter(text)}
+
+    def contains_any(self, text: str) -> bool:
+        """Return True if any keyword occurs in text."""
+        text = self._fold(text)
+        if self._automaton is None:
+            return self._pattern.search(text) is not None
+        return next(self._automaton.iter(text), None) is not None
 
 
 class TextPreprocessor:
@@ -66,6 +137,40 @@ class TextPreprocessor:
         "palpatations": "palpitations",
         "congestion": "congestion",
     }
+    # General spell correction is skipped for inputs with this many words or more
+    SPELLCHECK_MAX_WORDS = 40
+
+    # All misspellings as one alternation (longest first), replaced in a single scan
+    _CORRECTIONS_RE = re.compile(
+        "|".join(map(re.escape, sorted(SYMPTOM_CORRECTIONS, key=len, reverse=True)))
+    )
+
+    # Health-related keywords reported by extract_symptom_keywords, in output order
+    SYMPTOM_KEYWORDS = (
+        "headache", "migraine", "fatigue", "tired", "exhausted",
+        "nausea", "vomiting", "dizziness", "dizzy", "insomnia",
+        "anxiety", "anxious", "depressed", "depression", "stress",
+        "pain", "ache", "sore", "cramp", "inflammation",
+        "fever", "cough", "cold", "flu", "congestion",
+        "shortness of breath", "breathing", "palpitations",
+        "chest pain", "numbness", "tingling", "weakness",
+        "appetite", "weight loss", "weight gain", "bloating",
+        "constipation", "diarrhea", "rash", "itch", "swelling",
+        "blurry vision", "tinnitus", "hearing", "memory",
+        "concentration", "brain fog", "restless", "sweating",
+    )
+    _SYMPTOM_MATCHER = KeywordMatcher(SYMPTOM_KEYWORDS)
+
+    # Words general spell correction never rewrites: symptom keywords, plus apostrophe-less
+    # contractions and chat words that SymSpell would "fix" into other words (ok -> of)
+    SPELLCHECK_KEEP = frozenset(
+        {word for keyword in SYMPTOM_KEYWORDS for word in keyword.split()}
+        | {"dont", "didnt", "doesnt", "isnt", "wasnt", "arent", "wont", "cant", "couldnt",
+           "shouldnt", "havent", "hasnt", "ok", "okay", "im", "ive", "idk", "lol"}
+    )
+    # Only words at least this long are corrected, and only by a single edit
+    SPELLCHECK_MIN_LENGTH = 4
+    SPELLCHECK_MAX_EDIT_DISTANCE = 1
 
     @classmethod
     def normalize_text(cls, text: Optional[str]) -> Optional[str]:
@@ -83,8 +188,8 @@ class TextPreprocessor:
         text = cls._correct_spelling(text)
 
         # Step 4: Normalize whitespace & punctuation
-        text = re.sub(r"\s+", " ", text)
-        text = re.sub(r"[^\w\s.,!?'-]", " ", text)
+        text = _RE_WS.sub(" ", text)
+        text = _RE_PUNCT.sub(" ", text)
         text = text.strip()
 
         return text if text else None
@@ -111,23 +216,8 @@ class TextPreprocessor:
         if not text:
             return []
 
-        SYMPTOM_KEYWORDS = [
-            "headache", "migraine", "fatigue", "tired", "exhausted",
-            "nausea", "vomiting", "dizziness", "dizzy", "insomnia",
-            "anxiety", "anxious", "depressed", "depression", "stress",
-            "pain", "ache", "sore", "cramp", "inflammation",
-            "fever", "cough", "cold", "flu", "congestion",
-            "shortness of breath", "breathing", "palpitations",
-            "chest pain", "numbness", "tingling", "weakness",
-            "appetite", "weight loss", "weight gain", "bloating",
-            "constipation", "diarrhea", "rash", "itch", "swelling",
-            "blurry vision", "tinnitus", "hearing", "memory",
-            "concentration", "brain fog", "restless", "sweating",
-        ]
-
-        text_lower = text.lower()
-        found = [kw for kw in SYMPTOM_KEYWORDS if kw in text_lower]
-        return found
+        found = cls._SYMPTOM_MATCHER.find(text)
+        return [kw for kw in cls.SYMPTOM_KEYWORDS if kw in found]
 
     @classmethod
     def _expand_abbreviations(cls, text: str) -> str:
@@ -146,23 +236,68 @@ class TextPreprocessor:
     def _correct_spelling(cls, text: str) -> str:
         """Correct common health-related misspellings."""
         # First, apply known corrections
-        for wrong, right in cls.SYMPTOM_CORRECTIONS.items():
-            text = text.replace(wrong, right)
+        corrections = cls.SYMPTOM_CORRECTIONS
+        text, replaced = cls._CORRECTIONS_RE.subn(lambda m: corrections[m.group()], text)
+        if replaced:
+            return text
 
-        # Optionally use TextBlob for general spelling correction
-        if HAS_TEXTBLOB:
+        # Otherwise use SymSpell for general spelling correction (skipped for long inputs)
+        if HAS_SYMSPELL and len(text.split()) < cls.SPELLCHECK_MAX_WORDS:
             try:
-                blob = TextBlob(text)
-                corrected = str(blob.correct())
-                # Only use correction if it's not too different (avoid over-correction)
-                if len(corrected) < len(text) * 2:
-                    return corrected
+                # Word by word so digits, times and punctuation are left untouched
+                symspell = _symspell()
+
+                def _closest(match: re.Match) -> str:
+                    word = match.group()
+                    if len(word) < cls.SPELLCHECK_MIN_LENGTH or "'" in word or word in cls.SPELLCHECK_KEEP:
+                        return word
+                    suggestions = symspell.lookup(
+                        word, Verbosity.TOP, max_edit_distance=cls.SPELLCHECK_MAX_EDIT_DISTANCE
+                    )
+                    return suggestions[0].term if suggestions else word
+
+                return _RE_SPELL_WORD.sub(_closest, text)
             except Exception:
                 pass
 
         return text
 
 
+class MetricsFrame:
+    """
+    Column-oriented (structure-of-arrays) historical daily metrics.
+    Each metric is a float64 array in chronological order; NaN marks a missing value.
+    Build it once at ingestion with from_records() instead of re-scanning dicts per metric.
+    """
+
+    METRICS = ("sleep_hours", "mood_score", "energy_level", "stress_level")
+    __slots__ = METRICS
+
+    def __init__(self, **columns):
+        for metric in self.METRICS:
+            setattr(self, metric, np.asarray(columns[metric], dtype=np.float64))
+
+    @classmethod
+    def from_records(cls, historical: list[dict]) -> "MetricsFrame":
+        """Build columns from a list of daily metric dicts (None or absent → NaN)."""
+        return cls(**{
+            metric: np.fromiter(
+                (np.nan if h.get(metric) is None else h[metric] for h in historical),
+                dtype=np.float64,
+                count=len(historical),
+            )
+            for metric in cls.METRICS
+        })
+
+    def __len__(self) -> int:
+        return len(self.sleep_hours)
+
+    def present(self, metric: str) -> np.ndarray:
+        """Recorded values of a metric, skipping missing days."""
+        column = getattr(self, metric)
+        return column[~np.isnan(column)]
+
+
 class MetricsPreprocessor:
     """Preprocesses daily metrics for time-series analysis."""
 
@@ -191,25 +326,29 @@ class MetricsPreprocessor:
         return normalized
 
     @classmethod
-    def compute_rolling_features(cls, historical: list[dict], window: int = 3) -> dict:
+    def compute_rolling_features(cls, historical: list[dict] | MetricsFrame, window: int = 3) -> dict:
         """Compute rolling statistics from historical metrics."""
+        if not isinstance(historical, MetricsFrame):
+            historical = MetricsFrame.from_records(historical)
+        return cls._compute_rolling_features_frame(historical, window)
+
+    @classmethod
+    def _compute_rolling_features_frame(cls, frame: MetricsFrame, window: int) -> dict:
+        """compute_rolling_features over MetricsFrame columns."""
         features = {}
 
-        for metric in ["sleep_hours", "mood_score", "energy_level", "stress_level"]:
-            values = [h.get(metric) for h in historical if h.get(metric) is not None]
+        for metric in MetricsFrame.METRICS:
+            values = frame.present(metric)
 
             if len(values) >= window:
                 recent = values[-window:]
-                features[f"{metric}_rolling_mean"] = round(sum(recent) / len(recent), 2)
-                features[f"{metric}_rolling_std"] = round(
-                    (sum((x - sum(recent) / len(recent)) ** 2 for x in recent) / len(recent)) ** 0.5, 2
-                )
+                recent_avg = float(recent.mean())
+                features[f"{metric}_rolling_mean"] = round(recent_avg, 2)
+                features[f"{metric}_rolling_std"] = round(float(recent.std()), 2)
 
                 # Trend direction
                 if len(values) >= window * 2:
-                    older = values[-window * 2 : -window]
-                    older_avg = sum(older) / len(older)
-                    recent_avg = sum(recent) / len(recent)
+                    older_avg = float(values[-window * 2 : -window].mean())
                     features[f"{metric}_trend"] = round(recent_avg - older_avg, 2)
                     features[f"{metric}_trend_dir"] = "improving" if recent_avg > older_avg else "declining"
 
@@ -0,0 +1,40 @@
+"""
+Regression tests for TextPreprocessor spell correction.
+"""
+
+import pytest
+
+from ml.preprocessing import TextPreprocessor
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("ok", "ok"),
+        ("dont help", "dont help"),
+        ("didnt sleep well", "didnt sleep well"),
+        ("isnt getting better", "isnt getting better"),
+        ("i wont go, cant focus", "i wont go, cant focus"),
+        ("im exhausted", "im exhausted"),
+        ("don't know", "don't know"),
+    ],
+)
+def test_contractions_and_chat_words_are_kept(text, expected):
+    assert TextPreprocessor.normalize_text(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["slept at 9pm, took 2.5 mg", "fever 38.5 since 7am", "bloating and cramp"],
+)
+def test_numbers_punctuation_and_keywords_are_untouched(text):
+    assert TextPreprocessor.normalize_text(text) == text
+
+
+def test_known_misspellings_are_corrected():
+    assert TextPreprocessor.normalize_text("bad hedache today") == "bad headache today"
+
+
+def test_single_edit_typos_are_corrected():
+    pytest.importorskip("symspellpy")
+    assert TextPreprocessor.normalize_text("feel dizy") == "feel dizzy"
@@ -5,62 +5,88 @@ Computes signal precision, false alarm rate, and feedback alignment metrics.
 
 import json
 import logging
+from collections.abc import Iterable, Iterator
+from itertools import chain
 from pathlib import Path
-from collections import defaultdict
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+try:
+    import ijson
+    HAS_IJSON = True
+except ImportError:
+    HAS_IJSON = False
+
+RISK_LEVELS = ("LOW", "WEAK", "MODERATE", "HIGH")
+
+# Risk levels counted as a positive (signal raised) in the binary metrics
+POSITIVE_RISK_LEVELS = frozenset(("HIGH", "MODERATE"))
+
+
+def iter_json_records(path: str) -> Iterator[dict]:
+    """Yield the objects of a JSON array file one at a time (incrementally parsed when ijson is installed)."""
+    with open(path, "rb") as f:
+        if HAS_IJSON:
+            # use_float keeps numbers as float instead of Decimal, like json.load
+            yield from ijson.items(f, "item", use_float=True)
+        else:
+            yield from json.load(f)
+
 
-def evaluate_predictions(predictions: list[dict], ground_truth: list[dict]) -> dict:
+def evaluate_predictions(predictions: Iterable[dict], ground_truth: list[dict]) -> dict:
     """
     Evaluate model predictions against ground truth.
 
+    predictions may be any iterable (e.g. iter_json_records(path)); it is consumed
+    once and only the matched risk level pairs are kept.
+
     Metrics:
     - Signal Precision: % of detected signals that were true positives (target ≥ 0.7)
     - False Alarm Rate: % of predictions that were false positives (target ≤ 0.3)
     - Feedback Alignment: correlation between model output and user feedback
     - Risk Level Accuracy: correct risk level classification rate
     """
-    if not predictions or not ground_truth:
+    predictions = iter(predictions)
+    first = next(predictions, None)
+    if first is None or not ground_truth:
         return {"error": "No data to evaluate"}
 
-    # Build lookup
-    gt_map = {g["id"]: g for g in ground_truth}
-
-    true_positives = 0
-    false_positives = 0
-    true_negatives = 0
-    false_negatives = 0
-    correct_risk = 0
-    total = 0
-    risk_confusion = defaultdict(lambda: defaultdict(int))
-
-    for pred in predictions:
-        gt = gt_map.get(pred.get("id"))
-        if not gt:
-            continue
-
-        total += 1
-        pred_risk = pred.get("risk_level", "LOW")
-        actual_risk = gt.get("risk_level", "LOW")
-
-        risk_confusion[actual_risk][pred_risk] += 1
-
-        if pred_risk == actual_risk:
-            correct_risk += 1
-
-        # Binary classification: HIGH/MODERATE = positive, LOW/WEAK = negative
-        pred_positive = pred_risk in ("HIGH", "MODERATE")
-        actual_positive = actual_risk in ("HIGH", "MODERATE")
-
-        if pred_positive and actual_positive:
-            true_positives += 1
-        elif pred_positive and not actual_positive:
-            false_positives += 1
-        elif not pred_positive and not actual_positive:
-            true_negatives += 1
-        else:
-            false_negatives += 1
+    # Risk levels are interned as integer codes on load: known levels have fixed
+    # codes, anything else gets the next free code the first time it is seen
+    codes = {level: i for i, level in enumerate(RISK_LEVELS)}
+    gt_codes = {g["id"]: codes.setdefault(g.get("risk_level", "LOW"), len(codes)) for g in ground_truth}
+
+    pred_list, actual_list = [], []
+    for pred in chain((first,), predictions):
+        actual = gt_codes.get(pred.get("id"))
+        if actual is not None:
+            pred_list.append(codes.setdefault(pred.get("risk_level", "LOW"), len(codes)))
+            actual_list.append(actual)
+    labels = list(codes)
+    total = len(pred_list)
+    pred_codes = np.array(pred_list, dtype=np.intp)
+    actual_codes = np.array(actual_list, dtype=np.intp)
+
+    correct_risk = int(np.count_nonzero(pred_codes == actual_codes))
+
+    # Binary classification: HIGH/MODERATE = positive, LOW/WEAK = negative
+    is_positive = np.array([level in POSITIVE_RISK_LEVELS for level in labels], dtype=bool)
+    pred_positive = is_positive[pred_codes]
+    actual_positive = is_positive[actual_codes]
+    true_positives = int(np.count_nonzero(pred_positive & actual_positive))
+    false_positives = int(np.count_nonzero(pred_positive & ~actual_positive))
+    true_negatives = int(np.count_nonzero(~pred_positive & ~actual_positive))
+    false_negatives = total - true_positives - false_positives - true_negatives
+
+    # Confusion matrix: actual level -> predicted level -> count (non-zero cells only)
+    k = len(labels)
+    counts = np.bincount(actual_codes * k + pred_codes, minlength=k * k).reshape(k, k)
+    risk_confusion = {
+        labels[a]: {labels[p]: int(n) for p, n in enumerate(counts[a]) if n}
+        for a in dict.fromkeys(actual_codes.tolist())
+    }
 
     # Calculate metrics
     signal_precision = true_positives / (true_positives + false_positives) if (true_positives + false_positives) > 0 else 0
@@ -98,14 +124,25 @@ def evaluate_feedback_alignment(feedback_data: list[dict]) -> dict:
     if not feedback_data:
         return {"alignment_score": 0.0, "total_feedback": 0}
 
-    confirms = sum(1 for f in feedback_data if f.get("feedback_type") == "confirm")
-    rejects = sum(1 for f in feedback_data if f.get("feedback_type") == "reject")
-    adjusts = sum(1 for f in feedback_data if f.get("feedback_type") == "adjust")
+    # Single pass with running counts instead of one scan per metric
+    confirms = rejects = adjusts = 0
+    relevance_sum = relevance_count = 0
+    for f in feedback_data:
+        feedback_type = f.get("feedback_type")
+        if feedback_type == "confirm":
+            confirms += 1
+        elif feedback_type == "reject":
+            rejects += 1
+        elif feedback_type == "adjust":
+            adjusts += 1
+        relevance = f.get("relevance_score")
+        if relevance:
+            relevance_sum += relevance
+            relevance_count += 1
     total = len(feedback_data)
 
     alignment = (confirms + 0.5 * adjusts) / total if total else 0
-    relevance_scores = [f["relevance_score"] for f in feedback_data if f.get("relevance_score")]
-    avg_relevance = sum(relevance_scores) / len(relevance_scores) if relevance_scores else 0
+    avg_relevance = relevance_sum / relevance_count if relevance_count else 0
 
     return {
         "alignment_score": round(alignment, 4),
@@ -118,12 +155,14 @@ def evaluate_feedback_alignment(feedback_data: list[dict]) -> dict:
 
 
 def generate_evaluation_report(
-    predictions: list[dict],
+    predictions: Iterable[dict] | str,
     ground_truth: list[dict],
     feedback_data: list[dict] = None,
     output_path: str = "ml/evaluation_report.json",
 ) -> dict:
-    """Generate a complete evaluation report."""
+    """Generate a complete evaluation report (predictions may be a path to a JSON array file)."""
+    if isinstance(predictions, str):
+        predictions = iter_json_records(predictions)
     report = {
         "prediction_metrics": evaluate_predictions(predictions, ground_truth),
         "feedback_alignment": evaluate_feedback_alignment(feedback_data or []),
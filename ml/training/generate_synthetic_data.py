@@ -3,12 +3,25 @@ Synthetic Data Generator for Hea ML Pipelines
 Generates realistic training data mimicking user health inputs.
 """
 
+import logging
+import os
 import random
-import json
-import uuid
-from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 from pathlib import Path
 
+import numpy as np
+import orjson
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    from pyarrow import feather
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
 # Symptom text templates
 SYMPTOM_TEMPLATES = {
     "low_risk": [
@@ -65,133 +78,229 @@ EMOJI_INPUTS = {
 }
 
 
-def generate_daily_metrics(risk_level: str) -> dict:
+RISK_LEVELS = ("low_risk", "weak_risk", "moderate_risk", "high_risk")
+
+# Per metric: (low, high) bounds for each entry of RISK_LEVELS; integer metrics include high
+METRIC_RANGES = {
+    "sleep_hours": np.array([(6.5, 9), (5, 7.5), (3.5, 6), (2, 5)]),
+    "mood_score": np.array([(6, 10), (4, 7), (2, 5), (1, 3)]),
+    "energy_level": np.array([(6, 10), (4, 7), (2, 5), (1, 3)]),
+    "stress_level": np.array([(1, 4), (4, 6), (6, 8), (7, 10)]),
+    "steps_count": np.array([(6000, 15000), (4000, 10000), (2000, 7000), (500, 4000)]),
+}
+WATER_INTAKE_RANGE = (800, 3000)
+
+# Lossless narrow storage of daily_metrics in the Arrow cache: (field, integer dtype, scale).
+# sleep_hours has one decimal and is stored in tenths; the others are integers in range.
+METRIC_STORAGE = (
+    ("sleep_hours", np.int8, 10),
+    ("mood_score", np.int8, 1),
+    ("energy_level", np.int8, 1),
+    ("stress_level", np.int8, 1),
+    ("steps_count", np.int16, 1),
+    ("water_intake_ml", np.int16, 1),
+)
+
+
+def generate_daily_metrics_batch(risk_idx: np.ndarray, rng: np.random.Generator) -> list[dict]:
+    """Realistic daily metrics for each risk level index (into RISK_LEVELS), drawn column-wise."""
+    n = len(risk_idx)
+    columns = {}
+    for metric, bounds in METRIC_RANGES.items():
+        low, high = bounds[risk_idx, 0], bounds[risk_idx, 1]
+        if metric == "sleep_hours":
+            columns[metric] = np.round(rng.uniform(low, high), 1).tolist()
+        else:
+            columns[metric] = rng.integers(low.astype(np.int64), high.astype(np.int64), endpoint=True).tolist()
+    columns["water_intake_ml"] = rng.integers(*WATER_INTAKE_RANGE, size=n, endpoint=True).tolist()
+
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+
+def generate_daily_metrics(risk_level: str, rng: np.random.Generator | None = None) -> dict:
     """Generate realistic daily metrics based on risk level."""
-    ranges = {
-        "low_risk": {"sleep": (6.5, 9), "mood": (6, 10), "energy": (6, 10), "stress": (1, 4), "steps": (6000, 15000)},
-        "weak_risk": {"sleep": (5, 7.5), "mood": (4, 7), "energy": (4, 7), "stress": (4, 6), "steps": (4000, 10000)},
-        "moderate_risk": {"sleep": (3.5, 6), "mood": (2, 5), "energy": (2, 5), "stress": (6, 8), "steps": (2000, 7000)},
-        "high_risk": {"sleep": (2, 5), "mood": (1, 3), "energy": (1, 3), "stress": (7, 10), "steps": (500, 4000)},
-    }
-
-    r = ranges[risk_level]
-    return {
-        "sleep_hours": round(random.uniform(*r["sleep"]), 1),
-        "mood_score": random.randint(*r["mood"]),
-        "energy_level": random.randint(*r["energy"]),
-        "stress_level": random.randint(*r["stress"]),
-        "steps_count": random.randint(*r["steps"]),
-        "water_intake_ml": random.randint(800, 3000),
-    }
-
-
-def generate_checkbox_selections(risk_level: str) -> list:
-    """Generate checkbox selections based on risk level."""
-    selection_counts = {"low_risk": (0, 1), "weak_risk": (1, 2), "moderate_risk": (2, 4), "high_risk": (3, 6)}
-    high_concern = ["chest_pain", "shortness_of_breath", "heart_palpitations"]
-    moderate_concern = ["headache", "fatigue", "insomnia", "anxiety", "dizziness", "nausea"]
-    low_concern = ["muscle_ache", "cough", "congestion", "appetite_change"]
-
-    count = random.randint(*selection_counts[risk_level])
-
-    if risk_level == "high_risk":
-        selections = random.sample(high_concern, min(count, len(high_concern)))
-        remaining = count - len(selections)
-        if remaining > 0:
-            selections += random.sample(moderate_concern, min(remaining, len(moderate_concern)))
-    elif risk_level == "moderate_risk":
-        selections = random.sample(moderate_concern, min(count, len(moderate_concern)))
-    elif risk_level == "weak_risk":
-        selections = random.sample(low_concern + moderate_concern[:3], min(count, 5))
-    else:
-        selections = random.sample(low_concern, min(count, len(low_concern)))
+    risk_idx = np.array([RISK_LEVELS.index(risk_level)])
+    return generate_daily_metrics_batch(risk_idx, rng or np.random.default_rng())[0]
+
 
+_HIGH_CONCERN = ["chest_pain", "shortness_of_breath", "heart_palpitations"]
+_MODERATE_CONCERN = ["headache", "fatigue", "insomnia", "anxiety", "dizziness", "nausea"]
+_LOW_CONCERN = ["muscle_ache", "cough", "congestion", "appetite_change"]
+
+# Per entry of RISK_LEVELS: (min, max) number of selections, and the pools drawn from in order
+# (later pools only fill what earlier ones could not)
+CHECKBOX_COUNTS = ((0, 1), (1, 2), (2, 4), (3, 6))
+CHECKBOX_POOLS = (
+    (_LOW_CONCERN,),
+    (_LOW_CONCERN + _MODERATE_CONCERN[:3],),
+    (_MODERATE_CONCERN,),
+    (_HIGH_CONCERN, _MODERATE_CONCERN),
+)
+EMOJI_COUNTS = ((0, 3),) * 4
+EMOJI_POOLS = (
+    (EMOJI_INPUTS["positive"],),
+    (EMOJI_INPUTS["neutral"] + EMOJI_INPUTS["negative"][:2],),
+    (EMOJI_INPUTS["negative"][:5],),
+    (EMOJI_INPUTS["negative"],),
+)
+
+
+def _sample_batch(risk_idx: np.ndarray, counts: tuple, pools: tuple, rng: np.random.Generator) -> list[list]:
+    """
+    Distinct items for every row, sampled without replacement like random.sample.
+
+    Rows are handled per risk level: one integers draw gives every row's count, and
+    one (rows, pool size) matrix of uniform keys per pool is argsorted along each
+    row, giving an independent random permutation per row (Gumbel-top-k with equal
+    weights). Each row takes the first items of each pool's permutation.
+    """
+    selections = [None] * len(risk_idx)
+    for level, (level_counts, level_pools) in enumerate(zip(counts, pools)):
+        rows = np.flatnonzero(risk_idx == level)
+        if not len(rows):
+            continue
+        remaining = rng.integers(*level_counts, size=len(rows), endpoint=True)
+        drawn = []
+        for pool in level_pools:
+            order = np.argsort(rng.random((len(rows), len(pool))), axis=1)
+            take = np.minimum(remaining, len(pool))
+            drawn.append((np.array(pool, dtype=object)[order], take.tolist()))
+            remaining = remaining - take
+        for j, row in enumerate(rows.tolist()):
+            selections[row] = [item for items, take in drawn for item in items[j, :take[j]].tolist()]
     return selections
 
 
-def generate_emoji_inputs(risk_level: str) -> list:
+def generate_checkbox_selections_batch(risk_idx: np.ndarray, rng: np.random.Generator) -> list[list[str]]:
+    """Checkbox selections for each risk level index (into RISK_LEVELS)."""
+    return _sample_batch(risk_idx, CHECKBOX_COUNTS, CHECKBOX_POOLS, rng)
+
+
+def generate_emoji_inputs_batch(risk_idx: np.ndarray, rng: np.random.Generator) -> list[list[str]]:
+    """Emoji inputs for each risk level index (into RISK_LEVELS)."""
+    return _sample_batch(risk_idx, EMOJI_COUNTS, EMOJI_POOLS, rng)
+
+
+def generate_checkbox_selections(risk_level: str, rng: np.random.Generator | None = None) -> list:
+    """Generate checkbox selections based on risk level."""
+    risk_idx = np.array([RISK_LEVELS.index(risk_level)])
+    return generate_checkbox_selections_batch(risk_idx, rng or np.random.default_rng())[0]
+
+
+def generate_emoji_inputs(risk_level: str, rng: np.random.Generator | None = None) -> list:
     """Generate emoji inputs based on risk level."""
-    emoji_map = {
-        "low_risk": EMOJI_INPUTS["positive"],
-        "weak_risk": EMOJI_INPUTS["neutral"] + EMOJI_INPUTS["negative"][:2],
-        "moderate_risk": EMOJI_INPUTS["negative"][:5],
-        "high_risk": EMOJI_INPUTS["negative"],
-    }
-    count = random.randint(0, 3)
-    return random.sample(emoji_map[risk_level], min(count, len(emoji_map[risk_level])))
+    risk_idx = np.array([RISK_LEVELS.index(risk_level)])
+    return generate_emoji_inputs_batch(risk_idx, rng or np.random.default_rng())[0]
 
 
-def generate_user_data(num_days: int = 30, risk_profile: str = "mixed") -> list[dict]:
+def _risk_level_indices(num_days: int, risk_profile: str, rng: np.random.Generator) -> np.ndarray:
+    """Risk level index (into RISK_LEVELS) for every day of a profile, drawn in one pass per segment."""
+    if risk_profile == "low":
+        return rng.choice([0, 1], size=num_days, p=[0.8, 0.2])
+    if risk_profile == "high":
+        return rng.choice([2, 3], size=num_days, p=[0.6, 0.4])
+    if risk_profile == "declining":
+        # Gradually increasing risk over time
+        progress = np.arange(num_days) / num_days
+        early, middle = progress < 0.3, (progress >= 0.3) & (progress < 0.6)
+        late = ~(early | middle)
+        risk_idx = np.zeros(num_days, dtype=np.int64)
+        risk_idx[middle] = rng.choice([1, 2], size=int(middle.sum()), p=[0.7, 0.3])
+        risk_idx[late] = rng.choice([2, 3], size=int(late.sum()), p=[0.6, 0.4])
+        return risk_idx
+    # mixed
+    return rng.choice(4, size=num_days, p=[0.4, 0.3, 0.2, 0.1])
+
+
+def _uuid4_strings(n: int) -> list[str]:
+    """n random (version 4) UUID strings from a single os.urandom draw."""
+    raw = np.frombuffer(os.urandom(16 * n), dtype=np.uint8).reshape(n, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    hexed = raw.tobytes().hex()
+    return [
+        f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+        for h in (hexed[i:i + 32] for i in range(0, 32 * n, 32))
+    ]
+
+
+def generate_user_data(num_days: int = 30, risk_profile: str = "mixed", rng: np.random.Generator | None = None) -> list[dict]:
     """
     Generate a full user dataset over multiple days.
 
     Args:
         num_days: Number of days to simulate
         risk_profile: 'low', 'mixed', 'declining', or 'high'
+        rng: NumPy generator for the risk levels and daily metrics (fresh if omitted)
     """
-    data = []
-    user_id = str(uuid.uuid4())
-    start_date = datetime.utcnow() - timedelta(days=num_days)
-
-    for day in range(num_days):
-        date = start_date + timedelta(days=day)
-
-        # Determine risk level for this day
-        if risk_profile == "low":
-            risk_level = random.choices(["low_risk", "weak_risk"], weights=[0.8, 0.2])[0]
-        elif risk_profile == "high":
-            risk_level = random.choices(["moderate_risk", "high_risk"], weights=[0.6, 0.4])[0]
-        elif risk_profile == "declining":
-            # Gradually increasing risk over time
-            progress = day / num_days
-            if progress < 0.3:
-                risk_level = "low_risk"
-            elif progress < 0.6:
-                risk_level = random.choices(["weak_risk", "moderate_risk"], weights=[0.7, 0.3])[0]
-            else:
-                risk_level = random.choices(["moderate_risk", "high_risk"], weights=[0.6, 0.4])[0]
-        else:  # mixed
-            risk_level = random.choices(
-                ["low_risk", "weak_risk", "moderate_risk", "high_risk"],
-                weights=[0.4, 0.3, 0.2, 0.1],
-            )[0]
+    rng = rng or np.random.default_rng()
+    user_id, *entry_ids = _uuid4_strings(num_days + 1)
+    # ISO timestamps of every day at once (always with microseconds)
+    start = np.datetime64(datetime.utcnow(), "us") - np.timedelta64(num_days, "D")
+    dates = np.datetime_as_string(start + np.arange(num_days) * np.timedelta64(1, "D"), unit="us").tolist()
+
+    risk_idx = _risk_level_indices(num_days, risk_profile, rng)
+    metrics = generate_daily_metrics_batch(risk_idx, rng)
+    emojis = generate_emoji_inputs_batch(risk_idx, rng)
+    checkboxes = generate_checkbox_selections_batch(risk_idx, rng)
 
+    data = []
+    for day, level in enumerate(risk_idx.tolist()):
+        risk_level = RISK_LEVELS[level]
         entry = {
-            "id": str(uuid.uuid4()),
+            "id": entry_ids[day],
             "user_id": user_id,
-            "date": date.isoformat(),
+            "date": dates[day],
             "risk_level": risk_level.replace("_risk", "").upper(),
             "symptom_text": random.choice(SYMPTOM_TEMPLATES[risk_level]),
-            "emoji_inputs": generate_emoji_inputs(risk_level),
-            "checkbox_selections": generate_checkbox_selections(risk_level),
-            "daily_metrics": generate_daily_metrics(risk_level),
+            "emoji_inputs": emojis[day],
+            "checkbox_selections": checkboxes[day],
+            "daily_metrics": metrics[day],
         }
         data.append(entry)
 
     return data
 
 
+def _generate_seeded_user(args: tuple[str, int, int]) -> list[dict]:
+    """Process pool worker: one user's entries from its own seed (risk_profile, num_days, seed)."""
+    risk_profile, num_days, seed = args
+    random.seed(seed)
+    return generate_user_data(num_days=num_days, risk_profile=risk_profile, rng=np.random.default_rng(seed))
+
+
 def generate_training_dataset(
     num_users: int = 100,
     days_per_user: int = 30,
     output_path: str = "ml/training/data/",
+    seed: int | None = None,
+    max_workers: int | None = None,
 ) -> str:
-    """Generate a full training dataset with multiple users."""
+    """
+    Generate a full training dataset with multiple users.
+
+    Users are generated in parallel worker processes, each seeded from seed + user
+    index, so a given seed reproduces the same samples (ids aside) regardless of
+    the number of workers.
+    """
     all_data = []
     profiles = ["low", "mixed", "declining", "high"]
+    base_seed = random.randrange(2**32) if seed is None else seed
+    jobs = [(profiles[i % len(profiles)], days_per_user, base_seed + i) for i in range(num_users)]
 
-    for i in range(num_users):
-        profile = profiles[i % len(profiles)]
-        user_data = generate_user_data(num_days=days_per_user, risk_profile=profile)
-        all_data.extend(user_data)
+    workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for user_data in executor.map(_generate_seeded_user, jobs, chunksize=max(1, num_users // (4 * workers))):
+            all_data.extend(user_data)
 
     # Save to file
     output_dir = Path(output_path)
     output_dir.mkdir(parents=True, exist_ok=True)
     output_file = output_dir / "synthetic_training_data.json"
 
-    with open(output_file, "w") as f:
-        json.dump(all_data, f, indent=2, default=str)
+    with open(output_file, "wb") as f:
+        f.write(orjson.dumps(all_data, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
 
     print(f"Generated {len(all_data)} training samples for {num_users} users")
     print(f"Saved to: {output_file}")
@@ -204,5 +313,79 @@ def generate_training_dataset(
     return str(output_file)
 
 
+def load_training_data(data_path: str, columns: list[str] | None = None) -> list[dict]:
+    """
+    Load a generated dataset as a list of entries.
+
+    With pyarrow installed the JSON is converted once to an Arrow IPC (Feather) file
+    next to it, and later loads memory-map that file instead of parsing the JSON,
+    materializing only the requested columns. daily_metrics is stored there as
+    int8/int16 columns (see METRIC_STORAGE) when that is lossless. The Arrow file is
+    rebuilt whenever the JSON is newer.
+    """
+    data_file = Path(data_path)
+    arrow_file = data_file.with_suffix(".arrow")
+    if HAS_PYARROW and arrow_file.exists() and arrow_file.stat().st_mtime >= data_file.stat().st_mtime:
+        return _read_arrow_cache(arrow_file, columns)
+
+    with open(data_file, "rb") as f:
+        data = orjson.loads(f.read())
+
+    if HAS_PYARROW and data:
+        try:
+            table = pa.Table.from_pylist(data)
+            packed = _pack_daily_metrics(data)
+            if packed is not None:
+                table = table.drop_columns(["daily_metrics"])
+                for name, array in packed.items():
+                    table = table.append_column(name, array)
+            feather.write_feather(table, str(arrow_file))
+        except (pa.ArrowException, OSError) as e:
+            logger.warning(f"Could not write Arrow cache {arrow_file}: {e}")
+    return data
+
+
+def _pack_daily_metrics(data: list[dict]) -> dict | None:
+    """METRIC_STORAGE integer columns for every entry's daily_metrics; None unless all values round-trip exactly."""
+    metrics = [entry.get("daily_metrics") or {} for entry in data]
+    fields = {field for field, _, _ in METRIC_STORAGE}
+    if not all(fields.issuperset(day) for day in metrics):
+        return None
+
+    columns = {}
+    try:
+        for field, dtype, scale in METRIC_STORAGE:
+            values = [day.get(field) for day in metrics]
+            scaled = [None if value is None else round(value * scale) for value in values]
+            if any(value is not None and stored / scale != value for value, stored in zip(values, scaled)):
+                return None
+            columns[f"daily_metrics.{field}"] = pa.array(scaled, type=pa.from_numpy_dtype(dtype))
+    except (pa.ArrowException, TypeError):
+        return None
+    return columns
+
+
+def _read_arrow_cache(arrow_file: Path, columns: list[str] | None) -> list[dict]:
+    """Rows of the memory-mapped Arrow cache, decoding packed daily_metrics columns back into dicts."""
+    table = feather.read_table(arrow_file, memory_map=True)
+    packed = {f"daily_metrics.{field}": (field, scale) for field, _, scale in METRIC_STORAGE}
+    if not packed.keys() <= set(table.column_names):
+        return (table.select(columns) if columns else table).to_pylist()
+
+    plain = [name for name in table.column_names if name not in packed]
+    wanted = columns or [*plain, "daily_metrics"]
+    selected = [name for name in wanted if name != "daily_metrics"]
+    rows = table.select(selected).to_pylist() if selected else [{} for _ in range(table.num_rows)]
+
+    if "daily_metrics" in wanted:
+        decoded = []
+        for name, (field, scale) in packed.items():
+            values = table.column(name).to_pylist()
+            decoded.append(values if scale == 1 else [None if value is None else value / scale for value in values])
+        fields = [field for field, _ in packed.values()]
+        for row, day in zip(rows, zip(*decoded)):
+            row["daily_metrics"] = dict(zip(fields, day))
+    return rows
+
 if __name__ == "__main__":
     generate_training_dataset(num_users=100, days_per_user=30)
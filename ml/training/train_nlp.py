@@ -3,23 +3,27 @@ Training Script for WeakSignalDetector_NLP (DistilBERT)
 Trains the NLP model on synthetic health data to detect weak symptom patterns.
 """
 
-import json
 import logging
+import os
 import numpy as np
 from pathlib import Path
+from ml.preprocessing import KeywordMatcher
 
 logger = logging.getLogger(__name__)
 
 try:
     import torch
     import torch.nn as nn
-    from torch.utils.data import Dataset, DataLoader
+    from torch.utils.data import Dataset, DataLoader, default_collate
     from transformers import AutoTokenizer
     HAS_TORCH = True
 except ImportError:
     HAS_TORCH = False
 
 
+# Local copy of the tokenizer, so later runs load it without Hub version checks
+TOKENIZER_CACHE_PATH = "ml/trained_models/_tok_cache/distilbert"
+
 RISK_TO_LABEL = {"LOW": 0, "WEAK": 1, "MODERATE": 2, "HIGH": 3}
 SIGNAL_CATEGORIES = {
     "fatigue": ["tired", "exhausted", "fatigue", "no energy", "drained"],
@@ -31,52 +35,84 @@ SIGNAL_CATEGORIES = {
     "cardiovascular": ["heart", "palpitations", "chest pain", "blood pressure"],
     "neurological": ["headache", "migraine", "numbness", "vision", "confusion"],
 }
+_KEYWORD_CATEGORY = {kw: i for i, kws in enumerate(SIGNAL_CATEGORIES.values()) for kw in kws}
+_SIGNAL_MATCHER = KeywordMatcher(_KEYWORD_CATEGORY)
 
 
 class HealthTextDataset(Dataset):
-    """Dataset for training the NLP weak signal detector."""
+    """Dataset for training the NLP weak signal detector.
+
+    All texts are tokenized and labelled once at construction; items are
+    row views into the resulting tensors.
+    """
 
     def __init__(self, data: list[dict], tokenizer, max_length: int = 256):
         self.data = data
         self.tokenizer = tokenizer
         self.max_length = max_length
 
-    def __len__(self):
-        return len(self.data)
-
-    def __getitem__(self, idx):
-        item = self.data[idx]
-        text = item.get("symptom_text", "")
-
-        # Tokenize
-        encoding = self.tokenizer(
-            text, max_length=self.max_length, truncation=True,
-            padding="max_length", return_tensors="pt",
+        texts = [item.get("symptom_text", "") for item in data]
+        encoding = tokenizer(
+            texts, max_length=max_length, truncation=True,
+            padding="max_length", return_tensors="np",
         )
+        self.input_ids = torch.from_numpy(encoding["input_ids"])
+        self.attention_mask = torch.from_numpy(encoding["attention_mask"])
 
-        # Create signal labels (multi-label)
-        signal_labels = self._extract_signal_labels(text)
+        # Signal labels (multi-label) and risk labels
+        self.signal_labels = torch.tensor([self._extract_signal_labels(text) for text in texts], dtype=torch.float)
+        self.risk_labels = torch.tensor(
+            [RISK_TO_LABEL.get(item.get("risk_level", "LOW"), 0) for item in data], dtype=torch.long,
+        )
 
-        # Risk label
-        risk_label = RISK_TO_LABEL.get(item.get("risk_level", "LOW"), 0)
+    def __len__(self):
+        return len(self.data)
 
+    def __getitem__(self, idx):
         return {
-            "input_ids": encoding["input_ids"].squeeze(),
-            "attention_mask": encoding["attention_mask"].squeeze(),
-            "signal_labels": torch.tensor(signal_labels, dtype=torch.float),
-            "risk_label": torch.tensor(risk_label, dtype=torch.long),
+            "input_ids": self.input_ids[idx],
+            "attention_mask": self.attention_mask[idx],
+            "signal_labels": self.signal_labels[idx],
+            "risk_label": self.risk_labels[idx],
         }
 
+    def __getitems__(self, indices):
+        """A whole batch in one gather per tensor; the DataLoader calls this instead of per-item __getitem__."""
+        return self[torch.as_tensor(indices)]
+
     def _extract_signal_labels(self, text: str) -> list[float]:
-        """Extract binary signal labels from text content."""
-        text_lower = text.lower()
-        labels = []
-        for category, keywords in SIGNAL_CATEGORIES.items():
-            present = any(kw in text_lower for kw in keywords)
-            labels.append(1.0 if present else 0.0)
+        """Extract binary signal labels from text content (one keyword scan for all categories)."""
+        labels = [0.0] * len(SIGNAL_CATEGORIES)
+        for kw in _SIGNAL_MATCHER.find(text):
+            labels[_KEYWORD_CATEGORY[kw]] = 1.0
         return labels
 
 
+def collate_batch(batch):
+    """Batches from __getitems__ are already stacked dicts; anything else gets default collation."""
+    return batch if isinstance(batch, dict) else default_collate(batch)
+
+
+def load_tokenizer(pretrained_model: str = "distilbert-base-uncased", cache_path: str = TOKENIZER_CACHE_PATH):
+    """
+    Fast tokenizer for pretrained_model, read from a local copy without contacting the Hub.
+
+    The first run fetches it (only from the local Hugging Face cache when HEA_OFFLINE=1)
+    and saves it to cache_path.
+    """
+    cache_dir = Path(cache_path)
+    if (cache_dir / "tokenizer_config.json").exists():
+        tokenizer = AutoTokenizer.from_pretrained(str(cache_dir), local_files_only=True, use_fast=True)
+    else:
+        tokenizer = AutoTokenizer.from_pretrained(
+            pretrained_model, use_fast=True, local_files_only=os.environ.get("HEA_OFFLINE") == "1",
+        )
+        tokenizer.save_pretrained(str(cache_dir))
+    if not tokenizer.is_fast:
+        raise RuntimeError("A fast (Rust) tokenizer is required; install the tokenizers package")
+    return tokenizer
+
+
 def train_nlp_model(
     data_path: str = "ml/training/data/synthetic_training_data.json",
     model_save_path: str = "ml/trained_models/weak_signal_nlp/",
@@ -96,15 +132,15 @@ def train_nlp_model(
         from ml.training.generate_synthetic_data import generate_training_dataset
         generate_training_dataset(num_users=50, days_per_user=30, output_path="ml/training/data/")
 
-    with open(data_file) as f:
-        data = json.load(f)
+    from ml.training.generate_synthetic_data import load_training_data
+    data = load_training_data(str(data_file), columns=["symptom_text", "risk_level"])
 
     # Filter entries with text
     data = [d for d in data if d.get("symptom_text")]
     logger.info(f"Training on {len(data)} text samples")
 
     # Initialize
-    tokenizer = AutoTokenizer.from_pretrained("distilbert-base-uncased")
+    tokenizer = load_tokenizer()
     dataset = HealthTextDataset(data, tokenizer)
 
     # Split 80/20
@@ -112,52 +148,79 @@ def train_nlp_model(
     val_size = len(dataset) - train_size
     train_dataset, val_dataset = torch.utils.data.random_split(dataset, [train_size, val_size])
 
-    train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True)
-    val_loader = DataLoader(val_dataset, batch_size=batch_size)
-
-    # Model
-    from ml.models.weak_signal_nlp import WeakSignalNLPModel
-    model = WeakSignalNLPModel()
+    # Batches are gathered from the precomputed tensors in worker processes that live across
+    # epochs; pinned batches let the host-to-device copies below run asynchronously
+    loader_kwargs = {
+        "num_workers": min(8, os.cpu_count() or 1),
+        "pin_memory": torch.cuda.is_available(),
+        "persistent_workers": True,
+        "prefetch_factor": 4,
+        "collate_fn": collate_batch,
+    }
+    train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True, **loader_kwargs)
+    val_loader = DataLoader(val_dataset, batch_size=batch_size, **loader_kwargs)
+
+    # Model — DistilBERT is frozen; only the attention pooling and heads are trained
+    from ml.models.weak_signal_nlp import EmbeddingCache, WeakSignalNLPModel
+    model = WeakSignalNLPModel(freeze_encoder=True)
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     model.to(device)
+    # Training only runs the pooling and heads over cached hidden states; compile that on CUDA
+    forward_heads = model.forward_heads
+    if device.type == "cuda" and hasattr(torch, "compile"):
+        forward_heads = torch.compile(model.forward_heads, mode="reduce-overhead")
+
+    # Encoder hidden states are computed once per text and reused across epochs
+    cache_path = Path(model_save_path) / "embedding_cache.pt"
+    embedding_cache = EmbeddingCache.load(str(cache_path))
 
     # Loss & optimizer
-    signal_criterion = nn.BCELoss()
-    optimizer = torch.optim.AdamW(model.parameters(), lr=learning_rate)
+    signal_criterion = nn.BCEWithLogitsLoss()
+    optimizer = torch.optim.AdamW([p for p in model.parameters() if p.requires_grad], lr=learning_rate)
+
+    # Mixed precision on CUDA: bf16 where supported, otherwise fp16 with loss scaling
+    use_amp = device.type == "cuda"
+    amp_dtype = torch.bfloat16 if use_amp and torch.cuda.is_bf16_supported() else torch.float16
+    scaler = torch.cuda.amp.GradScaler(enabled=use_amp and amp_dtype == torch.float16)
 
     # Training loop
     for epoch in range(epochs):
         model.train()
-        total_loss = 0
+        total_loss = torch.zeros((), device=device)  # summed on device; one sync per epoch
         for batch in train_loader:
-            input_ids = batch["input_ids"].to(device)
-            attention_mask = batch["attention_mask"].to(device)
-            signal_labels = batch["signal_labels"].to(device)
+            optimizer.zero_grad(set_to_none=True)
+            input_ids = batch["input_ids"].to(device, non_blocking=True)
+            attention_mask = batch["attention_mask"].to(device, non_blocking=True)
+            signal_labels = batch["signal_labels"].to(device, non_blocking=True)
 
-            outputs = model(input_ids, attention_mask)
-            loss = signal_criterion(outputs["signal_scores"], signal_labels)
+            hidden_states = embedding_cache.encode(model, input_ids, attention_mask)
+            with torch.autocast(device_type=device.type, dtype=amp_dtype, enabled=use_amp):
+                outputs = forward_heads(hidden_states, attention_mask, return_logits=True)
+            loss = signal_criterion(outputs["signal_logits"].float(), signal_labels)
 
-            optimizer.zero_grad()
-            loss.backward()
-            optimizer.step()
-            total_loss += loss.item()
+            scaler.scale(loss).backward()
+            scaler.step(optimizer)
+            scaler.update()
+            total_loss += loss.detach()
 
-        avg_loss = total_loss / len(train_loader)
+        avg_loss = (total_loss / len(train_loader)).item()
 
         # Validation
         model.eval()
-        val_loss = 0
+        val_loss = torch.zeros((), device=device)
         with torch.no_grad():
             for batch in val_loader:
-                input_ids = batch["input_ids"].to(device)
-                attention_mask = batch["attention_mask"].to(device)
-                signal_labels = batch["signal_labels"].to(device)
+                input_ids = batch["input_ids"].to(device, non_blocking=True)
+                attention_mask = batch["attention_mask"].to(device, non_blocking=True)
+                signal_labels = batch["signal_labels"].to(device, non_blocking=True)
 
-                outputs = model(input_ids, attention_mask)
-                loss = signal_criterion(outputs["signal_scores"], signal_labels)
-                val_loss += loss.item()
+                hidden_states = embedding_cache.encode(model, input_ids, attention_mask)
+                with torch.autocast(device_type=device.type, dtype=amp_dtype, enabled=use_amp):
+                    outputs = forward_heads(hidden_states, attention_mask, return_logits=True)
+                loss = signal_criterion(outputs["signal_logits"].float(), signal_labels)
+                val_loss += loss.detach()
 
-        val_avg = val_loss / len(val_loader) if val_loader else 0
+        val_avg = (val_loss / len(val_loader)).item() if val_loader else 0
         logger.info(f"Epoch {epoch + 1}/{epochs} — Train Loss: {avg_loss:.4f}, Val Loss: {val_avg:.4f}")
 
     # Save model
@@ -165,6 +228,7 @@ def train_nlp_model(
     save_path.mkdir(parents=True, exist_ok=True)
     torch.save(model.state_dict(), save_path / "model.pt")
     tokenizer.save_pretrained(str(save_path))
+    embedding_cache.save(str(cache_path))
     logger.info(f"NLP model saved to {save_path}")
 
 
@@ -3,17 +3,17 @@ Training Script for TimeSeriesAnomalyDetector (LSTM)
 Trains the LSTM model on daily metrics time-series data.
 """
 
-import json
 import logging
+import os
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
 try:
     import torch
-    import torch.nn as nn
-    from torch.utils.data import Dataset, DataLoader
+    from torch.utils.data import Dataset, DataLoader, default_collate
     HAS_TORCH = True
 except ImportError:
     HAS_TORCH = False
@@ -32,78 +32,88 @@ NORM = {
 }
 
 
+_MEANS = np.array([NORM[key]["mean"] for key in METRIC_KEYS], dtype=np.float64)
+_STDS = np.array([NORM[key]["std"] for key in METRIC_KEYS], dtype=np.float64)
+
+
 class TimeSeriesDataset(Dataset):
-    """Dataset for training the LSTM anomaly detector."""
+    """Dataset for training the LSTM anomaly detector.
+
+    Every window is normalized and scored once at construction; items are row
+    views into the resulting tensors.
+    """
+
+    def __init__(self, windows: np.ndarray, labels: np.ndarray):
+        # windows: (N, seq_length, F) raw metrics from prepare_sequences, NaN where missing
+        z = (windows - _MEANS) / _STDS
+        missing = np.isnan(z)
+        normalized = np.where(missing, 0.0, z)
+        # Anomaly target: the day's largest |z| / 3, capped at 1 (0 when no metric was logged)
+        anomaly = np.where(missing, 0.0, np.minimum(1.0, np.abs(z) / 3.0)).max(axis=-1)
 
-    def __init__(self, sequences: list[dict], seq_length: int = 7):
-        self.sequences = sequences
-        self.seq_length = seq_length
+        self.sequence_tensor = torch.from_numpy(normalized.astype(np.float32))
+        self.anomaly_tensor = torch.from_numpy(anomaly.astype(np.float32))
+        self.label_tensor = torch.from_numpy(np.asarray(labels, dtype=np.int64))
 
     def __len__(self):
-        return len(self.sequences)
+        return len(self.label_tensor)
 
     def __getitem__(self, idx):
-        seq = self.sequences[idx]
-        metrics = seq["metrics"]  # list of daily metric dicts
-        label = RISK_LABELS.get(seq["label"], 0)
-
-        # Normalize and pad
-        normalized = []
-        for day_metrics in metrics[-self.seq_length:]:
-            day_vec = []
-            for key in METRIC_KEYS:
-                val = day_metrics.get(key)
-                if val is not None:
-                    norm_val = (val - NORM[key]["mean"]) / NORM[key]["std"]
-                else:
-                    norm_val = 0.0
-                day_vec.append(norm_val)
-            normalized.append(day_vec)
-
-        # Pad if shorter than seq_length
-        while len(normalized) < self.seq_length:
-            normalized.insert(0, [0.0] * len(METRIC_KEYS))
-
-        # Create anomaly labels (1 if day's risk was high)
-        anomaly_target = []
-        for day_metrics in metrics[-self.seq_length:]:
-            score = 0.0
-            for key in METRIC_KEYS:
-                val = day_metrics.get(key)
-                if val is not None:
-                    z = abs((val - NORM[key]["mean"]) / NORM[key]["std"])
-                    score = max(score, min(1.0, z / 3.0))
-            anomaly_target.append(score)
-        while len(anomaly_target) < self.seq_length:
-            anomaly_target.insert(0, 0.0)
-
         return {
-            "sequence": torch.tensor(normalized, dtype=torch.float),
-            "anomaly_target": torch.tensor(anomaly_target, dtype=torch.float),
-            "risk_label": torch.tensor(label, dtype=torch.long),
+            "sequence": self.sequence_tensor[idx],
+            "anomaly_target": self.anomaly_tensor[idx],
+            "risk_label": self.label_tensor[idx],
         }
 
+    def __getitems__(self, indices):
+        """A whole batch in one gather per tensor; the DataLoader calls this instead of per-item __getitem__."""
+        return self[torch.as_tensor(indices)]
+
+
+def collate_batch(batch):
+    """Batches from __getitems__ are already stacked dicts; anything else gets default collation."""
+    return batch if isinstance(batch, dict) else default_collate(batch)
 
-def prepare_sequences(data: list[dict], seq_length: int = 7) -> list[dict]:
-    """Group data by user and create overlapping sequences."""
+
+def last_step_anomaly_loss(anomaly_scores, anomaly_target):
+    """
+    MSE between every per-metric anomaly score (batch, F) and the last day's target.
+
+    The target is broadcast as a (batch, 1) column inside the subtraction rather than
+    expanded to (batch, F) and passed to MSELoss.
+    """
+    return (anomaly_scores - anomaly_target[:, -1:]).square().mean()
+
+
+def prepare_sequences(data: list[dict], seq_length: int = 7) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Group data by user and create overlapping windows.
+
+    Returns the raw metrics of every window, shape (N, seq_length, F) with NaN for
+    missing values, and the risk label of each window's last day, shape (N,).
+    Windows are strided views over each user's date-sorted (days, F) array.
+    """
     from collections import defaultdict
 
     user_data = defaultdict(list)
     for entry in data:
         user_data[entry["user_id"]].append(entry)
 
-    sequences = []
-    for user_id, entries in user_data.items():
+    windows, labels = [], []
+    for entries in user_data.values():
+        if len(entries) < seq_length:
+            continue
         entries.sort(key=lambda x: x["date"])
-        for i in range(len(entries) - seq_length + 1):
-            window = entries[i:i + seq_length]
-            sequences.append({
-                "user_id": user_id,
-                "metrics": [e["daily_metrics"] for e in window],
-                "label": window[-1]["risk_level"],
-            })
+        days = np.array([
+            [np.nan if (val := e["daily_metrics"].get(key)) is None else val for key in METRIC_KEYS]
+            for e in entries
+        ], dtype=np.float64)
+        windows.append(sliding_window_view(days, (seq_length, len(METRIC_KEYS)))[:, 0])
+        labels.append([RISK_LABELS.get(e["risk_level"], 0) for e in entries[seq_length - 1:]])
 
-    return sequences
+    if not windows:
+        return np.empty((0, seq_length, len(METRIC_KEYS))), np.empty(0, dtype=np.int64)
+    return np.concatenate(windows), np.concatenate(labels).astype(np.int64)
 
 
 def train_timeseries_model(
@@ -126,73 +136,81 @@ def train_timeseries_model(
         from ml.training.generate_synthetic_data import generate_training_dataset
         generate_training_dataset(num_users=50, days_per_user=30, output_path="ml/training/data/")
 
-    with open(data_file) as f:
-        data = json.load(f)
+    from ml.training.generate_synthetic_data import load_training_data
+    data = load_training_data(str(data_file), columns=["user_id", "date", "risk_level", "daily_metrics"])
 
     # Prepare sequences
-    sequences = prepare_sequences(data, seq_length)
-    logger.info(f"Created {len(sequences)} sequences from {len(data)} data points")
+    windows, labels = prepare_sequences(data, seq_length)
+    logger.info(f"Created {len(windows)} sequences from {len(data)} data points")
 
-    dataset = TimeSeriesDataset(sequences, seq_length)
+    dataset = TimeSeriesDataset(windows, labels)
 
     # Split
     train_size = int(0.8 * len(dataset))
     val_size = len(dataset) - train_size
     train_dataset, val_dataset = torch.utils.data.random_split(dataset, [train_size, val_size])
 
-    train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True)
-    val_loader = DataLoader(val_dataset, batch_size=batch_size)
+    # Batches are gathered from the precomputed tensors in worker processes that live across
+    # epochs; pinned batches let the host-to-device copies below run asynchronously
+    loader_kwargs = {
+        "num_workers": min(8, os.cpu_count() or 1),
+        "pin_memory": torch.cuda.is_available(),
+        "persistent_workers": True,
+        "prefetch_factor": 4,
+        "collate_fn": collate_batch,
+    }
+    train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True, **loader_kwargs)
+    val_loader = DataLoader(val_dataset, batch_size=batch_size, **loader_kwargs)
 
     # Model
     from ml.models.timeseries_detector import TimeSeriesLSTMModel
     model = TimeSeriesLSTMModel(input_size=len(METRIC_KEYS))
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     model.to(device)
+    # Inputs are always (batch, seq_length, F), so on CUDA let Inductor autotune kernels for that
+    # shape; model itself stays uncompiled for train()/eval() and the saved state_dict
+    forward = model
+    if device.type == "cuda" and hasattr(torch, "compile"):
+        forward = torch.compile(model, mode="max-autotune")
 
-    # Loss & optimizer
-    anomaly_criterion = nn.MSELoss()
+    # Optimizer
     optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
     scheduler = torch.optim.lr_scheduler.StepLR(optimizer, step_size=5, gamma=0.5)
 
     # Training loop
     for epoch in range(epochs):
         model.train()
-        total_loss = 0
+        total_loss = torch.zeros((), device=device)  # summed on device; one sync per epoch
 
         for batch in train_loader:
-            sequence = batch["sequence"].to(device)
-            anomaly_target = batch["anomaly_target"].to(device)
-
-            outputs = model(sequence)
-            anomaly_scores = outputs["anomaly_scores"]
+            optimizer.zero_grad(set_to_none=True)
+            sequence = batch["sequence"].to(device, non_blocking=True)
+            anomaly_target = batch["anomaly_target"].to(device, non_blocking=True)
 
-            # Loss: predict anomaly score for the last timestep
-            target_score = anomaly_target[:, -1].unsqueeze(1).expand_as(anomaly_scores)
-            loss = anomaly_criterion(anomaly_scores, target_score)
+            outputs = forward(sequence)
+            loss = last_step_anomaly_loss(outputs["anomaly_scores"], anomaly_target)
 
-            optimizer.zero_grad()
             loss.backward()
             torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=1.0)
             optimizer.step()
-            total_loss += loss.item()
+            total_loss += loss.detach()
 
         scheduler.step()
-        avg_loss = total_loss / len(train_loader)
+        avg_loss = (total_loss / len(train_loader)).item()
 
         # Validation
         model.eval()
-        val_loss = 0
+        val_loss = torch.zeros((), device=device)
         with torch.no_grad():
             for batch in val_loader:
-                sequence = batch["sequence"].to(device)
-                anomaly_target = batch["anomaly_target"].to(device)
+                sequence = batch["sequence"].to(device, non_blocking=True)
+                anomaly_target = batch["anomaly_target"].to(device, non_blocking=True)
 
-                outputs = model(sequence)
-                target_score = anomaly_target[:, -1].unsqueeze(1).expand_as(outputs["anomaly_scores"])
-                loss = anomaly_criterion(outputs["anomaly_scores"], target_score)
-                val_loss += loss.item()
+                outputs = forward(sequence)
+                loss = last_step_anomaly_loss(outputs["anomaly_scores"], anomaly_target)
+                val_loss += loss.detach()
 
-        val_avg = val_loss / len(val_loader) if val_loader else 0
+        val_avg = (val_loss / len(val_loader)).item() if val_loader else 0
         logger.info(f"Epoch {epoch + 1}/{epochs} — Train Loss: {avg_loss:.4f}, Val Loss: {val_avg:.4f}")
 
     # Save model